@@ -0,0 +1,100 @@
+"""Prompt context size before/after context assembly (src/context_builder.py).
+
+    python benchmarks/bench_context.py --questions 2000 --thresholds benchmarks/thresholds.json
+    python benchmarks/bench_context.py --budget 200 --ocr-ratio 1.0
+    python benchmarks/bench_context.py --layout --min-confidence 0.6
+
+On --questions scraped-style questions (benchmarks/corpus.py: long, repetitive
+OCR text with noise fragments, one per line as the OCR step writes it) it
+reports the estimated token histograms of the question context (text + OCR)
+as Question.full_text() built it and as ContextBuilder.build() assembles it,
+the rendered prompt size for both, and the assembly cost per question.
+With --layout the images carry their ocr_lines record (confidence + boxes,
+src/ocr_layout.py); the size of that record per OCR line is reported against
+the raw readtext() output as JSON, and --min-confidence filters lines from it.
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+import time
+from typing import Any, Dict
+
+import corpus
+from bench_utils import finish, load_thresholds, write_report
+from src import json_utils
+from src.context_builder import ContextBuilder
+from src.metrics_utils import METRICS, SIZE_BUCKETS, Histogram
+from src.models import Question
+from src.prompt_templates import get_template
+
+
+def summary(h: Histogram) -> Dict[str, float]:
+    d = h.to_dict()
+    return {"mean": round(d["mean"], 1), "p50": d["p50"], "p90": d["p90"], "p99": d["p99"], "max": d["max"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--ocr-ratio', type=float, default=0.3)
+    parser.add_argument('--budget', type=int, default=None, help='token budget (default FORMS_AI_CONTEXT_TOKENS)')
+    parser.add_argument('--layout', action='store_true', help='images with ocr_lines (confidence + boxes)')
+    parser.add_argument('--min-confidence', type=float, default=None,
+                        help='line confidence threshold (default FORMS_AI_CONTEXT_MIN_CONFIDENCE)')
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "context" section')
+    args = parser.parse_args(argv)
+
+    dicts = corpus.questions(args.questions, ocr_ratio=args.ocr_ratio, ocr_sep='\n', layout=args.layout)
+    questions = [Question.from_dict(q) for q in dicts]
+    builder = ContextBuilder()
+    if args.budget is not None:
+        builder.token_budget = args.budget
+    if args.min_confidence is not None:
+        builder.min_confidence = args.min_confidence
+    METRICS.reset()
+    t0 = time.perf_counter()
+    texts = builder.build_many(questions)
+    elapsed = time.perf_counter() - t0
+    raw, kept = METRICS.values()['context.tokens_raw'], METRICS.values()['context.tokens']
+
+    template = get_template()
+    prompt_raw, prompt_kept = Histogram(SIZE_BUCKETS), Histogram(SIZE_BUCKETS)
+    for q, text in zip(questions, texts):
+        options = q.answer_values if q.answer_values is not None else []
+        prompt_raw.observe(sum(template.token_counts('English', q.answer_type, q.full_text(), options).values()))
+        prompt_kept.observe(sum(template.token_counts('English', q.answer_type, text, options).values()))
+
+    results: Dict[str, Any] = {
+        "questions": args.questions,
+        "budget": builder.token_budget,
+        "context_tokens": {"raw": summary(raw), "assembled": summary(kept)},
+        "prompt_tokens": {"raw": summary(prompt_raw), "assembled": summary(prompt_kept)},
+        "tokens_ratio": round(kept.sum / raw.sum, 3),
+        "us_per_question": round(elapsed / args.questions * 1e6, 1),
+    }
+    if args.layout:
+        records = [img["ocr_lines"] for q in dicts for img in q["images"]]
+        lines = sum(len(r["text"]) for r in records)
+        raw = sum(len(json_utils.dumps_bytes(corpus.readtext_results(random.Random(i), len(r["text"])), pretty=False))
+                  for i, r in enumerate(records))
+        results["layout_bytes_per_line"] = {
+            "ocr_lines": round(sum(len(json_utils.dumps_bytes(r, pretty=False)) for r in records) / lines, 1),
+            "readtext_json": round(raw / lines, 1)}
+    print(f"{args.questions} questions, budget {builder.token_budget} tokens OCR, confiance min {builder.min_confidence}")
+    for section in ("context_tokens", "prompt_tokens"):
+        r, a = results[section]["raw"], results[section]["assembled"]
+        print(f"{section:<15} avant: moy {r['mean']} p50 {r['p50']} p90 {r['p90']} max {r['max']} | "
+              f"après: moy {a['mean']} p50 {a['p50']} p90 {a['p90']} max {a['max']}")
+    print(f"Tokens conservés: x{results['tokens_ratio']} | assemblage {results['us_per_question']} µs/question")
+    if args.layout:
+        per_line = results["layout_bytes_per_line"]
+        print(f"ocr_lines: {per_line['ocr_lines']} octets/ligne (texte compris) | "
+              f"sortie readtext brute en JSON: {per_line['readtext_json']} octets/ligne")
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'context'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
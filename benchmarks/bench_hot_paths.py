@@ -0,0 +1,88 @@
+"""Micro-benchmarks for the per-question pure-Python paths.
+
+    python benchmarks/bench_hot_paths.py --thresholds benchmarks/thresholds.json
+    python benchmarks/bench_hot_paths.py --update-thresholds benchmarks/thresholds.json  # re-baseline
+
+Measures ops/sec of build_prompt, parse_answer_and_justification,
+LanguageDetector.detect_language and JsonQuestionExtractor.extract_questions_data
+on the corpora of corpus.py, and exits 1 when a "hot_paths" minimum is not met.
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict
+
+from bench_utils import cycler, finish, load_thresholds, measure, write_report
+import corpus
+from src import json_utils
+
+
+def build_cases(workdir: Path) -> Dict[str, Callable[[], object]]:
+    from src.LangChainPipelineAgent import parse_answer_and_justification
+    from src.prompt_templates import build_prompt
+    from src.TextLanguageDetectionAgent import LanguageDetector
+    from src.JsonQuestionExtractorAgent import JsonQuestionExtractor
+
+    rng = random.Random(11)
+    qs = corpus.questions(64)
+    prompt_inputs = [
+        ("French", q["answer_type"], q["question_text"] + (" | OCR: " + corpus.long_ocr_text(rng) if i % 3 == 0 else ""), q["answer_values"])
+        for i, q in enumerate(qs)
+    ]
+    next_prompt = cycler(prompt_inputs)
+    next_raw = cycler(corpus.RAW_OUTPUTS)
+    next_text = cycler([q["question_text"] for q in qs])
+    detector = LanguageDetector()
+    form_json = corpus.write_form_json(workdir / 'form_200q.json', 200)
+    extractor = JsonQuestionExtractor(str(form_json))
+
+    return {
+        "build_prompt": lambda: build_prompt(*next_prompt()),
+        "parse_answer_and_justification": lambda: parse_answer_and_justification(next_raw()),
+        "detect_language": lambda: detector.detect_language(next_text()[:400]),
+        "extract_questions_data_200q": extractor.extract_questions_data,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=0.5)
+    parser.add_argument('--only', nargs='*', help='subset of benchmark names')
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "hot_paths" section')
+    parser.add_argument('--update-thresholds', default=None, metavar='PATH',
+                        help='rewrite the "hot_paths" section of PATH from this run')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown when re-baselining (0.5 = -50%%)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='forms_ai_hot_') as tmp:
+        cases = build_cases(Path(tmp))
+        results: Dict[str, Dict] = {"ops_per_sec": {}, "us_per_op": {}}
+        print(f"{'benchmark':<34} {'ops/sec':>12} {'µs/op':>10}")
+        for name, fn in cases.items():
+            if args.only and name not in args.only:
+                continue
+            r = measure(fn, args.min_time)
+            results["ops_per_sec"][name] = r["ops_per_sec"]
+            results["us_per_op"][name] = r["us_per_op"]
+            print(f"{name:<34} {r['ops_per_sec']:>12,.1f} {r['us_per_op']:>10.2f}")
+
+    write_report(args.report, results)
+    if args.update_thresholds:
+        path = Path(args.update_thresholds)
+        data = json_utils.load(path) if path.exists() else {}
+        data["hot_paths"] = {
+            f"ops_per_sec/{name}": {"min": round(ops * (1 - args.tolerance), 1)}
+            for name, ops in results["ops_per_sec"].items()
+        }
+        json_utils.dump(data, path, pretty=True)  # hand-edited file: keep it readable
+        print(f"Seuils mis à jour: {path}")
+        return 0
+    return finish(results, load_thresholds(args.thresholds, 'hot_paths'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Startup cost of the pipeline entry point, measured with ``python -X importtime``.
+
+    python benchmarks/bench_import_time.py --thresholds benchmarks/thresholds.json
+    python benchmarks/bench_import_time.py --module src.artifact_store --top 15
+
+Imports the module in a fresh interpreter (best of --repeat runs), reports the
+cumulative import time, the slowest imported modules, and which heavy
+dependencies (pandas, selenium, easyocr/torch, langchain_core, ...) got loaded.
+Those must only be imported by the stage that uses them; the "import_time"
+thresholds section bounds import_ms and heavy_modules.
+"""
+from __future__ import annotations
+import argparse
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from bench_utils import ROOT, finish, load_thresholds, write_report
+
+HEAVY_MODULES = ('pandas', 'undetected_chromedriver', 'selenium', 'easyocr', 'torch', 'langchain_core',
+                 'elasticsearch', 'langdetect', 'langcodes', 'sentence_transformers', 'requests')
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_importtime(module: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """(wall seconds, [(module, self_us, cumulative_us)]) of one fresh `import module`."""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=str(ROOT), capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2))))
+    return wall, rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='src.LangChainPipelineAgent', help='module imported by the entry point')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with an "import_time" section')
+    args = parser.parse_args(argv)
+
+    baseline = min(run_importtime('sys')[0] for _ in range(args.repeat))
+    best_wall, best_rows, best_total = None, [], None
+    for _ in range(args.repeat):
+        try:
+            wall, rows = run_importtime(args.module)
+        except RuntimeError as e:
+            print(f"Import de {args.module} impossible: {e}")
+            return 1
+        total = next((cum for name, _, cum in rows if name == args.module), 0)
+        if best_total is None or total < best_total:
+            best_wall, best_rows, best_total = wall, rows, total
+
+    heavy = sorted({name.split('.')[0] for name, _, _ in best_rows if name.split('.')[0] in HEAVY_MODULES})
+    slowest = sorted(((name, cum) for name, _, cum in best_rows if name != args.module),
+                     key=lambda kv: kv[1], reverse=True)[:args.top]
+    results: Dict[str, object] = {
+        "module": args.module,
+        "import_ms": round(best_total / 1000, 1),
+        "startup_ms": round(best_wall * 1000, 1),
+        "interpreter_ms": round(baseline * 1000, 1),
+        "modules_imported": len(best_rows),
+        "heavy_modules": len(heavy),
+        "heavy_imported": heavy,
+        "slowest": {name: round(cum / 1000, 2) for name, cum in slowest},
+    }
+    print(f"{args.module}: import {results['import_ms']} ms, démarrage {results['startup_ms']} ms "
+          f"(interpréteur seul {results['interpreter_ms']} ms), {len(best_rows)} modules")
+    print(f"{'module':<40} {'cumul ms':>10}")
+    for name, ms in results["slowest"].items():
+        print(f"{name:<40} {ms:>10}")
+    if heavy:
+        print(f"Dépendances lourdes importées au démarrage: {', '.join(heavy)}")
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'import_time'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
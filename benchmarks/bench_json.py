@@ -0,0 +1,74 @@
+"""JSON artifact round-trip: stdlib pretty (previous behaviour) vs src.json_utils.
+
+    python benchmarks/bench_json.py --questions 500
+
+Writes and re-reads a form JSON with long OCR texts and reports ms per dump /
+load and the file size for each variant. json_utils rows use orjson when it is
+installed (see the 'backend' line) and the atomic temp-file + rename write.
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from bench_utils import measure, write_report
+import corpus
+from src import json_utils
+
+
+def form_with_ocr(n: int) -> dict:
+    rng = random.Random(3)
+    qs = corpus.questions(n, ocr_ratio=1.0)
+    for q in qs:
+        for img in q["images"]:
+            img["question_text"] = corpus.long_ocr_text(rng, 200)
+    return {"url": "https://forms.office.com/Pages/ResponsePage.aspx?id=bench", "contains_images": True, "questions": qs}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--min-time', type=float, default=0.5)
+    parser.add_argument('--report', default=None)
+    args = parser.parse_args(argv)
+
+    data = form_with_ocr(args.questions)
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix='forms_ai_json_') as tmp:
+        stdlib_path = Path(tmp) / 'stdlib.json'
+        fast_path = Path(tmp) / 'json_utils.json'
+
+        def stdlib_dump():
+            with open(stdlib_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+
+        def stdlib_load():
+            with open(stdlib_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        variants = {
+            "stdlib_pretty": (stdlib_dump, stdlib_load, stdlib_path),
+            "json_utils": (lambda: json_utils.dump(data, fast_path), lambda: json_utils.load(fast_path), fast_path),
+        }
+        print(f"backend: {json_utils.BACKEND}")
+        print(f"{'variant':<16} {'dump ms':>10} {'load ms':>10} {'size KB':>10}")
+        for name, (dump, load, path) in variants.items():
+            d = measure(dump, args.min_time)
+            ld = measure(load, args.min_time)
+            results[name] = {
+                "dump_ms": round(d["us_per_op"] / 1000, 2),
+                "load_ms": round(ld["us_per_op"] / 1000, 2),
+                "size_kb": round(path.stat().st_size / 1024, 1),
+            }
+            r = results[name]
+            print(f"{name:<16} {r['dump_ms']:>10} {r['load_ms']:>10} {r['size_kb']:>10}")
+    write_report(args.report, {"backend": json_utils.BACKEND, "questions": args.questions, "results": results})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
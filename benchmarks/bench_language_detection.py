@@ -0,0 +1,61 @@
+"""Compare language-detection backends and modes on a multilingual question corpus.
+
+    python benchmarks/bench_language_detection.py
+    $Env:FORMS_AI_LANG_MODEL = "models/lid.176.ftz"; python benchmarks/bench_language_detection.py
+
+Rows (questions/sec):
+    <backend> uncached     backend.detect on every question
+    <backend> lru          LanguageDetector.detect_language (LRU on normalized text)
+    <backend> per-form     LanguageDetector.detect_form_languages on 30-question forms
+fastText rows only appear when the `fasttext` package and a model file are available.
+"""
+from __future__ import annotations
+import argparse
+import sys
+from typing import Dict
+
+from bench_utils import cycler, measure, write_report
+import corpus
+
+FORM_SIZE = 30
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=0.5)
+    parser.add_argument('--questions', type=int, default=240, help='distinct questions in the corpus')
+    parser.add_argument('--report', default=None)
+    args = parser.parse_args(argv)
+
+    from src.TextLanguageDetectionAgent import LanguageDetector, make_backend
+
+    # Numbered questions: same wording recurs across forms with different numbering/casing
+    texts = [q["question_text"] for q in corpus.questions(args.questions)]
+    forms = [texts[i:i + FORM_SIZE] for i in range(0, len(texts), FORM_SIZE)]
+
+    results: Dict[str, float] = {}
+    print(f"{'mode':<26} {'questions/sec':>14}")
+    for name in ('langdetect', 'fasttext'):
+        backend = make_backend(name)
+        if backend.name != name:
+            print(f"{name:<26} {'(indisponible)':>14}")
+            continue
+        next_text = cycler(texts)
+        next_form = cycler(forms)
+        detector = LanguageDetector(backend=backend)
+        rows = {
+            f"{name} uncached": (lambda: backend.detect(next_text()[:400]), 1),
+            f"{name} lru": (lambda: detector.detect_language(next_text()[:400]), 1),
+            f"{name} per-form": (lambda: LanguageDetector(backend=backend).detect_form_languages(next_form()), FORM_SIZE),
+        }
+        for label, (fn, per_call) in rows.items():
+            r = measure(fn, args.min_time)
+            results[label] = round(r["ops_per_sec"] * per_call, 1)
+            print(f"{label:<26} {results[label]:>14,.1f}")
+
+    write_report(args.report, {"questions_per_sec": results})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
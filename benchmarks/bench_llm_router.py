@@ -0,0 +1,94 @@
+"""Load-balancing check for llm_router.LLMRouter against several fake Ollama hosts.
+
+    python benchmarks/bench_llm_router.py --hosts 3 --requests 120 --concurrency 6 --kill-after 40
+
+Starts N FakeOllama servers (the first serves the small model only, the others
+both models, latencies grow with the host index), routes choiceItem/npsContainer
+to the small model and textInput to the large one, and stops host #2 after
+--kill-after requests. Reports calls per host, failovers, fallback answers and
+throughput; exits 1 if any request ended with a fallback answer.
+"""
+from __future__ import annotations
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from bench_utils import Stopwatch, write_report
+from fake_services import FakeOllama
+import corpus
+
+SMALL, LARGE = 'qwen2.5:3b', 'deepseek-r1:8b'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=0.02, help='latency of host #1 (host k: k x latency)')
+    parser.add_argument('--kill-after', type=int, default=40, help='stop host #2 after this many requests (0 = never)')
+    parser.add_argument('--report', default=None)
+    args = parser.parse_args(argv)
+
+    from src.llm_router import LLMRouter
+    from src.metrics_utils import METRICS
+    from src.prompt_templates import get_template
+
+    servers = []
+    for k in range(args.hosts):
+        models = (SMALL,) if k == 0 else (SMALL, LARGE)
+        servers.append(FakeOllama(latency=args.latency * (k + 1), models=models).start())
+    urls = [s.url for s in servers]
+    METRICS.reset()
+    router = LLMRouter(urls, routes={'choiceItem': SMALL, 'npsContainer': SMALL, 'textInput': LARGE},
+                       default_model=LARGE, health_interval=0.5)
+    template = get_template()
+    qs = corpus.questions(args.requests)
+    done = {"n": 0}
+    lock = threading.Lock()
+    fallbacks = []
+
+    def one(q):
+        system, user = template.render('French', q['answer_type'], q['question_text'], q['answer_values'])
+        answer = router.ask_for(q['answer_type'])(user, timeout=10, system=system)
+        with lock:
+            done["n"] += 1
+            if answer.startswith('FALLBACK_'):
+                fallbacks.append(answer)
+            if args.kill_after and done["n"] == args.kill_after and len(servers) > 1:
+                print(f"-> arrêt de {urls[1]}")
+                threading.Thread(target=servers[1].stop, daemon=True).start()
+
+    try:
+        with Stopwatch() as sw, ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(one, qs))
+    finally:
+        for s in servers:
+            s.stop()
+
+    counters = METRICS.counters()
+    per_host: Dict[str, int] = {url: s.requests for url, s in zip(urls, servers)}
+    results = {
+        "requests": args.requests,
+        "requests_per_sec": round(args.requests / sw.elapsed, 1),
+        "fallbacks": len(fallbacks),
+        "failovers": counters.get('llm.backend_failover', 0),
+        "hosts_removed": counters.get('llm.backend_removed', 0),
+        "http_requests_per_host": per_host,
+        "routes": {k: n for k, n in counters.items() if k.startswith('llm.route.')},
+        "status": router.status(),
+    }
+    for key in ('requests_per_sec', 'fallbacks', 'failovers', 'hosts_removed'):
+        print(f"{key:<18} {results[key]}")
+    for url, n in per_host.items():
+        print(f"  {url:<28} {n} requêtes HTTP")
+    for route, n in results["routes"].items():
+        print(f"  {route:<28} {n}")
+    write_report(args.report, results)
+    return 1 if fallbacks else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
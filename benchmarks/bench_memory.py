@@ -0,0 +1,131 @@
+"""Peak memory against the number (and size) of forms, whole-form vs memory-bounded mode.
+
+    python benchmarks/bench_memory.py --forms 2,8 --questions 2000
+    python benchmarks/bench_memory.py --forms 10,50,200 --questions 400 --export-only --thresholds benchmarks/thresholds.json
+
+Each point runs in a fresh interpreter (peak RSS only grows) with
+FORMS_AI_QUESTION_CHUNK=0 ("full": whole forms in memory, as before) or
+FORMS_AI_LOW_MEMORY=1 ("bounded"). The child ingests synthetic scraped forms
+(benchmarks/corpus.py, long OCR texts) through the scraper's question spool
+into a temporary store, runs the validate step, then step_generate_answers
+against a fake Ollama (language detection stubbed, fake_services), which
+answers chunk by chunk and exports each form. The whole-form vs chunked
+difference is in that step, so it grows with the questions per form rather
+than the number of forms. --export-only skips the answers and only exports
+the forms: the gap then comes from the export alone and is much smaller.
+Reported: peak RSS and its growth over the RSS measured once the modules are
+imported.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from bench_utils import ROOT, finish, load_thresholds, write_report
+
+MODES = {
+    "full": {"FORMS_AI_LOW_MEMORY": "0", "FORMS_AI_QUESTION_CHUNK": "0"},
+    "bounded": {"FORMS_AI_LOW_MEMORY": "1"},
+}
+
+
+def child(forms: int, questions: int, answer: bool) -> Dict[str, float]:
+    workdir = Path(tempfile.mkdtemp(prefix='forms_ai_mem_'))
+    os.environ['FORMS_AI_OUTPUT_DIR'] = str(workdir)
+    os.environ.setdefault('FORMS_AI_LOG_LEVEL', 'ERROR')
+    import corpus
+    from src import memory_utils
+    from src import LangChainPipelineAgent as pipeline
+    from src.memory_utils import QuestionSpool
+
+    ollama = None
+    if answer:
+        from fake_services import FakeLanguageDetector, FakeOllama
+        from src import TextLanguageDetectionAgent
+        TextLanguageDetectionAgent.LanguageDetector = FakeLanguageDetector  # no langdetect profiles in the figures
+        ollama = FakeOllama().start()
+        os.environ['FORMS_AI_OLLAMA_HOST'] = ollama.url
+    baseline = memory_utils.rss_mb()
+    store = pipeline.get_store()
+    for i in range(1, forms + 1):
+        spool = QuestionSpool(memory_utils.QUESTION_CHUNK) if memory_utils.QUESTION_CHUNK else []
+        for q in corpus.questions(questions, seed=i):
+            spool.append(q)
+        store.upsert_form({"url": f"https://forms.example/{i}", "form_name": f"Bench {i}", "contains_images": False,
+                           "questions": spool}, status='scraped')
+        if isinstance(spool, QuestionSpool):
+            spool.close()
+        del spool
+    state = pipeline.step_validate_and_flag({})
+    if answer:
+        for row in store.iter_forms('scraped'):
+            store.set_status(row["id"], 'ocr_done')
+        state = pipeline.step_generate_answers(state)
+    else:
+        for row in store.iter_forms('scraped'):
+            store.export_json(row["id"], pipeline.JSON_DIR / pipeline.export_name(row),
+                              chunk_size=memory_utils.QUESTION_CHUNK)
+    if ollama is not None:
+        ollama.stop()
+    peak = memory_utils.peak_rss_mb()
+    return {"baseline_rss_mb": round(baseline, 1), "peak_rss_mb": round(peak, 1),
+            "growth_mb": round(peak - baseline, 1)}
+
+
+def run_point(mode: str, forms: int, questions: int, answer: bool) -> Dict[str, float]:
+    env = {**os.environ, **MODES[mode]}
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--child', str(forms), '--questions', str(questions)]
+    if not answer:
+        cmd.append('--export-only')
+    proc = subprocess.run(cmd, cwd=str(ROOT), env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forms', default='2,8', help='comma separated numbers of forms')
+    parser.add_argument('--questions', type=int, default=2000, help='questions per form')
+    parser.add_argument('--modes', default='full,bounded')
+    parser.add_argument('--export-only', action='store_true', help='skip the answer stage, only export the forms')
+    parser.add_argument('--child', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "memory" section')
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(child(args.child, args.questions, not args.export_only)))
+        return 0
+
+    counts = [int(n) for n in args.forms.split(',') if n.strip()]
+    modes = [m.strip() for m in args.modes.split(',') if m.strip() in MODES]
+    points: List[Dict[str, object]] = []
+    print(f"{'mode':<8} {'forms':>6} {'questions':>10} {'pic RSS MB':>11} {'croissance MB':>14}")
+    for forms in counts:
+        for mode in modes:
+            try:
+                point = run_point(mode, forms, args.questions, not args.export_only)
+            except RuntimeError as e:
+                print(f"{mode:<8} {forms:>6} échec: {e}")
+                return 1
+            points.append({"mode": mode, "forms": forms, **point})
+            print(f"{mode:<8} {forms:>6} {forms * args.questions:>10} {point['peak_rss_mb']:>11} {point['growth_mb']:>14}")
+
+    results: Dict[str, object] = {"questions_per_form": args.questions, "answer_stage": not args.export_only, "points": points}
+    for mode in modes:
+        growth = [p["growth_mb"] for p in points if p["mode"] == mode]
+        peak = [p["peak_rss_mb"] for p in points if p["mode"] == mode]
+        if growth:
+            results[mode] = {"max_growth_mb": max(growth), "max_peak_rss_mb": max(peak)}
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'memory'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Memory and per-question cost of the slotted model (src/models.py) against plain dicts.
+
+    python benchmarks/bench_models.py --questions 10000 --thresholds benchmarks/thresholds.json
+
+On a corpus of --questions scraped-style questions (benchmarks/corpus.py, 30 %
+with OCR text) it reports:
+  - memory held by the decoded questions (tracemalloc): dicts vs Question objects
+  - hot-loop time per question, i.e. what step_generate_answers reads for each
+    question (type, options, number, text + OCR), dict lookups vs attributes
+  - conversion cost of Question.from_dict / to_dict
+"""
+from __future__ import annotations
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import corpus
+from bench_utils import finish, load_thresholds, write_report
+from src import json_utils
+from src.models import Question
+
+
+def held_bytes(build) -> int:
+    """Bytes still allocated once build() returned (its result kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def dict_fields(q: Dict[str, Any], idx: int):
+    """What the answer loop derived from a question dict before the model existed."""
+    q_text = q.get("question_text", "")
+    if q.get("has_images") and q.get("images"):
+        for img in q.get("images", []):
+            if isinstance(img, dict) and img.get("question_text"):
+                q_text += f" | OCR: {img.get('question_text')}"
+    return q.get("question_number", idx), q.get("answer_type", "unknown"), q.get("answer_values", []), q_text
+
+
+def model_fields(q: Question, idx: int):
+    values = q.answer_values if q.answer_values is not None else []
+    return q.number(idx), q.answer_type or "unknown", values, q.full_text()
+
+
+def per_item_us(fn, items: List[Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for i, item in enumerate(items, 1):
+            fn(item, i)
+        best = min(best, time.perf_counter() - t0)
+    return round(best / len(items) * 1e6, 3)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "models" section')
+    args = parser.parse_args(argv)
+
+    payload = json_utils.dumps_bytes(corpus.questions(args.questions), pretty=False)
+    dict_bytes = held_bytes(lambda: json_utils.loads(payload))
+    model_bytes = held_bytes(lambda: [Question.from_dict(q) for q in json_utils.loads(payload)])
+
+    dicts = json_utils.loads(payload)
+    models = [Question.from_dict(q) for q in dicts]
+    assert [dict_fields(q, i) for i, q in enumerate(dicts, 1)] == [model_fields(q, i) for i, q in enumerate(models, 1)]
+    results: Dict[str, Any] = {
+        "questions": args.questions,
+        "memory_mb": {"dict": round(dict_bytes / 2**20, 2), "model": round(model_bytes / 2**20, 2)},
+        "memory_ratio": round(model_bytes / dict_bytes, 3) if dict_bytes else None,
+        "bytes_per_question": {"dict": dict_bytes // args.questions, "model": model_bytes // args.questions},
+        "us_per_question": {
+            "hot_loop_dict": per_item_us(dict_fields, dicts, args.repeat),
+            "hot_loop_model": per_item_us(model_fields, models, args.repeat),
+            "from_dict": per_item_us(lambda q, _: Question.from_dict(q), dicts, args.repeat),
+            "to_dict": per_item_us(lambda q, _: q.to_dict(), models, args.repeat),
+        },
+    }
+    us = results["us_per_question"]
+    print(f"{args.questions} questions")
+    print(f"Mémoire: dict {results['memory_mb']['dict']} MB | modèle {results['memory_mb']['model']} MB "
+          f"(x{results['memory_ratio']}, {results['bytes_per_question']['dict']} -> "
+          f"{results['bytes_per_question']['model']} octets/question)")
+    print(f"Boucle par question: dict {us['hot_loop_dict']} µs | modèle {us['hot_loop_model']} µs")
+    print(f"Conversion: from_dict {us['from_dict']} µs | to_dict {us['to_dict']} µs")
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'models'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Page-load time of the scraper with the default and the lean Chrome profile (src/chrome_profile.py).
+
+Needs Chrome + undetected_chromedriver (no Internet):
+
+    python benchmarks/bench_page_load.py --forms 5 --questions 10 --asset-latency 0.3
+    python benchmarks/bench_page_load.py --modes lean --profile-dir data/chrome-bench --report page_load.json
+
+The fake forms site serves pages that also pull a web font, a telemetry script,
+an analytics beacon and a banner image, each delayed by --asset-latency (CDN /
+third-party round trip). For each mode the scraper runs in a fresh interpreter
+(FORMS_AI_CHROME_LEAN=0 "default": normal load, old fixed 5 s wait;
+FORMS_AI_CHROME_LEAN=1 "lean") and the per-form navigate / page_wait /
+init_driver times are reported with the asset requests that reached the server.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from bench_utils import ROOT, finish, load_thresholds, stage_summary, write_report
+from fake_services import FakeFormsSite
+
+MODES = {
+    "default": {"FORMS_AI_CHROME_LEAN": "0"},
+    "lean": {"FORMS_AI_CHROME_LEAN": "1"},
+}
+
+
+def child(urls, workdir: str) -> Dict[str, Any]:
+    os.environ.setdefault('FORMS_AI_LOG_LEVEL', 'WARN')
+    from src import metrics_utils
+    from src.MicrosoftFormsCompleteAnalysisAgent import MicrosoftFormsCompleteScraper
+    walls = []
+    for url in urls:
+        scraper = MicrosoftFormsCompleteScraper(url, headless=True, images_folder=os.path.join(workdir, 'images'),
+                                                output_folder=os.path.join(workdir, 'jsons'))
+        t0 = time.perf_counter()
+        data = scraper.run()
+        walls.append(time.perf_counter() - t0)
+        if data.get("error"):
+            raise RuntimeError(data["error"])
+    stages = stage_summary(metrics_utils.METRICS.to_dict())
+    return {"form_s": round(sum(walls) / len(walls), 3),
+            "stages": {k: v for k, v in stages.items() if k in ('scrape.init_driver', 'scrape.navigate', 'scrape.page_wait')}}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forms', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--images', type=int, default=0, help='images per question')
+    parser.add_argument('--asset-latency', type=float, default=0.3)
+    parser.add_argument('--modes', default='default,lean')
+    parser.add_argument('--profile-dir', default='', help='FORMS_AI_CHROME_PROFILE for the lean mode (warm cache)')
+    parser.add_argument('--workdir', default=str(ROOT / 'data' / 'bench_page_load'))
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "page_load" section')
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(child(json.loads(args.child), args.workdir)))
+        return 0
+
+    results: Dict[str, Any] = {"config": {k: v for k, v in vars(args).items() if k != 'child'}, "modes": {}}
+    with FakeFormsSite(args.questions, args.images, assets=True, asset_latency=args.asset_latency) as site:
+        urls = [site.form_url(f"page-load-{i}") for i in range(1, args.forms + 1)]
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip() in MODES]:
+            env = {**os.environ, **MODES[mode]}
+            if mode == 'lean' and args.profile_dir:
+                env['FORMS_AI_CHROME_PROFILE'] = args.profile_dir
+            site.asset_requests = {}
+            cmd = [sys.executable, str(Path(__file__).resolve()), '--child', json.dumps(urls), '--workdir', args.workdir]
+            proc = subprocess.run(cmd, cwd=str(ROOT), env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{mode}: échec: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+                return 1
+            point = json.loads(proc.stdout.strip().splitlines()[-1])
+            point["asset_requests"] = dict(site.asset_requests)
+            results["modes"][mode] = point
+
+    print(f"{'mode':<8} {'form s':>8} {'init p50':>9} {'navigate p50':>13} {'page_wait p50':>14}  requêtes assets")
+    for mode, point in results["modes"].items():
+        st = point["stages"]
+        cell = lambda name: st.get(name, {}).get('p50_s', 0.0)
+        print(f"{mode:<8} {point['form_s']:>8} {cell('scrape.init_driver'):>9} {cell('scrape.navigate'):>13} "
+              f"{cell('scrape.page_wait'):>14}  {point['asset_requests']}")
+    modes = results["modes"]
+    if 'default' in modes and 'lean' in modes and modes['lean']['form_s']:
+        results["speedup"] = round(modes['default']['form_s'] / modes['lean']['form_s'], 2)
+        print(f"Gain par formulaire: x{results['speedup']}")
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'page_load'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
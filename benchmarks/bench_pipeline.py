@@ -0,0 +1,83 @@
+"""End-to-end offline benchmark: drives run_pipeline() against local fake services.
+
+Needs the normal runtime (Chrome + undetected_chromedriver, langchain, pandas, ...)
+but no Internet, no Ollama and no Elasticsearch.
+
+    python benchmarks/bench_pipeline.py --forms 3 --questions 12 --images 1 --llm-latency 0.05 \
+        --report bench_output.json --thresholds benchmarks/thresholds.json
+
+Reports forms/min, per-stage latency (from metrics_utils) and peak RSS of the
+process tree; exits 1 when a threshold of the "pipeline" section is violated.
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from bench_utils import PeakRSS, Stopwatch, finish, load_thresholds, stage_summary, write_report
+from fake_services import FakeElasticsearch, FakeFormsSite, FakeOllama
+
+
+def write_links_excel(path: Path, links) -> None:
+    import pandas as pd
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(links, columns=['Form Name', 'Link']).to_excel(path, index=False)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forms', type=int, default=3)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--images', type=int, default=0, help='images per question')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds per fake Ollama call')
+    parser.add_argument('--workdir', default=None, help='keep artifacts here instead of a temp dir')
+    parser.add_argument('--report', default=None, help='write JSON results to this path')
+    parser.add_argument('--thresholds', default=None, help='JSON file with a "pipeline" section')
+    args = parser.parse_args(argv)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='forms_ai_bench_'))
+    with FakeFormsSite(args.questions, args.images) as site, \
+            FakeOllama(latency=args.llm_latency) as ollama, \
+            FakeElasticsearch() as es:
+        links = [(f"Bench form {i}", site.form_url(f"bench-{i}")) for i in range(1, args.forms + 1)]
+        write_links_excel(workdir / 'input' / 'forms.xlsx', links)
+        os.environ['FORMS_AI_INPUT_DIR'] = str(workdir / 'input')
+        os.environ['FORMS_AI_OUTPUT_DIR'] = str(workdir / 'output')
+        os.environ['FORMS_AI_OLLAMA_HOST'] = ollama.url
+        os.environ['FORMS_AI_ES_HOST'] = es.url
+
+        # Import only now: output folders are resolved from the env at import time
+        from src import metrics_utils
+        from src.LangChainPipelineAgent import run_pipeline
+
+        with PeakRSS() as rss, Stopwatch() as sw:
+            result = run_pipeline()
+
+        metrics = metrics_utils.METRICS.to_dict()
+        forms_done = len(result.get('final_json_files', []))
+        results = {
+            'config': vars(args),
+            'forms': args.forms,
+            'forms_completed': forms_done,
+            'questions_per_form': args.questions,
+            'elapsed_s': round(sw.elapsed, 3),
+            'forms_per_min': round(forms_done / sw.elapsed * 60, 3) if sw.elapsed else 0.0,
+            'peak_rss_mb': rss.peak_mb,
+            'llm_requests': ollama.requests,
+            'es_documents': len(es.documents),
+            'stages': stage_summary(metrics),
+        }
+
+    print(f"Formulaires: {forms_done}/{args.forms} en {results['elapsed_s']}s -> {results['forms_per_min']} forms/min")
+    print(f"Pic RSS: {results['peak_rss_mb']} MB | requêtes LLM: {results['llm_requests']} | docs ES: {results['es_documents']}")
+    print(f"{'stage':<28} {'calls':>6} {'total s':>9} {'mean s':>8} {'p90 s':>8}")
+    for name, s in sorted(results['stages'].items()):
+        print(f"{name:<28} {s['calls']:>6} {s['total_s']:>9.3f} {s['mean_s']:>8.3f} {s['p90_s']:>8.3f}")
+    write_report(args.report, results)
+    return finish(results, load_thresholds(args.thresholds, 'pipeline'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Token-count report per prompt template (prompt-eval cost and prefix reuse).
+
+    python benchmarks/bench_prompt_templates.py
+    python benchmarks/bench_prompt_templates.py --host http://127.0.0.1:11434   # real prompt_eval_count
+
+Per template, over 30-question forms of corpus.py:
+    system      tokens of the fixed system message (cached by Ollama after the first call)
+    user        mean tokens of the per-question part
+    total       mean tokens sent per question
+    shared      mean prefix (tokens) identical to the previous question of the form
+    uncached    total - shared: tokens Ollama must evaluate per question with KV-cache reuse
+Counts are estimate_tokens() approximations unless --host is given, in which case
+the model's prompt_eval_count / prompt_eval_duration are reported as well.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from statistics import mean
+from typing import Dict, List, Optional
+
+from bench_utils import write_report
+import corpus
+
+FORM_SIZE = 30
+
+
+def shared_prefix(a: str, b: str) -> str:
+    return os.path.commonprefix([a, b])
+
+
+def template_report(template, forms: List[List[dict]], estimate_tokens) -> Dict[str, float]:
+    totals, users, shared = [], [], []
+    for form in forms:
+        previous: Optional[str] = None
+        for q in form:
+            system, user = template.render("French", q["answer_type"], q["question_text"], q["answer_values"])
+            # What the model sees, in order: system message then user message
+            full = (system or '') + '\n' + user
+            totals.append(estimate_tokens(full))
+            users.append(estimate_tokens(user))
+            shared.append(estimate_tokens(shared_prefix(previous, full)) if previous is not None else 0)
+            previous = full
+    system_tokens = estimate_tokens(template.system or '')
+    return {
+        "system": system_tokens,
+        "user": round(mean(users), 1),
+        "total": round(mean(totals), 1),
+        "shared": round(mean(shared), 1),
+        "uncached": round(mean(totals) - mean(shared), 1),
+    }
+
+
+def measure_host(host: str, template, questions: List[dict]) -> Dict[str, float]:
+    """Ask for a single token per question and read the server-side prompt counters."""
+    from src.LlamaLanguageModelAgent import OllamaAgent
+    agent = OllamaAgent(host=host)
+    counts, durations = [], []
+    for q in questions:
+        system, user = template.render("French", q["answer_type"], q["question_text"], q["answer_values"])
+        path, payload = agent._request(user, stream=False, think=False, system=system)
+        payload["options"] = {"num_predict": 1}
+        with agent._post_json(path, payload, 120) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        counts.append(body.get('prompt_eval_count', 0))
+        durations.append(body.get('prompt_eval_duration', 0) / 1e6)
+    return {"prompt_eval_count": round(mean(counts), 1), "prompt_eval_ms": round(mean(durations), 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=120)
+    parser.add_argument('--host', default=None, help='Ollama URL for real prompt_eval counters')
+    parser.add_argument('--report', default=None)
+    args = parser.parse_args(argv)
+
+    from src.prompt_templates import TEMPLATES, estimate_tokens
+
+    qs = corpus.questions(args.questions)
+    forms = [qs[i:i + FORM_SIZE] for i in range(0, len(qs), FORM_SIZE)]
+    results: Dict[str, Dict[str, float]] = {}
+    cols = ("system", "user", "total", "shared", "uncached")
+    print(f"{'template':<12}" + ''.join(f"{c:>10}" for c in cols))
+    for key, template in TEMPLATES.items():
+        row = template_report(template, forms, estimate_tokens)
+        if args.host:
+            row.update(measure_host(args.host, template, qs))
+        results[key] = row
+        print(f"{key:<12}" + ''.join(f"{row[c]:>10}" for c in cols)
+              + (f"   eval={row['prompt_eval_count']} tok / {row['prompt_eval_ms']} ms" if args.host else ''))
+
+    write_report(args.report, {"tokens_per_question": results})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Shared helpers for the benchmark scripts: peak RSS sampling, reports, regression thresholds."""
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _tree_rss_bytes() -> int:
+    """RSS of this process and all its children (Chrome, chromedriver...)."""
+    if psutil is None:
+        return 0
+    try:
+        proc = psutil.Process(os.getpid())
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    except psutil.Error:
+        return 0
+
+
+class PeakRSS:
+    """Sample process-tree RSS in a background thread; exposes peak_mb after the block.
+
+    Without psutil falls back to ru_maxrss (self + reaped children, Linux/macOS only).
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, _tree_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        elif resource is not None:
+            scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is KB on Linux
+            own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+            self.peak_bytes = own + children
+        return False
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_bytes / (1024 * 1024), 1)
+
+
+def stage_summary(metrics: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Reduce metrics_utils.METRICS.to_dict() to {stage: {calls, total, mean, p50, p90}}."""
+    out = {}
+    for name, s in metrics.get('stages', {}).items():
+        wall = s['wall_seconds']
+        out[name] = {
+            'calls': s['calls'],
+            'total_s': round(wall['sum'], 4),
+            'mean_s': round(wall['mean'], 4),
+            'p50_s': round(wall['p50'], 4),
+            'p90_s': round(wall['p90'], 4),
+        }
+    return out
+
+
+def lookup(results: Dict[str, Any], dotted: str) -> Any:
+    """Resolve 'stages/llm.ask/p90_s' style keys (slash separated)."""
+    cur: Any = results
+    for part in dotted.split('/'):
+        if not isinstance(cur, dict) or part not in cur:
+            return None
+        cur = cur[part]
+    return cur
+
+
+def check_thresholds(results: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """thresholds: {"forms_per_min": {"min": 2}, "peak_rss_mb": {"max": 1500}} -> list of failures."""
+    failures = []
+    for key, bounds in thresholds.items():
+        value = lookup(results, key)
+        if value is None:
+            continue
+        if 'min' in bounds and value < bounds['min']:
+            failures.append(f"{key}={value} < min {bounds['min']}")
+        if 'max' in bounds and value > bounds['max']:
+            failures.append(f"{key}={value} > max {bounds['max']}")
+    return failures
+
+
+def load_thresholds(path: Optional[str], section: str) -> Dict[str, Dict[str, float]]:
+    if not path:
+        return {}
+    from src import json_utils
+    return json_utils.load(path).get(section, {})
+
+
+def write_report(path: Optional[str], results: Dict[str, Any]) -> None:
+    if not path:
+        return
+    from src import json_utils
+    json_utils.dump(results, path, pretty=True)
+    print(f"Rapport: {path}")
+
+
+def finish(results: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> int:
+    """Print threshold verdict and return the process exit code."""
+    failures = check_thresholds(results, thresholds)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if thresholds and not failures:
+        print("Seuils respectés")
+    return 1 if failures else 0
+
+
+class Stopwatch:
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.t0
+        return False
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.5, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-*repeat* ops/sec, each run looping until *min_time* elapsed."""
+    fn()  # warm-up (imports, caches)
+    best = 0.0
+    per_op = []
+    for _ in range(repeat):
+        n = 0
+        t0 = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            fn()
+            n += 1
+            elapsed = time.perf_counter() - t0
+        best = max(best, n / elapsed)
+        per_op.append(elapsed / n)
+    return {"ops_per_sec": round(best, 1), "us_per_op": round(min(per_op) * 1e6, 2)}
+
+
+def cycler(items: List) -> Callable[[], object]:
+    state = {"i": 0}
+
+    def nxt():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+    return nxt
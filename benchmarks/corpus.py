@@ -0,0 +1,107 @@
+"""Synthetic but realistic inputs for the micro-benchmarks."""
+from __future__ import annotations
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+import bench_utils  # noqa: F401  (puts the repo root on sys.path)
+from src import json_utils
+from src.ocr_layout import OcrLayout
+
+MULTILINGUAL_QUESTIONS = [
+    ("Welche der folgenden Aussagen über die Shengsi-Inseln im Ostchinesischen Meer ist richtig?", "choiceItem"),
+    ("Quelle est la principale cause de l'érosion des côtes atlantiques en Bretagne ?", "choiceItem"),
+    ("How likely are you to recommend this training session to a colleague?", "npsContainer"),
+    ("¿Cuál es el río más largo que atraviesa la península ibérica?", "choiceItem"),
+    ("Qual è il ruolo principale del Parlamento europeo nel processo legislativo?", "textInput"),
+    ("Décrivez en quelques mots l'intérêt principal de la solution proposée.", "textInput"),
+    ("Stimmen Sie der Verarbeitung Ihrer personenbezogenen Daten zu?", "choiceItem"),
+    ("Which statement best describes the graph shown in the image above?", "choiceItem"),
+]
+
+OCR_FRAGMENTS = [
+    "Figure 3 - Evolution du chiffre d'affaires 2019-2024 (en millions d'euros)",
+    "Quelle: Statistisches Bundesamt, Wiesbaden 2023",
+    "Tableau comparatif des offres A, B et C selon le prix, la durée et le support",
+    "Note: values are rounded to the nearest integer; totals may differ",
+    "l|l 1l I1 ;; ,. --",
+    "Fuente: Instituto Nacional de Estadística (INE)",
+    "TOTAL 12 450 13 980 15 210 16 004",
+]
+
+RAW_OUTPUTS = [
+    '{"answer":"Option B","justification":"The text states the islands lie in the East China Sea."}',
+    '<think>\nThe question asks about the islands. Option A mentions... Option B fits {maybe}. Let me check.\n</think>\n{"answer":"Option B","justification":"Matches the question."}',
+    'Thinking...\nLet me reason about the options one by one. ' + 'Reasoning step. ' * 200 + '\n...done thinking.\n\n{"answer":"Paris","justification":"Capitale de la France."}',
+    '```json\n{"answer": "9", "justification": "Très satisfait de la formation."}\n```',
+    'Option C. Because the chart shows a steady increase over five years and the other options contradict it.',
+    '{"answer":"Oui","justification":"Consentement explicite demandé"',
+    '',
+]
+
+
+def long_ocr_text(rng: random.Random, lines: int = 60, sep: str = ' ') -> str:
+    return sep.join(rng.choice(OCR_FRAGMENTS) for _ in range(lines))
+
+
+def readtext_results(rng: random.Random, lines: int = 60) -> List[tuple]:
+    """easyocr readtext()-shaped output: (4 corner points, text, confidence), two fragments per row."""
+    out = []
+    for i in range(lines):
+        text = rng.choice(OCR_FRAGMENTS)
+        x, y = (i % 2) * 640 + rng.randint(0, 20), (i // 2) * 36 + rng.randint(0, 6)
+        w = 9 * len(text)
+        conf = rng.uniform(0.02, 0.3) if text == OCR_FRAGMENTS[4] else rng.uniform(0.45, 0.99)
+        out.append(([[x, y], [x + w, y], [x + w, y + 28], [x, y + 28]], text, conf))
+    rng.shuffle(out)
+    return out
+
+
+def questions(n: int, seed: int = 7, ocr_ratio: float = 0.3, ocr_sep: str = ' ',
+              layout: bool = False) -> List[Dict[str, Any]]:
+    """n scraped-style question dicts; ocr_ratio of them carry an image with OCR text
+    (fragments joined by ocr_sep; the OCR step writes one fragment per line).
+    layout: the image also has its ocr_lines record, as the OCR step writes it."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(1, n + 1):
+        text, qtype = MULTILINGUAL_QUESTIONS[(i - 1) % len(MULTILINGUAL_QUESTIONS)]
+        if qtype == 'choiceItem':
+            values: Any = [f"Option {c}" for c in 'ABCD']
+        elif qtype == 'npsContainer':
+            values = [str(k) for k in range(11)]
+        else:
+            values = "Input text"
+        images = []
+        if rng.random() < ocr_ratio:
+            images.append({
+                "image_number": 1,
+                "filename": f"question_{i}_image_1.jpg",
+                "filepath": f"data/output/images/question_{i}_image_1.jpg",
+                "question_text": long_ocr_text(rng, rng.randint(5, 60), ocr_sep),
+            })
+            if layout:
+                ocr = OcrLayout.from_readtext(readtext_results(rng, rng.randint(5, 60)))
+                images[-1].update(question_text=ocr.text(0.3), ocr_lines=ocr.to_dict())
+        out.append({
+            "question_number": i,
+            "question_text": f"{i}. {text}",
+            "has_text": True,
+            "has_images": bool(images),
+            "images_count": len(images),
+            "images": images,
+            "answer_type": qtype,
+            "answer_values": values,
+            "scraped_at": "2025-08-20T22:26:46",
+        })
+    return out
+
+
+def write_form_json(path: Path, n: int, seed: int = 7) -> Path:
+    data = {
+        "url": "https://forms.office.com/Pages/ResponsePage.aspx?id=bench",
+        "form_name": "Bench form",
+        "contains_images": True,
+        "questions": questions(n, seed),
+    }
+    return json_utils.dump(data, path)
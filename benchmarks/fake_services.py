@@ -0,0 +1,342 @@
+"""Local stand-ins for the external services used by the pipeline.
+
+- FakeFormsSite:        synthetic Microsoft-Forms-like pages (same data-automation-id
+                        structure the scraper relies on) + tiny PNG images.
+- FakeOllama:           /api/generate, /api/chat, /api/tags with configurable latency.
+- FakeElasticsearch:    ping + document indexing, counts received documents.
+- FakeLanguageDetector: in-process LanguageDetector stand-in (no langdetect / langcodes).
+
+Each server runs in a daemon thread on 127.0.0.1 with a free port:
+
+    with FakeOllama(latency=0.2) as ollama:
+        os.environ['FORMS_AI_OLLAMA_HOST'] = ollama.url
+"""
+from __future__ import annotations
+import base64
+import html
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# 1x1 transparent PNG
+PNG_PIXEL = base64.b64decode(
+    b'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+
+QUESTION_TEXTS = [
+    "Welche Farbe hat der Himmel an einem klaren Tag?",
+    "Quelle est la capitale de la France ?",
+    "How likely are you to recommend our service to a colleague?",
+    "¿Cuántos continentes hay en el mundo?",
+    "Describe briefly the main advantage of the proposed solution.",
+    "Do you agree to the processing of your personal data?",
+]
+
+
+class _Server:
+    """Base class: ThreadingHTTPServer in a daemon thread, usable as context manager."""
+
+    handler_cls = BaseHTTPRequestHandler
+
+    def __init__(self):
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_Server":
+        owner = self
+
+        class Handler(self.handler_cls):
+            server_owner = owner
+
+            def log_message(self, format, *args):
+                return
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def _send(handler: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str, extra: Optional[Dict[str, str]] = None) -> None:
+    handler.send_response(status)
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Content-Length', str(len(body)))
+    for k, v in (extra or {}).items():
+        handler.send_header(k, v)
+    handler.end_headers()
+    if handler.command != 'HEAD':
+        handler.wfile.write(body)
+
+
+# ---------------------------------------------------------------- Forms site
+
+# What a real form page pulls besides its HTML: web font, telemetry script, analytics beacon, banner
+ASSETS_HEAD = ('<style>@font-face{{font-family:FormsFont;src:url({base}/font/forms.woff2) format("woff2")}}'
+               'body{{font-family:FormsFont,sans-serif}}</style>'
+               '<script src="{base}/telemetry/collect.js"></script>')
+ASSETS_BODY = '<img src="{base}/analytics/pixel.gif" alt=""/><img src="{base}/img/banner.png" alt="banner"/>'
+
+
+def render_form_page(base_url: str, form_id: str, questions: int, images_per_question: int, options: int = 4,
+                     assets: bool = False) -> str:
+    """Build one synthetic form page. Question types rotate choiceItem / npsContainer / textInput.
+    assets: also reference a web font, a telemetry script and tracking/banner images."""
+    items: List[str] = []
+    for i in range(1, questions + 1):
+        text = html.escape(f"{i}. {QUESTION_TEXTS[(i - 1) % len(QUESTION_TEXTS)]}")
+        imgs = ''.join(
+            f'<img src="{base_url}/img/{form_id}_{i}_{j}.png" alt="q{i} image {j}"/>'
+            for j in range(1, images_per_question + 1)
+        )
+        kind = i % 3
+        if kind == 1:
+            body = ''.join(
+                f'<div data-automation-id="choiceItem"><span>Option {chr(64 + k)}</span></div>'
+                for k in range(1, options + 1)
+            )
+        elif kind == 2:
+            cells = ''.join(f'<td><span>{n}</span></td>' for n in range(0, 11))
+            body = f'<div data-automation-id="npsContainer"><table><tbody><tr>{cells}</tr></tbody></table></div>'
+        else:
+            body = '<input data-automation-id="textInput" type="text"/>'
+        items.append(
+            f'<div data-automation-id="questionItem">'
+            f'<div class="question-title"><span class="text-format-content">{text}</span></div>'
+            f'{imgs}{body}</div>'
+        )
+    head = ASSETS_HEAD.format(base=base_url) if assets else ''
+    tail = ASSETS_BODY.format(base=base_url) if assets else ''
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fake Form</title>{head}</head><body>'
+        f'<div id="question-list">{"".join(items)}</div>{tail}</body></html>'
+    )
+
+
+_ASSETS = (
+    ('/img/', 'image/png', PNG_PIXEL),
+    ('/font/', 'font/woff2', b'\0' * 2048),
+    ('/telemetry/', 'application/javascript', b'window.__telemetry = true;'),
+    ('/analytics/', 'image/gif', PNG_PIXEL),
+)
+
+
+class _FormsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        owner: FakeFormsSite = self.server_owner
+        owner.count()
+        parsed = urlparse(self.path)
+        for prefix, content_type, body in _ASSETS:
+            if parsed.path.startswith(prefix):
+                owner.count_asset(prefix)
+                if owner.asset_latency:
+                    time.sleep(owner.asset_latency)
+                _send(self, 200, body, content_type)
+                return
+        m = re.match(r'^/form/([\w-]+)$', parsed.path)
+        if not m:
+            _send(self, 404, b'not found', 'text/plain')
+            return
+        qs = parse_qs(parsed.query)
+        questions = int(qs.get('questions', [owner.questions])[0])
+        images = int(qs.get('images', [owner.images_per_question])[0])
+        page = render_form_page(owner.url, m.group(1), questions, images, owner.options, owner.assets)
+        _send(self, 200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+
+class FakeFormsSite(_Server):
+    handler_cls = _FormsHandler
+
+    def __init__(self, questions: int = 10, images_per_question: int = 0, options: int = 4,
+                 assets: bool = False, asset_latency: float = 0.0):
+        super().__init__()
+        self.questions = questions
+        self.images_per_question = images_per_question
+        self.options = options
+        self.assets = assets
+        self.asset_latency = asset_latency  # seconds per font/script/image response (CDN, third party)
+        self.asset_requests: Dict[str, int] = {}
+
+    def count_asset(self, prefix: str) -> None:
+        with self._lock:
+            self.asset_requests[prefix] = self.asset_requests.get(prefix, 0) + 1
+
+    def form_url(self, form_id: str, questions: Optional[int] = None, images: Optional[int] = None) -> str:
+        query = []
+        if questions is not None:
+            query.append(f"questions={questions}")
+        if images is not None:
+            query.append(f"images={images}")
+        return f"{self.url}/form/{form_id}" + (f"?{'&'.join(query)}" if query else '')
+
+
+# ---------------------------------------------------------------- Ollama stub
+
+def fake_answer(prompt: str) -> str:
+    """Pick the first option listed in the prompt (or a canned sentence) as a JSON answer."""
+    m = re.search(r'^Options:\s*(.*)$', prompt, re.MULTILINE)
+    first = ''
+    if m:
+        first = m.group(1).split(' | ')[0].strip()
+    if not first or first == 'Input text':
+        first = 'Réponse synthétique'
+    return json.dumps({"answer": first, "justification": "Synthetic benchmark answer."}, ensure_ascii=False)
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', '0') or 0)
+        raw = self.rfile.read(length) if length else b'{}'
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except Exception:
+            return {}
+
+    def do_GET(self):
+        owner: FakeOllama = self.server_owner
+        owner.count()
+        if self.path.startswith('/api/tags'):
+            body = json.dumps({"models": [{"name": m} for m in owner.models]}).encode('utf-8')
+            _send(self, 200, body, 'application/json')
+        else:
+            _send(self, 200, b'Ollama is running', 'text/plain')
+
+    def do_POST(self):
+        owner: FakeOllama = self.server_owner
+        owner.count()
+        payload = self._read_json()
+        path = urlparse(self.path).path
+        if path == '/api/chat':
+            messages = payload.get('messages') or []
+            prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+        else:
+            prompt = str(payload.get('prompt', ''))
+        owner.prompts.append(len(prompt))
+        text = owner.responder(prompt)
+        if owner.latency:
+            time.sleep(owner.latency)
+        if payload.get('stream', True):
+            self._stream(path, text, payload.get('model', ''))
+            return
+        if path == '/api/chat':
+            body = {"model": payload.get('model', ''), "message": {"role": "assistant", "content": text}, "done": True}
+        else:
+            body = {"model": payload.get('model', ''), "response": text, "done": True}
+        body["prompt_eval_count"] = len(re.findall(r"\w+|[^\w\s]", prompt))  # rough, like estimate_tokens
+        body["prompt_eval_duration"] = 0
+        _send(self, 200, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _stream(self, path: str, text: str, model: str) -> None:
+        owner: FakeOllama = self.server_owner
+        # HTTP/1.0 style: no Content-Length, body ends when the connection closes
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        tokens = re.findall(r'\S+\s*', text) or ['']
+        try:
+            for tok in tokens:
+                if owner.token_delay:
+                    time.sleep(owner.token_delay)
+                if path == '/api/chat':
+                    chunk = {"model": model, "message": {"role": "assistant", "content": tok}, "done": False}
+                else:
+                    chunk = {"model": model, "response": tok, "done": False}
+                self.wfile.write((json.dumps(chunk, ensure_ascii=False) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write((json.dumps({"model": model, "done": True}) + '\n').encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client stopped early
+
+
+class FakeOllama(_Server):
+    handler_cls = _OllamaHandler
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0, responder=fake_answer, models=('deepseek-r1:8b',)):
+        super().__init__()
+        self.latency = latency
+        self.token_delay = token_delay
+        self.responder = responder
+        self.models = list(models)
+        self.prompts: List[int] = []
+
+
+# ---------------------------------------------------------------- language detection stub
+
+class FakeLanguageDetector:
+    """Same interface as TextLanguageDetectionAgent.LanguageDetector, every text in *language*."""
+
+    def __init__(self, language: str = 'English'):
+        self.language = language
+
+    def detect_language(self, text: str) -> str:
+        return self.language
+
+    def detect_form_languages(self, texts: List[str], default: str = "Unknown") -> List[str]:
+        return [self.language if text else default for text in texts]
+
+
+# ---------------------------------------------------------------- Elasticsearch stub
+
+class _ElasticHandler(BaseHTTPRequestHandler):
+    HEADERS = {'X-Elastic-Product': 'Elasticsearch'}
+
+    def _json(self, status: int, body: dict) -> None:
+        _send(self, status, json.dumps(body).encode('utf-8'), 'application/json', self.HEADERS)
+
+    def do_HEAD(self):
+        self.server_owner.count()
+        _send(self, 200, b'', 'application/json', self.HEADERS)
+
+    def do_GET(self):
+        self.server_owner.count()
+        self._json(200, {"name": "fake-es", "cluster_name": "bench", "version": {"number": "8.11.0"}, "tagline": "You Know, for Search"})
+
+    def _index(self):
+        owner: FakeElasticsearch = self.server_owner
+        owner.count()
+        length = int(self.headers.get('Content-Length', '0') or 0)
+        raw = self.rfile.read(length) if length else b''
+        index = urlparse(self.path).path.strip('/').split('/')[0]
+        with owner._lock:
+            owner.documents.append((index, len(raw)))
+            doc_id = str(len(owner.documents))
+        self._json(201, {"_index": index, "_id": doc_id, "_version": 1, "result": "created",
+                         "_shards": {"total": 1, "successful": 1, "failed": 0}})
+
+    do_POST = _index
+    do_PUT = _index
+
+
+class FakeElasticsearch(_Server):
+    handler_cls = _ElasticHandler
+
+    def __init__(self):
+        super().__init__()
+        self.documents: List[tuple] = []
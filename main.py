@@ -1,4 +1,6 @@
-from src.LangChainPipelineAgent import run_pipeline
+import sys
+
+from src.cli import main
 
 if __name__ == "__main__":
-    run_pipeline()
+    sys.exit(main())
@@ -1,24 +1,23 @@
-import json
+import importlib.util
+import os
 from typing import List, Dict, Any, Optional
 
-try:
-    from elasticsearch import Elasticsearch, exceptions as es_exceptions
-    ELASTICSEARCH_AVAILABLE = True
-except ImportError:
-    ELASTICSEARCH_AVAILABLE = False
+# The client is only imported when an agent is created
+ELASTICSEARCH_AVAILABLE = importlib.util.find_spec('elasticsearch') is not None
 
 class ElasticsearchUploaderAgent:
     """
     Agent pour uploader les réponses, justifications et questions dans Elasticsearch.
     Chaque document contient : nom_formulaire, questions, réponses, justifications.
     """
-    def __init__(self, es_host: str = 'http://localhost:9200', index_name: str = 'forms_ai'):
-        self.es_host = es_host
+    def __init__(self, es_host: Optional[str] = None, index_name: str = 'forms_ai'):
+        self.es_host = es_host or os.getenv('FORMS_AI_ES_HOST', 'http://localhost:9200')
         self.index_name = index_name
-        self.client: Optional[Elasticsearch] = None
+        self.client: Optional[Any] = None
         self.available = ELASTICSEARCH_AVAILABLE
         if self.available:
             try:
+                from elasticsearch import Elasticsearch
                 self.client = Elasticsearch([self.es_host])
                 # Test connexion
                 if not self.client.ping():
@@ -41,6 +40,7 @@ class ElasticsearchUploaderAgent:
         }
         if meta:
             doc.update(meta)
+        from elasticsearch import exceptions as es_exceptions
         try:
             res = self.client.index(index=self.index_name, document=doc)
             print(f"[ELASTIC] Document indexé: {res.get('result','?')}")
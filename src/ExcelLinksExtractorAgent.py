@@ -1,4 +1,3 @@
-import pandas as pd
 from pathlib import Path
 from typing import List, Optional
 
@@ -16,6 +15,7 @@ def get_links_list(data_path: Optional[str] = None) -> List[tuple]:
         return []
     file_path = excel_files[0]
     try:
+        import pandas as pd  # heavy: only needed when links are actually read
         df = pd.read_excel(file_path)
         if df.shape[1] < 2:
             print("Le fichier ne contient pas au moins deux colonnes.")
@@ -1,16 +1,16 @@
 import os
-import json
 import glob
+import importlib.util
 from pathlib import Path
 from datetime import datetime
 
-try:
-    import easyocr
-    OCR_AVAILABLE = True
-    print("EasyOCR disponible")
-except ImportError:
-    OCR_AVAILABLE = False
-    print("EasyOCR non disponible. Installez avec: pip install easyocr")
+from . import json_utils
+from .metrics_utils import timed, count
+from .context_builder import OCR_MIN_CONFIDENCE
+from .ocr_layout import OcrLayout
+
+# easyocr (and torch behind it) is only imported when an agent is created
+OCR_AVAILABLE = importlib.util.find_spec('easyocr') is not None
 
 class FormsImageExtractionAgent:
     def __init__(self, json_folder_path=None):
@@ -22,7 +22,9 @@ class FormsImageExtractionAgent:
         self.base_path = Path(r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI")
         
         if OCR_AVAILABLE:
-            self.ocr_reader = easyocr.Reader(['en', 'fr', 'de', 'es', 'it'])
+            with timed('ocr.reader_init'):
+                import easyocr
+                self.ocr_reader = easyocr.Reader(['en', 'fr', 'de', 'es', 'it'])
             print("OCR Reader initialisé avec support multi-langues")
         else:
             self.ocr_reader = None
@@ -44,8 +46,7 @@ class FormsImageExtractionAgent:
     
     def load_json_file(self, json_file_path):
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json_utils.load(json_file_path)
             print(f"JSON chargé: {json_file_path.name}")
             return data
         except Exception as e:
@@ -53,6 +54,8 @@ class FormsImageExtractionAgent:
             return None
     
     def resolve_image_path(self, filepath):
+        if os.path.isabs(str(filepath)):
+            return Path(filepath)
         filepath = str(filepath).replace('\\', os.sep).replace('/', os.sep)
         
         if filepath.startswith('..'):
@@ -65,34 +68,51 @@ class FormsImageExtractionAgent:
         return absolute_path
     
     def extract_text_with_easyocr(self, image_path):
+        return self.extract_layout_with_easyocr(image_path)[0]
+    
+    def extract_layout_with_easyocr(self, image_path):
+        """(text, OcrLayout or None): every fragment with its confidence and box, and the
+        reading-order text of those above OCR_MIN_CONFIDENCE, one per line."""
         if not OCR_AVAILABLE:
-            return "EasyOCR non disponible"
+            return "EasyOCR non disponible", None
         
         try:
             if not os.path.exists(image_path):
-                return "Image non trouvée"
+                return "Image non trouvée", None
             
             print(f"  Traitement OCR: {os.path.basename(image_path)}")
             
-            results = self.ocr_reader.readtext(str(image_path))
+            with timed('ocr.image', nbytes=os.path.getsize(image_path)):
+                results = self.ocr_reader.readtext(str(image_path))
             
             if results:
-                extracted_text = ' '.join([result[1] for result in results])
+                layout = OcrLayout.from_readtext(results)
+                # Fragments EasyOCR itself doubts are noise in the prompt (kept in the layout)
+                dropped = layout.dropped(OCR_MIN_CONFIDENCE)
+                if dropped:
+                    count('ocr.low_confidence', dropped)
+                extracted_text = layout.text(OCR_MIN_CONFIDENCE)
+                if not extracted_text:
+                    print("  Aucun texte fiable détecté")
+                    return "Aucun texte détecté", layout
                 print(f"  Texte extrait: {len(extracted_text)} caractères")
-                return extracted_text.strip()
+                return extracted_text.strip(), layout
             else:
                 print("  Aucun texte détecté")
-                return "Aucun texte détecté"
+                return "Aucun texte détecté", None
                 
         except Exception as e:
             print(f"  Erreur OCR: {e}")
-            return f"Erreur OCR: {str(e)}"
+            return f"Erreur OCR: {str(e)}", None
     
     def process_json_file(self, json_file_path):
         data = self.load_json_file(json_file_path)
         if not data:
             return None
-        
+        return self.process_data(data)
+    
+    def process_data(self, data):
+        """OCR every image of an already loaded form document (modified in place and returned)."""
         questions = data.get('questions', [])
         print(f"Traitement de {len(questions)} questions...")
         
@@ -115,27 +135,43 @@ class FormsImageExtractionAgent:
                     print(f"  Chemin d'image manquant pour {filename}")
                     continue
                 
-                absolute_path = self.resolve_image_path(filepath)
                 print(f"  Image: {filename}")
-                print(f"  Chemin: {absolute_path}")
-                
-                extracted_text = self.extract_text_with_easyocr(absolute_path)
-                
-                image_info['question_text'] = extracted_text
-                image_info['ocr_processed_at'] = datetime.now().isoformat()
-                image_info['ocr_method'] = 'easyocr'
-                
+                self.ocr_image(image_info)
                 total_images_processed += 1
         
-        data['ocr_processing_info'] = {
+        data['ocr_processing_info'] = self.processing_info(total_images_processed)
+        
+        print(f"\nTraitement terminé: {total_images_processed} images traitées")
+        return data
+    
+    def ocr_image(self, image_info):
+        """OCR one image record (dict with 'filepath'), adding its text fields in place."""
+        absolute_path = self.resolve_image_path(image_info.get('filepath', ''))
+        print(f"  Chemin: {absolute_path}")
+        image_info['question_text'], layout = self.extract_layout_with_easyocr(absolute_path)
+        if layout is not None:
+            image_info['ocr_lines'] = layout.to_dict()
+        image_info['ocr_processed_at'] = datetime.now().isoformat()
+        image_info['ocr_method'] = 'easyocr'
+        return image_info
+    
+    def process_batches(self, batches):
+        """OCR images batch by batch: yields each batch of (key, image dict) once processed,
+        so only one batch of decoded images and results is alive at a time."""
+        for batch in batches:
+            for _, image_info in batch:
+                if image_info.get('filepath'):
+                    self.ocr_image(image_info)
+            yield batch
+    
+    @staticmethod
+    def processing_info(total_images_processed):
+        return {
             'processed_at': datetime.now().isoformat(),
             'total_images_processed': total_images_processed,
             'ocr_method': 'easyocr',
             'agent_version': '2.0'
         }
-        
-        print(f"\nTraitement terminé: {total_images_processed} images traitées")
-        return data
     
     def save_processed_json(self, processed_data, original_file_path):
         if not processed_data:
@@ -149,8 +185,7 @@ class FormsImageExtractionAgent:
         output_path = original_path.parent / new_filename
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(processed_data, f, indent=2, ensure_ascii=False)
+            json_utils.dump(processed_data, output_path)
             
             print(f"JSON enrichi sauvegardé: {output_path}")
             return output_path
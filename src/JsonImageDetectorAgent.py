@@ -1,6 +1,7 @@
-import json
 from pathlib import Path
 
+from . import json_utils
+
 class JsonImageChecker:
     def __init__(self, json_path: str):
         self.json_path = Path(json_path)
@@ -10,8 +11,7 @@ class JsonImageChecker:
         if not self.json_path.exists():
             raise FileNotFoundError(f"File not found: {self.json_path}")
 
-        with open(self.json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_utils.load(self.json_path)
 
         return bool(data.get("contains_images", False))
 
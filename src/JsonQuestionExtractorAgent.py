@@ -1,6 +1,8 @@
-import json
 from pathlib import Path
 
+from . import json_utils
+from .models import question_full_text
+
 class JsonQuestionExtractor:
     def __init__(self, json_path: str):
         self.json_path = Path(json_path)
@@ -10,8 +12,7 @@ class JsonQuestionExtractor:
         if not self.json_path.exists():
             raise FileNotFoundError(f"File not found: {self.json_path}")
 
-        with open(self.json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_utils.load(self.json_path)
 
         extracted_data = {
             "file_name": self.json_path.name,
@@ -23,24 +24,10 @@ class JsonQuestionExtractor:
             extracted_data["total_questions"] = len(data["questions"])
             
             for question in data["questions"]:
-                # Get main question text
-                main_question_text = question.get("question_text", "N/A")
-                
-                # Check if there's OCR text in images
-                ocr_texts = []
-                if "images" in question and isinstance(question["images"], list):
-                    for image in question["images"]:
-                        if isinstance(image, dict) and "question_text" in image:
-                            ocr_texts.append(image["question_text"])
-                
-                # Combine main text and OCR texts if available
-                full_question_text = main_question_text
-                if ocr_texts:
-                    full_question_text += " | OCR: " + " | ".join(ocr_texts)
-                
+                # Question text combined with the OCR text of its images (same text as the LLM prompt)
                 question_info = {
                     "question_number": question.get("question_number", "N/A"),
-                    "question_text": full_question_text,
+                    "question_text": question_full_text(question) or "N/A",
                     "answer_type": question.get("answer_type", "N/A"),
                     "answer_values": question.get("answer_values", [])
                 }
@@ -2,150 +2,298 @@
 
 Flow:
   1. Read Excel -> extract form links
-  2. For each link: scrape form (text+images) -> save raw JSON
-  3. Validate JSON & classify (contains images?)
-  4. If images: run OCR enrichment
+  2. For each link: scrape form (text+images) -> store it (status 'scraped')
+  3. Classify pending forms (contains images?)
+  4. If images: run OCR enrichment (-> 'ocr_done')
   5. For every question produce (question_text, type, answer_values)
-  6. Use LLM (Ollama) to generate an answer suggestion per question
-  7. Persist augmented JSON with answers appended under question['llm_answer']
+  6. Use LLM (Ollama) to generate an answer suggestion per question (-> 'answered')
+  7. Export augmented JSON with answers appended under question['llm_answer']
+
+Artifacts live in a SQLite store (see artifact_store); each stage claims the
+forms waiting in its input status one at a time (with a lease), so an
+interrupted run resumes where it stopped and stages can run as separate
+workers (see cli.py).
 
 Logging & error handling included; modular for future extension.
 """
 from __future__ import annotations
-import json
+import os
+import re
+import socket
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any
 
-from langchain_core.runnables import RunnableLambda, RunnableSequence
-from .logging_utils import log, log_section
+from .logging_utils import log, log_section, bind_log_context
+from . import json_utils, metrics_utils, metrics_exporter, tracing
+from .metrics_utils import METRICS, timed, set_gauge, count
+from .profiling import profiled
+from .tracing import span
 
-from .ExcelLinksExtractorAgent import get_links_list
-from .MicrosoftFormsCompleteAnalysisAgent import MicrosoftFormsCompleteScraper
-from .JsonImageDetectorAgent import JsonImageChecker
-from .FormsImageExtractionAgent import FormsImageExtractionAgent, OCR_AVAILABLE
-from .JsonQuestionExtractorAgent import JsonQuestionExtractor
-from .TextLanguageDetectionAgent import LanguageDetector
+# Heavy dependencies (pandas, selenium/undetected_chromedriver, easyocr/torch,
+# langdetect, elasticsearch, langchain_core) are imported inside the step that
+# uses them, so e.g. a run with nothing left to scrape never loads Chrome tooling.
 from .LlamaLanguageModelAgent import OllamaAgent
-from .ElasticsearchUploaderAgent import ElasticsearchUploaderAgent
-
-INPUT_EXCEL_DIR = Path(r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI\data\input")
-OUTPUT_BASE_DIR = Path(r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI\data\output")
+from .llm_router import LLMRouter
+from .shortcut_resolver import ShortcutResolver, SHORTCUT_RULES
+from .question_index import QuestionIndex
+from .artifact_store import ArtifactStore, MAX_ATTEMPTS
+from .memory_utils import MemoryWatchdog, OCR_BATCH, QUESTION_CHUNK
+from .models import Answer, Question
+from .context_builder import ContextBuilder
+from .retry_policy import RetryPolicy, CircuitBreaker, Deadline
+from .scrape_supervisor import reap_orphans, scrape_form
+from .structured_output import answer_schema, validate_answer
+from .prompt_templates import get_template
+
+INPUT_EXCEL_DIR = Path(os.getenv('FORMS_AI_INPUT_DIR', r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI\data\input"))
+OUTPUT_BASE_DIR = Path(os.getenv('FORMS_AI_OUTPUT_DIR', r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI\data\output"))
 JSON_DIR = OUTPUT_BASE_DIR / "jsons"
 IMAGES_DIR = OUTPUT_BASE_DIR / "images"
+METRICS_DIR = OUTPUT_BASE_DIR / "metrics"
+TRACES_DIR = OUTPUT_BASE_DIR / "traces"      # FORMS_AI_TRACE=1: Chrome-trace JSON per run
+PROFILES_DIR = OUTPUT_BASE_DIR / "profiles"  # FORMS_AI_PROFILE=cprofile|pyinstrument
+# Persistent near-duplicate index of answered questions (JSON lines, grows across runs)
+QUESTION_INDEX_PATH = Path(os.getenv('FORMS_AI_INDEX_PATH', str(OUTPUT_BASE_DIR / "index" / "answered_questions.jsonl")))
+# Forms, questions, images and answers with their pipeline status (SQLite)
+ARTIFACT_STORE_PATH = Path(os.getenv('FORMS_AI_STORE', str(OUTPUT_BASE_DIR / "artifacts.db")))
+# Scrape again URLs already in the store (default: only new URLs and previous failures)
+RESCRAPE = os.getenv('FORMS_AI_RESCRAPE', '0') == '1'
+# Lease owner recorded on claimed forms; a form whose answer/upload failed is retried after RETRY_AFTER seconds
+WORKER_ID = os.getenv('FORMS_AI_WORKER_ID') or f"{socket.gethostname()}:{os.getpid()}"
+RETRY_AFTER = float(os.getenv('FORMS_AI_RETRY_AFTER', '300'))
 
 JSON_DIR.mkdir(parents=True, exist_ok=True)
 IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 
-# Cleanup configuration: keep only the raw scraped JSON + final JSON with answers
-# Set to False if you want to keep intermediates for debugging
-CLEANUP_OCR_JSON = True
+# Cleanup configuration: delete downloaded images once their questions are answered
+# Set to False if you want to keep them for debugging
 CLEANUP_IMAGES = True
-MAX_LLM_TIMEOUT_RETRIES = 4  # nombre max de réessais si TIMEOUT
+MAX_LLM_TIMEOUT_RETRIES = 4  # nombre max de réessais si TIMEOUT (défaut, cf. FORMS_AI_LLM_MAX_RETRIES)
+LLM_CALL_TIMEOUT = 120
+# 'form': detect the language once per form and re-check only outlier questions
+# 'question': detect every question separately (cached)
+LANG_DETECTION_MODE = os.getenv('FORMS_AI_LANG_MODE', 'form').lower()
+# Stream tokens and stop generation once the JSON answer is complete (see FORMS_AI_THINK_BUDGET)
+LLM_STREAMING = os.getenv('FORMS_AI_LLM_STREAM', '0') == '1'
+# Constrain output to {"answer", "justification"} JSON (enum of options for choice/NPS questions)
+LLM_STRUCTURED = os.getenv('FORMS_AI_LLM_STRUCTURED', '1') == '1'
+# Not an answer: the question was skipped (breaker open, deadline spent); it stays unanswered
+# and the form goes back to the queue for a later batch
+DEFERRED_ANSWERS = {"FALLBACK_CIRCUIT_OPEN_AUTO_ANSWER", "FALLBACK_DEADLINE_AUTO_ANSWER"}
+TIMEOUT_ANSWERS = {
+    "FALLBACK_TIMEOUT_AUTO_ANSWER",
+    "FALLBACK_TIMEOUT_STREAM_AUTO_ANSWER",
+    "FALLBACK_TIMEOUT_FIRST_TOKEN_AUTO_ANSWER",
+    "FALLBACK_TIMEOUT_INTER_TOKEN_AUTO_ANSWER",
+}
+
+
+_STORE: ArtifactStore | None = None
+_SHORTCUTS: ShortcutResolver | None = None
+
+
+def get_store() -> ArtifactStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = ArtifactStore(ARTIFACT_STORE_PATH)
+    return _STORE
+
+
+def open_store(path: Path) -> ArtifactStore:
+    """Use the store at *path* for the following steps (instead of FORMS_AI_STORE)."""
+    global _STORE, _SHORTCUTS
+    _STORE = ArtifactStore(path)
+    _SHORTCUTS = None  # its history was seeded from the previous store
+    return _STORE
+
+
+def get_shortcuts(store: ArtifactStore) -> ShortcutResolver:
+    """This worker's shortcut resolver: the question index is loaded and the history seeded
+    from *store* once; learn() then keeps both up to date, so a --watch worker does not
+    re-read them at every poll."""
+    global _SHORTCUTS
+    if _SHORTCUTS is None:
+        index = None
+        if 'index' in {r.strip() for r in SHORTCUT_RULES.split(',')}:
+            with timed('index.load'):
+                index = QuestionIndex(QUESTION_INDEX_PATH)
+            log('LLM', f"Index de questions: {len(index)} entrée(s) ({index.scorer.name})")
+        shortcuts = ShortcutResolver(index=index)
+        if shortcuts.rules:
+            seeded = shortcuts.history.seed(store.answered_questions())
+            log('LLM', f"Raccourcis: {', '.join(n for n, _ in shortcuts.rules)} ({seeded} réponse(s) connues)")
+        _SHORTCUTS = shortcuts
+    return _SHORTCUTS
+
+
+def _processed(state: Dict[str, Any], stage: str, count: int) -> None:
+    state.setdefault("processed", {})[stage] = count
+
+
+def claim_forms(store: ArtifactStore, status: str, owner: str, watchdog: MemoryWatchdog | None = None):
+    """store.claims() behind the RSS watchdog: no new form is taken while memory is over FORMS_AI_MAX_RSS_MB."""
+    watchdog = watchdog or MemoryWatchdog.from_env()
+    stage = owner.rsplit('/', 1)[-1]
+    while True:
+        watchdog.check(stage)
+        row = store.claim(status, owner)
+        if row is None:
+            return
+        yield row
+
+
+def delete_question_images(questions) -> int:
+    """Delete the downloaded image files referenced by *questions*; returns how many were removed."""
+    deleted = 0
+    for q in questions:
+        for img in q.get("images", []) or []:
+            fp = img.get("filepath") if isinstance(img, dict) else None
+            if not fp:
+                continue
+            try:
+                img_path = Path(fp)
+                if not img_path.is_absolute():
+                    # Try relative to project root
+                    candidate = Path.cwd() / fp
+                    if candidate.exists():
+                        img_path = candidate
+                if img_path.exists() and img_path.is_file():
+                    img_path.unlink()
+                    deleted += 1
+            except Exception:
+                pass
+    return deleted
+
+
+def form_label(row) -> str:
+    return row["form_name"] or row["url"]
 
 
+def release_form(store: ArtifactStore, row, component: str) -> None:
+    """Give a form whose step failed back to the queue, or log that it is given up."""
+    if not store.release(row["id"], retry_after=RETRY_AFTER):
+        count('form.failed')
+        log(component, f"{form_label(row)}: abandon après {MAX_ATTEMPTS} essai(s) -> failed", level='ERROR')
+
+
+def export_name(row) -> str:
+    slug = re.sub(r'[^\w-]+', '_', row["form_name"] or "form").strip('_')[:60] or "form"
+    return f"{slug}_{row['id']}_with_answers.json"
+
+
+@timed('step.extract_links')
 def step_extract_links(_: Dict[str, Any]) -> Dict[str, Any]:
+    from .ExcelLinksExtractorAgent import get_links_list
     pairs = get_links_list(str(INPUT_EXCEL_DIR))  # [(form_name, link)]
-    log('PIPELINE', f"Liens trouvés: {len(pairs)}")
-    return {"form_links": pairs}
+    store = get_store()
+    queued = sum(1 for form_name, link in pairs if store.enqueue(link, form_name, force=RESCRAPE) is not None)
+    log('PIPELINE', f"Liens trouvés: {len(pairs)} ({queued} à scraper)")
+    # State carries counts and ids only: the forms themselves live in the store
+    return {"links": len(pairs), "queued": queued}
 
 
+@timed('step.scrape_forms')
 def step_scrape_forms(state: Dict[str, Any]) -> Dict[str, Any]:
-    scraped_files: List[Path] = []
-    for form_name, link in state.get("form_links", []):
-        try:
-            log('SCRAPE', f"Scraping: {form_name} | {link}")
-            scraper = MicrosoftFormsCompleteScraper(
-                url=link,
-                form_name=form_name,
-                headless=True,
-                images_folder=str(IMAGES_DIR),
-                output_folder=str(JSON_DIR)
-            )
-            data = scraper.run()
-            saved = scraper.save_to_json()
-            if saved:
-                scraped_files.append(Path(saved))
-                log('SCRAPE', f"JSON sauvegardé: {saved}")
-        except Exception as e:
-            log('SCRAPE', f"Erreur: {e}", level='ERROR')
-    state["scraped_json_files"] = scraped_files
+    store = get_store()
+    scraped_ids: List[int] = []
+    claimed = 0
+    owner = f"{WORKER_ID}/scrape"
+    reap_orphans()  # chromedriver / Chrome left behind by a killed run
+    for row in claim_forms(store, 'new', owner):
+        claimed += 1
+        set_gauge('queue_depth', store.available('new') + 1, stage='scrape')
+        bind_log_context(form=row["id"])
+        form_name, link = row["form_name"], row["url"]
+        with span('scrape', form=row["id"], url=row["url"]) as form_span:
+            try:
+                log('SCRAPE', f"Scraping: {form_name} | {link}")
+                with timed('scrape.form') as t_scrape:
+                    # Child process with a hard deadline, retried with backoff (scrape_supervisor)
+                    data = scrape_form(link, form_name, str(IMAGES_DIR), str(JSON_DIR), spill_chunk=QUESTION_CHUNK,
+                                       form_id=row["id"], on_retry=lambda _, fid=row["id"]: store.renew(fid, owner))
+                data["url"] = link  # the queue row is keyed by the link
+                status = 'failed' if data.get("error") else 'scraped'
+                form_span.set(status=status, questions=len(data.get("questions", [])),
+                              images=data.get("statistics", {}).get("total_images_downloaded", 0))
+                form_id = store.upsert_form(data, status=status, form_name=form_name)
+                if hasattr(data["questions"], "close"):
+                    data["questions"].close()  # QuestionSpool: remove its spill file
+                if status == 'failed':
+                    log('SCRAPE', f"Échec ({data['error']}): {form_name}", level='ERROR')
+                else:
+                    scraped_ids.append(form_id)
+                    log('SCRAPE', f"Formulaire #{form_id} enregistré: {len(data.get('questions', []))} question(s)",
+                        duration=round(t_scrape.wall, 3))
+            except Exception as e:
+                store.set_status(row["id"], 'failed', owner=owner)
+                log('SCRAPE', f"Erreur: {e}", level='ERROR')
+    bind_log_context(form=None)
+    set_gauge('queue_depth', 0, stage='scrape')
+    state["scraped_form_ids"] = scraped_ids
+    _processed(state, 'scrape', claimed)
     return state
 
 
+@timed('step.validate_and_flag')
 def step_validate_and_flag(state: Dict[str, Any]) -> Dict[str, Any]:
-    validated: List[Dict[str, Any]] = []
-    for json_path in state.get("scraped_json_files", []):
-        try:
-            checker = JsonImageChecker(str(json_path))
-            has_images = checker.contains_images()
-            validated.append({
-                "path": json_path,
-                "contains_images": has_images
-            })
-            log('VALIDATE', f"{json_path.name} images={has_images}")
-        except Exception as e:
-            log('VALIDATE', f"Erreur {json_path.name}: {e}", level='ERROR')
-    state["validated_jsons"] = validated
+    validated = {"with_images": 0, "without_images": 0}
+    for row in get_store().iter_forms('scraped'):
+        has_images = bool(row["contains_images"])
+        validated["with_images" if has_images else "without_images"] += 1
+        log('VALIDATE', f"{form_label(row)} images={has_images}")
+    state["validated_forms"] = validated
     return state
 
 
+@timed('step.ocr_if_needed')
 def step_ocr_if_needed(state: Dict[str, Any]) -> Dict[str, Any]:
-    enriched_paths: List[Path] = []
-    ocr_intermediate: List[Path] = []
-    if not OCR_AVAILABLE:
+    from .FormsImageExtractionAgent import FormsImageExtractionAgent, OCR_AVAILABLE
+    store = get_store()
+    agent = None
+    if not OCR_AVAILABLE and store.available('scraped'):
         log('OCR', "EasyOCR indisponible - étape ignorée", level='WARN')
-        state["enriched_json_files"] = [v["path"] for v in state.get("validated_jsons", [])]
-        return state
-    agent = FormsImageExtractionAgent(str(JSON_DIR))
-    for meta in state.get("validated_jsons", []):
-        if meta["contains_images"]:
-            try:
-                processed = agent.process_json_file(meta["path"])
-                if processed:
-                    new_path = agent.save_processed_json(processed, meta["path"])
-                    if new_path:
-                        enriched_paths.append(new_path)
-                        ocr_intermediate.append(new_path)
-                        log('OCR', f"OCR OK: {new_path.name}")
+    claimed = 0
+    owner = f"{WORKER_ID}/ocr"
+    for row in claim_forms(store, 'scraped', owner):
+        claimed += 1
+        set_gauge('queue_depth', store.available('scraped') + 1, stage='ocr')
+        bind_log_context(form=row["id"])
+        with span('ocr', form=row["id"], contains_images=bool(row["contains_images"])) as form_span:
+            if OCR_AVAILABLE and row["contains_images"]:
+                try:
+                    if agent is None:  # the EasyOCR reader is slow to build: only when a form needs it
+                        agent = FormsImageExtractionAgent(str(JSON_DIR))
+                    total = 0
+                    lost = False
+                    # FORMS_AI_OCR_BATCH images read, OCR'd and written back at a time
+                    for batch in agent.process_batches(store.image_batches(row["id"], OCR_BATCH)):
+                        store.save_images(batch)
+                        total += sum(1 for _, img in batch if img.get("filepath"))
+                        if not store.renew(row["id"], owner):
+                            lost = True
+                            break
+                    form_span.set(images=total)
+                    if not lost:
+                        store.update_meta(row["id"], ocr_processing_info=agent.processing_info(total))
+                        lost = not store.set_status(row["id"], 'ocr_done', owner=owner)
+                    if lost:
+                        log('OCR', f"Bail perdu sur {form_label(row)} (repris par un autre worker?) - abandon",
+                            level='WARN')
                         continue
-            except Exception as e:
-                log('OCR', f"Erreur {meta['path'].name}: {e}", level='ERROR')
-        # If no OCR or failed, keep original
-        enriched_paths.append(meta["path"])
-    state["enriched_json_files"] = enriched_paths
-    state["ocr_intermediate_files"] = ocr_intermediate
+                    log('OCR', f"OCR OK: {form_label(row)}")
+                    continue
+                except Exception as e:
+                    log('OCR', f"Erreur {form_label(row)}: {e}", level='ERROR')
+            # If no OCR or failed, answer from the question text alone
+            store.set_status(row["id"], 'ocr_done', owner=owner)
+    bind_log_context(form=None)
+    set_gauge('queue_depth', 0, stage='ocr')
+    _processed(state, 'ocr', claimed)
     return state
 
 
-def build_prompt(language: str, qtype: str, text: str, values: Any) -> str:
-    if isinstance(values, list):
-        opts = " | ".join(values)
-    else:
-        opts = str(values)
-    return f"""You are an expert assistant for Microsoft Forms.
-Question language: {language}
-Question type: {qtype}
-Question: {text}
-Options: {opts}
-
-TASK:
-Provide the best possible answer AND a concise justification.
-
-OUTPUT FORMAT (MANDATORY JSON):
-{{"answer":"<ANSWER_ONLY>","justification":"<SHORT_REASONING>"}}
-
-RULES:
-- If type is choiceItem or npsContainer: answer MUST be EXACT option text ONLY (no extra chars).
-- If type is textInput: answer is a concise relevant response in {language}.
-- justification: max 30 words, refer only to information present in question/OCR/context; no hallucination; same language as question.
-- Never translate options or fabricate data.
-- Do NOT wrap JSON in markdown fences.
-- Do NOT add extra keys.
-
-Return ONLY the JSON object.
-"""
-
-
 def parse_answer_and_justification(raw: str) -> Dict[str, str]:
     """Parse model output expecting a JSON with 'answer' and 'justification'.
     Fallback: if parsing fails, treat whole text as answer and set generic justification.
@@ -155,7 +303,7 @@ def parse_answer_and_justification(raw: str) -> Dict[str, str]:
         return result
     # Try direct JSON
     try:
-        data = json.loads(raw)
+        data = json_utils.loads(raw)
         if isinstance(data, dict) and 'answer' in data and 'justification' in data:
             return {"answer": str(data['answer']).strip(), "justification": str(data['justification']).strip()}
     except Exception:
@@ -166,7 +314,7 @@ def parse_answer_and_justification(raw: str) -> Dict[str, str]:
         end = raw.rfind('}')
         if 0 <= start < end:
             snippet = raw[start:end+1]
-            data = json.loads(snippet)
+            data = json_utils.loads(snippet)
             if isinstance(data, dict) and 'answer' in data:
                 result['answer'] = str(data['answer']).strip()
                 result['justification'] = str(data.get('justification', '')).strip()
@@ -183,129 +331,288 @@ def parse_answer_and_justification(raw: str) -> Dict[str, str]:
     return result
 
 
+def is_failed_answer(raw: str) -> bool:
+    return raw.startswith("FALLBACK_") or raw.startswith("LLM_ERROR")
+
+
+def ask_with_retries(ask, prompt: str, idx: int, policy: RetryPolicy, breaker: CircuitBreaker,
+                     form_deadline: Deadline, schema: Dict[str, Any] | None = None, system: str | None = None) -> str:
+    """Call the LLM, retrying timeouts with backoff inside the question/form deadlines.
+    Short-circuits to a fallback answer while the circuit breaker is open. The breaker
+    gets one outcome per question: failed only if every attempt failed."""
+    if not breaker.allow():
+        count('llm.circuit_skip')
+        tracing.annotate(circuit_open=True)
+        log('LLM', f"Q{idx} circuit ouvert -> fallback", level='WARN', indent=2)
+        return "FALLBACK_CIRCUIT_OPEN_AUTO_ANSWER"
+    question_deadline = Deadline(policy.question_deadline)
+    attempt = 0
+    raw_answer = None  # last answer; stays None if no call returned (exception)
+    called = False
+    try:
+        while True:
+            attempt += 1
+            call_timeout = policy.timeout_for(question_deadline, form_deadline)
+            if call_timeout <= 0:
+                count('llm.deadline_exceeded')
+                log('LLM', f"Q{idx} échéance question/formulaire atteinte", level='ERROR', indent=2)
+                return "FALLBACK_DEADLINE_AUTO_ANSWER"
+            called = True
+            raw_answer = ask(prompt, timeout=call_timeout, schema=schema, system=system)
+            tracing.annotate(attempts=attempt)
+            if raw_answer not in TIMEOUT_ANSWERS:
+                return raw_answer
+            count('llm.timeout')
+            if attempt > policy.max_retries:
+                log('LLM', f"Q{idx} abandon après {policy.max_retries} timeouts", level='ERROR', indent=2)
+                return raw_answer
+            if not breaker.allow():
+                log('LLM', f"Q{idx} circuit ouvert -> abandon des retries", level='WARN', indent=2)
+                return raw_answer
+            delay = policy.delay(attempt)
+            if delay >= min(question_deadline.remaining(), form_deadline.remaining()):
+                log('LLM', f"Q{idx} plus de temps pour un retry", level='ERROR', indent=2)
+                return raw_answer
+            log('LLM', f"Q{idx} timeout fallback -> retry {attempt}/{policy.max_retries} dans {delay:.1f}s", level='WARN', indent=2)
+            count('llm.retry')
+            with timed('llm.backoff'):
+                time.sleep(delay)
+    finally:
+        if called:
+            breaker.record(raw_answer is not None and not is_failed_answer(raw_answer))
+
+
+@timed('step.generate_answers')
 def step_generate_answers(state: Dict[str, Any]) -> Dict[str, Any]:
-    llm = OllamaAgent()
+    store = get_store()
+    if not store.available('ocr_done'):
+        _processed(state, 'answer', 0)
+        return state
+    router = LLMRouter.from_env()  # several Ollama hosts (FORMS_AI_OLLAMA_HOSTS), else one agent
+    llm = None if router else OllamaAgent()
+    if router:
+        log('LLM', f"Routage sur {len(router.backends)} hôte(s): {', '.join(b.host for b in router.backends)}")
+    policy = RetryPolicy.from_env(MAX_LLM_TIMEOUT_RETRIES, LLM_CALL_TIMEOUT)
+    breaker = CircuitBreaker.from_env('llm')  # one breaker per batch
+    template = get_template()
+    log('LLM', f"Template de prompt: {template.key}")
+    context = ContextBuilder()  # OCR text deduplicated, de-noised and cut to FORMS_AI_CONTEXT_TOKENS
+    from .TextLanguageDetectionAgent import LanguageDetector
     lang_detector = LanguageDetector()
+    shortcuts = get_shortcuts(store)
+    shortcuts.reset_report()
     augmented: List[Path] = []
     removed_images_total = 0
-    for path in state.get("enriched_json_files", []):
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            modified = False
-            questions = data.get("questions", [])
-            log('LLM', f"Fichier {path.name} - {len(questions)} question(s)")
-            for idx, q in enumerate(questions, 1):
-                if "llm_answer" in q:
-                    continue  # already answered
-                q_text = q.get("question_text", "")
-                # If OCR text embedded in images, optionally concatenate
-                if q.get("has_images") and q.get("images"):
-                    for img in q.get("images", []):
-                        if isinstance(img, dict) and img.get("question_text"):
-                            q_text += f" | OCR: {img.get('question_text')}"
-                qtype = q.get("answer_type", "unknown")
-                answer_values = q.get("answer_values", [])
-                try:
-                    language = lang_detector.detect_language(q_text[:400]) if q_text else "Unknown"
-                except Exception:
-                    language = "Unknown"
-                prompt = build_prompt(language, qtype, q_text, answer_values)
-                try:
-                    log('LLM', f"Q{idx} type={qtype} lang={language} - génération", indent=1)
-                    attempt = 0
-                    raw_answer = ""
-                    while True:
-                        attempt += 1
-                        raw_answer = llm.ask(prompt, timeout=120)
-                        if raw_answer == "FALLBACK_TIMEOUT_AUTO_ANSWER" and attempt <= MAX_LLM_TIMEOUT_RETRIES:
-                            log('LLM', f"Q{idx} timeout fallback -> retry {attempt}/{MAX_LLM_TIMEOUT_RETRIES}", level='WARN', indent=2)
-                            continue
-                        break
-                    if raw_answer == "FALLBACK_TIMEOUT_AUTO_ANSWER" and attempt > MAX_LLM_TIMEOUT_RETRIES:
-                        log('LLM', f"Q{idx} abandon après {MAX_LLM_TIMEOUT_RETRIES} timeouts", level='ERROR', indent=2)
-                    parsed = parse_answer_and_justification(raw_answer)
-                    log('LLM', f"Q{idx} answer: {parsed['answer'][:40]} | justif: {parsed['justification'][:40]}", indent=2)
-                except Exception as e:
-                    raw_answer = f"LLM_ERROR: {e}"
-                    parsed = {"answer": raw_answer, "justification": "Generation failed."}
-                    log('LLM', f"Q{idx} exception: {e}", level='ERROR', indent=2)
-                q["llm_answer"] = parsed["answer"]
-                q["llm_justification"] = parsed.get("justification", "")
-                q["llm_language_detected"] = language
-                modified = True
-            if modified:
-                out_path = path.parent / f"{path.stem}_with_answers.json"
-                with open(out_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                log('LLM', f"Sauvegardé: {out_path.name}")
-                augmented.append(out_path)
-                # Optional cleanup of images referenced in this JSON
-                if CLEANUP_IMAGES:
-                    imgs_deleted = 0
-                    for q in data.get("questions", []):
-                        for img in q.get("images", []) or []:
-                            fp = img.get("filepath") if isinstance(img, dict) else None
-                            if not fp:
+    owner = f"{WORKER_ID}/answer"
+    watchdog = MemoryWatchdog.from_env()
+    claimed = 0
+    for row in claim_forms(store, 'ocr_done', owner, watchdog):
+        claimed += 1
+        set_gauge('queue_depth', store.available('ocr_done') + 1, stage='answer')
+        bind_log_context(form=row["id"], question=None)
+        with span('answer', form=row["id"]) as form_span:
+            try:
+                n_questions = store.question_count(row["id"])
+                form_span.set(questions=n_questions)
+                log('LLM', f"Formulaire {form_label(row)} - {n_questions} question(s)")
+                form_deadline = Deadline(policy.form_deadline)
+                deferred = 0
+                imgs_deleted = 0
+                offset = 0
+                lost = False
+                # One chunk = the whole form unless FORMS_AI_QUESTION_CHUNK / FORMS_AI_LOW_MEMORY
+                for chunk in store.question_chunks(row["id"], QUESTION_CHUNK):
+                    pending = []
+                    for idx, (question_id, q) in enumerate(chunk, offset + 1):
+                        if "llm_answer" in q:
+                            continue  # already answered
+                        pending.append((idx, question_id, q, Question.from_dict(q)))
+                    offset += len(chunk)
+                    # Question text + assembled OCR context, for the whole chunk before language detection
+                    with timed('context.assemble', items=len(pending)):
+                        texts = context.build_many(question for *_, question in pending)
+                    pending = [(*p, text) for p, text in zip(pending, texts)]
+                    with timed('lang.detect', items=len(pending)):
+                        if LANG_DETECTION_MODE == 'form':
+                            languages = lang_detector.detect_form_languages([t[:400] for *_, t in pending])
+                        else:
+                            languages = []
+                            for *_, q_text in pending:
+                                try:
+                                    languages.append(lang_detector.detect_language(q_text[:400]) if q_text else "Unknown")
+                                except Exception:
+                                    languages.append("Unknown")
+                    for (idx, _, q, question, q_text), language in zip(pending, languages):
+                        number = question.number(idx)
+                        qtype = question.answer_type or "unknown"
+                        answer_values = question.answer_values if question.answer_values is not None else []
+                        with span('question', question=number, type=qtype, images=len(question.images),
+                                  text_chars=len(q_text)) as q_span:
+                            bind_log_context(question=number)
+                            if not store.renew(row["id"], owner):
+                                lost = True
+                                break
+                            shortcut = shortcuts.resolve(q, q_text, language)
+                            if shortcut is not None:
+                                count(f'llm.shortcut.{shortcut.rule}')
+                                log('LLM', f"Q{idx} raccourci {shortcut.rule}: {shortcut.answer[:40]}", indent=1)
+                                question.answer = Answer(shortcut.answer, shortcut.justification, language=language,
+                                                         source=f"shortcut:{shortcut.rule}",
+                                                         provenance=shortcut.provenance or None)
+                                q.update(question.answer.to_dict())
+                                q_span.set(source=question.answer.source)
                                 continue
+                            system, prompt = template.render(language, qtype, q_text, answer_values)
+                            schema = answer_schema(qtype, answer_values) if LLM_STRUCTURED else None
+                            q_span.set(language=language, template=template.key, prompt_chars=len(system or '') + len(prompt))
+                            if router:
+                                ask = router.ask_for(qtype, stream=LLM_STREAMING)
+                            else:
+                                ask = llm.ask_stream if LLM_STREAMING else llm.ask
                             try:
-                                img_path = Path(fp)
-                                if not img_path.is_absolute():
-                                    # Try relative to project root
-                                    candidate = Path.cwd() / fp
-                                    if candidate.exists():
-                                        img_path = candidate
-                                if img_path.exists() and img_path.is_file():
-                                    img_path.unlink()
-                                    imgs_deleted += 1
-                            except Exception:
-                                pass
-                    removed_images_total += imgs_deleted
-                    if imgs_deleted:
-                        log('CLEANUP', f"{imgs_deleted} image(s) supprimée(s) pour {out_path.name}")
-            else:
-                augmented.append(path)
-        except Exception as e:
-            log('LLM', f"Erreur fichier {path.name}: {e}", level='ERROR')
-    state["final_json_files"] = augmented
-
-    # Cleanup OCR intermediate JSON files (keep only original + final answers)
-    if CLEANUP_OCR_JSON:
-        for ocr_path in state.get("ocr_intermediate_files", []):
-            # Don't remove if it's also a final JSON (unlikely naming overlap, but safety)
-            if any(str(ocr_path) == str(final_p) for final_p in augmented):
-                continue
-            try:
-                if ocr_path.exists():
-                    ocr_path.unlink()
-                    log('CLEANUP', f"OCR intermédiaire supprimé: {ocr_path.name}")
+                                log('LLM', f"Q{idx} type={qtype} lang={language} - génération", indent=1)
+                                t_ask = time.perf_counter()
+                                raw_answer = ask_with_retries(ask, prompt, idx, policy, breaker, form_deadline, schema, system)
+                                if raw_answer in DEFERRED_ANSWERS:
+                                    deferred += 1
+                                    q_span.set(source="deferred")
+                                    continue
+                                parsed = parse_answer_and_justification(raw_answer)
+                                if not is_failed_answer(raw_answer):
+                                    parsed = validate_answer(parsed, qtype, answer_values)
+                                    count(f"llm.answer_{parsed['validation'].split(':')[0]}")
+                                    if parsed['validation'] == 'invalid':
+                                        log('LLM', f"Q{idx} réponse hors options: {parsed['answer'][:40]}", level='WARN', indent=2)
+                                log('LLM', f"Q{idx} answer: {parsed['answer'][:40]} | justif: {parsed['justification'][:40]}", indent=2,
+                                    duration=round(time.perf_counter() - t_ask, 3))
+                            except Exception as e:
+                                raw_answer = f"LLM_ERROR: {e}"
+                                parsed = {"answer": raw_answer, "justification": "Generation failed."}
+                                log('LLM', f"Q{idx} exception: {e}", level='ERROR', indent=2)
+                            question.answer = Answer(parsed["answer"], parsed.get("justification", ""), language=language,
+                                                     template=template.key, validation=parsed.get("validation") or None,
+                                                     source="llm")
+                            q.update(question.answer.to_dict())
+                            q_span.set(source="llm", validation=parsed.get("validation", "failed"))
+                            shortcuts.learn(q, source={"form": row["url"], "question_number": number})
+                    if lost:
+                        break
+                    store.save_answers((question_id, q) for _, question_id, q, *_ in pending)
+                    if CLEANUP_IMAGES:  # images of answered questions are no longer needed
+                        imgs_deleted += delete_question_images(q for _, q in chunk if "llm_answer" in q)
+                    watchdog.check('answer')
+                if deferred and not lost:
+                    count('llm.deferred', deferred)
+                    store.release(row["id"], retry_after=RETRY_AFTER, failed=False)
+                    log('LLM', f"{form_label(row)}: {deferred} question(s) sans réponse (disjoncteur/échéance) "
+                               f"-> formulaire remis en file", level='WARN')
+                    continue
+                if lost or not store.set_status(row["id"], 'answered', owner=owner):
+                    log('LLM', f"Bail perdu sur {form_label(row)} (repris par un autre worker?) - abandon",
+                        level='WARN')
+                    continue
+                out_path = store.export_json(row["id"], JSON_DIR / export_name(row), chunk_size=QUESTION_CHUNK)
+                log('LLM', f"Sauvegardé: #{row['id']} -> {out_path.name}")
+                augmented.append(out_path)
+                removed_images_total += imgs_deleted
+                if imgs_deleted:
+                    log('CLEANUP', f"{imgs_deleted} image(s) supprimée(s) pour {out_path.name}")
             except Exception as e:
-                log('CLEANUP', f"Erreur suppression {ocr_path.name}: {e}", level='ERROR')
+                log('LLM', f"Erreur formulaire {form_label(row)}: {e}", level='ERROR')
+                release_form(store, row, 'LLM')
+    bind_log_context(form=None, question=None)
+    set_gauge('queue_depth', 0, stage='answer')
+    _processed(state, 'answer', claimed)
+    state["final_json_files"] = augmented
+    report = shortcuts.report()
+    state["shortcut_report"] = report
+    set_gauge('llm_shortcut_ratio', report["fraction"])
+    log('LLM', f"Raccourcis: {report['shortcut']}/{report['questions']} question(s) sans LLM "
+               f"({report['fraction']:.0%}) {report['by_rule']}")
+    sizes = METRICS.values()
+    if 'context.tokens' in sizes:
+        raw, kept = sizes['context.tokens_raw'], sizes['context.tokens']
+        log('LLM', f"Contexte des questions: {raw.sum:.0f} -> {kept.sum:.0f} tokens estimés "
+                   f"(p95 {raw.quantile(0.95):.0f} -> {kept.quantile(0.95):.0f}, max {raw.max:.0f} -> {kept.max:.0f})")
 
     if CLEANUP_IMAGES and removed_images_total:
         log('CLEANUP', f"Total images supprimées: {removed_images_total}")
     return state
 
 
+@timed('step.upload_to_elasticsearch')
 def step_upload_to_elasticsearch(state: Dict[str, Any]) -> Dict[str, Any]:
+    store = get_store()
+    if not store.available('answered'):
+        _processed(state, 'index', 0)
+        return state
+    from .ElasticsearchUploaderAgent import ElasticsearchUploaderAgent
     uploader = ElasticsearchUploaderAgent()
-    for json_path in state.get("final_json_files", []):
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            form_name = data.get("form_name") or data.get("form_title") or json_path.stem
-            questions = data.get("questions", [])
-            meta = {k: v for k, v in data.items() if k not in ["questions"]}
-            success = uploader.upload_form(form_name, questions, meta)
-            if success:
-                log("ELASTIC", f"Upload OK: {form_name}")
-            else:
-                log("ELASTIC", f"Upload SKIP: {form_name}", level="WARN")
-        except Exception as e:
-            log("ELASTIC", f"Erreur upload {json_path.name}: {e}", level="ERROR")
+    claimed = 0
+    owner = f"{WORKER_ID}/index"
+    for row in claim_forms(store, 'answered', owner):
+        claimed += 1
+        set_gauge('queue_depth', store.available('answered') + 1, stage='index')
+        bind_log_context(form=row["id"])
+        with span('index', form=row["id"]) as form_span:
+            try:
+                data = store.load_form(row["id"])
+                form_name = data.get("form_name") or data.get("form_title") or form_label(row)
+                questions = data.get("questions", [])
+                form_span.set(questions=len(questions))
+                meta = {k: v for k, v in data.items() if k not in ["questions"]}
+                if not store.renew(row["id"], owner):  # indexed meanwhile by the worker that took it over
+                    log("ELASTIC", f"Bail perdu sur {form_label(row)} (repris par un autre worker?) - abandon", level="WARN")
+                    continue
+                with timed('elastic.upload', items=len(questions)) as t_upload:
+                    success = uploader.upload_form(form_name, questions, meta)
+                if success:
+                    if not store.set_status(row["id"], 'indexed', owner=owner):
+                        log("ELASTIC", f"Bail perdu pendant l'upload de {form_name} - statut laissé au nouveau worker",
+                            level="WARN")
+                    log("ELASTIC", f"Upload OK: {form_name}", duration=round(t_upload.wall, 3))
+                else:
+                    count('elastic.failure')
+                    log("ELASTIC", f"Upload SKIP: {form_name}", level="WARN")
+                    release_form(store, row, 'ELASTIC')
+            except Exception as e:
+                count('elastic.failure')
+                log("ELASTIC", f"Erreur upload {form_label(row)}: {e}", level="ERROR")
+                release_form(store, row, 'ELASTIC')
+    bind_log_context(form=None)
+    set_gauge('queue_depth', 0, stage='index')
+    _processed(state, 'index', claimed)
     return state
 
+
+# Stages that can run on their own (cli.py): their steps, and the status they consume
+STAGES = {
+    "scrape": (step_extract_links, step_scrape_forms),
+    "ocr": (step_validate_and_flag, step_ocr_if_needed),
+    "answer": (step_generate_answers,),
+    "index": (step_upload_to_elasticsearch,),
+}
+STAGE_INPUT = {"scrape": "new", "ocr": "scraped", "answer": "ocr_done", "index": "answered"}
+
+
+def write_metrics(prefix: str = "pipeline") -> Path | None:
+    metrics_utils.log_summary()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    metrics_path = metrics_utils.write_json(METRICS_DIR / f"{prefix}_metrics_{timestamp}.json")
+    if metrics_path:
+        log('METRICS', f"Métriques: {metrics_path}")
+    return metrics_path
+
+
+def write_trace(prefix: str = "pipeline") -> Path | None:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    trace_path = tracing.export(TRACES_DIR / f"{prefix}_trace_{timestamp}.json")
+    if trace_path:
+        log('TRACE', f"Trace: {trace_path} (ouvrir dans https://ui.perfetto.dev)")
+    return trace_path
+
 def run_pipeline() -> Dict[str, Any]:
+    from langchain_core.runnables import RunnableLambda, RunnableSequence
     pipeline = RunnableSequence(
         RunnableLambda(step_extract_links)
         | RunnableLambda(step_scrape_forms)
@@ -315,10 +622,23 @@ def run_pipeline() -> Dict[str, Any]:
         | RunnableLambda(step_upload_to_elasticsearch)
     )
     log_section('PIPELINE TERMINÉ')
-    result = pipeline.invoke({})
-    log('PIPELINE', f"Liens: {len(result.get('links', []))}")
+    metrics_exporter.start_from_env()
+    metrics_utils.METRICS.reset()
+    tracing.reset()
+    with profiled('pipeline', PROFILES_DIR) as profiles, timed('pipeline.run'):
+        result = pipeline.invoke({})
+    log('PIPELINE', f"Liens: {result.get('links', 0)}")
     for p in result.get("final_json_files", []):
         log('PIPELINE', f"Final: {p}")
+    log('PIPELINE', f"Base: {get_store().counts()} ({get_store().path})")
+    metrics_path = write_metrics()
+    if metrics_path:
+        result["metrics_file"] = metrics_path
+    trace_path = write_trace()
+    if trace_path:
+        result["trace_file"] = trace_path
+    if profiles:
+        result["profile_files"] = profiles
     return result
 
 
@@ -1,36 +1,265 @@
 import subprocess
 import shutil
 import os
+import socket
+import urllib.request
+import urllib.error
+import time
+import queue
+import codecs
+import threading
+from typing import Callable, Optional, Tuple
+
+from . import json_utils
+from .metrics_utils import timed, record, count, set_gauge
 
 PREFERRED_ENCODING = 'utf-8'
+# Thinking budget for streaming calls (whitespace tokens): -1 = unlimited,
+# 0 = ask the model not to think at all, N = abort after N thinking tokens and re-ask without thinking
+THINK_BUDGET = int(os.getenv('FORMS_AI_THINK_BUDGET', '-1'))
+THINK_START_MARKERS = ("Thinking...", "<think>")
+THINK_END_MARKERS = ("...done thinking.", "</think>")
+# Streaming deadlines (seconds): silence before the first token / between two tokens
+FIRST_TOKEN_TIMEOUT = float(os.getenv('FORMS_AI_LLM_FIRST_TOKEN_TIMEOUT', '60'))
+INTER_TOKEN_TIMEOUT = float(os.getenv('FORMS_AI_LLM_INTER_TOKEN_TIMEOUT', '20'))
+_EOF = object()
+
+
+class ChunkPump:
+    """Runs a blocking read function in a daemon thread and hands chunks over a queue,
+    so the consumer can wait with real deadlines (portable: works with Windows pipes).
+    read_chunk() must return a falsy value at end of stream."""
+    def __init__(self, read_chunk: Callable[[], object]):
+        self.read_chunk = read_chunk
+        self.queue: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='ollama-stream-reader', daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                chunk = self.read_chunk()
+                if not chunk:
+                    break
+                self.queue.put(chunk)
+        except Exception as e:  # surfaced to the consumer
+            self.queue.put(e)
+        finally:
+            self.queue.put(_EOF)
+
+    def get(self, timeout: float):
+        """Next chunk, _EOF, or raises queue.Empty when nothing arrived within timeout."""
+        item = self.queue.get(timeout=max(0.0, timeout))
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class StreamStats:
+    """Per-call timing: time to first token and generation throughput."""
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at = self.start
+        self.tokens = 0
+
+    def token(self, n: int = 1) -> None:
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.tokens += n
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.start
+
+    @property
+    def tokens_per_sec(self) -> float:
+        if self.first_token_at is None:
+            return 0.0
+        span = self.last_token_at - self.first_token_at
+        return self.tokens / span if span > 0 else float(self.tokens)
+
+    def to_dict(self) -> dict:
+        return {
+            "ttft_s": None if self.ttft is None else round(self.ttft, 3),
+            "tokens": self.tokens,
+            "tokens_per_sec": round(self.tokens_per_sec, 2),
+            "duration_s": round(time.monotonic() - self.start, 3),
+        }
+
+
+class StreamingAnswerParser:
+    """Incremental consumer of model output.
+
+    feed() chunks as they arrive; it returns True as soon as a complete JSON
+    object with 'answer' and 'justification' has been emitted after the
+    thinking section, so the caller can stop generation right away.
+    over_budget turns True when thinking exceeds think_budget tokens.
+    """
+    def __init__(self, think_budget: int = -1):
+        self.think_budget = think_budget
+        self.raw = ''
+        self.state = 'start'  # start -> thinking -> answer
+        self.thinking_tokens = 0
+        self.over_budget = False
+        self.result: Optional[str] = None
+        self._scan_pos = 0
+        self._reset_scanner()
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def _reset_scanner(self) -> None:
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._obj_start = -1
+
+    def _count_thinking(self, text: str) -> None:
+        self.thinking_tokens += len(text.split())
+        if 0 <= self.think_budget < self.thinking_tokens:
+            self.over_budget = True
+
+    def feed(self, chunk: str, thinking: bool = False) -> bool:
+        """thinking=True for chunks the backend already flags as thinking (HTTP API)."""
+        if self.done or not chunk:
+            return self.done
+        if thinking:
+            self._count_thinking(chunk)
+            return False
+        tail_from = max(0, len(self.raw) - 20)
+        self.raw += chunk
+        if self.state == 'start':
+            head = self.raw.lstrip()
+            if not head or any(m.startswith(head) for m in THINK_START_MARKERS):
+                return False  # may still turn into a thinking marker
+            marker = next((m for m in THINK_START_MARKERS if head.startswith(m)), None)
+            if marker:
+                self.state = 'thinking'
+                self._scan_pos = len(self.raw) - len(head) + len(marker)
+                tail_from = self._scan_pos
+            else:
+                self.state = 'answer'
+                self._scan_pos = 0
+        # An end marker may appear even without a start marker (thinking printed raw)
+        end_idx, end_marker = -1, ''
+        for m in THINK_END_MARKERS:
+            idx = self.raw.find(m, tail_from)
+            if idx > end_idx:
+                end_idx, end_marker = idx, m
+        if end_idx >= 0:
+            if self.state == 'thinking':
+                self._count_thinking(self.raw[max(self._scan_pos, len(self.raw) - len(chunk)):end_idx])
+            self.state = 'answer'
+            self._scan_pos = end_idx + len(end_marker)
+            self._reset_scanner()
+        elif self.state == 'thinking':
+            self._count_thinking(self.raw[max(self._scan_pos, len(self.raw) - len(chunk)):])
+            return False
+        self._scan_json()
+        return self.done
+
+    def _scan_json(self) -> None:
+        raw = self.raw
+        i = self._scan_pos
+        while i < len(raw):
+            ch = raw[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == '\\':
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"' and self._depth > 0:
+                self._in_str = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = raw[self._obj_start:i + 1]
+                    try:
+                        data = json_utils.loads(candidate)
+                    except json_utils.JSONDecodeError:
+                        data = None
+                    if isinstance(data, dict) and 'answer' in data and 'justification' in data:
+                        self.result = candidate
+                        self._scan_pos = i + 1
+                        return
+            i += 1
+        self._scan_pos = i
+
+    def answer(self) -> str:
+        """Complete JSON object if seen, else whatever followed the thinking section."""
+        if self.result is not None:
+            return self.result
+        if self.state == 'thinking':
+            return ''
+        for marker in THINK_END_MARKERS:
+            if marker in self.raw:
+                return self.raw.split(marker)[-1].strip()
+        return self.raw.strip()
 
 
 class OllamaAgent:
     """Wrapper around local Ollama CLI with robustness (timeout, availability check).
     Ajouts: MODE_DEBUG + streaming.
+    If a host is given (or FORMS_AI_OLLAMA_HOST, e.g. http://127.0.0.1:11434) the
+    HTTP API is used instead of the `ollama` binary.
     """
-    def __init__(self, model: str = 'deepseek-r1:8b', offline_fallback: bool = True):
+    def __init__(self, model: str = 'deepseek-r1:8b', offline_fallback: bool = True, host: Optional[str] = None,
+                 think_budget: Optional[int] = None):
         self.model = os.getenv('FORMS_AI_LLM_MODEL', model)
+        self.think_budget = THINK_BUDGET if think_budget is None else think_budget
+        self.first_token_timeout = FIRST_TOKEN_TIMEOUT
+        self.inter_token_timeout = INTER_TOKEN_TIMEOUT
+        self.last_stream_stats: Optional[dict] = None
         self.offline_fallback = offline_fallback
-        self.available = shutil.which('ollama') is not None
+        self.host = (host or os.getenv('FORMS_AI_OLLAMA_HOST', '')).rstrip('/')
+        self.available = bool(self.host) or shutil.which('ollama') is not None
         self.debug = os.getenv('FORMS_AI_DEBUG', '0') == '1'
         if not self.available:
             print("[LLM] Commande 'ollama' introuvable. Mode fallback activé.")
 
+    def _cli_command(self, think: bool = True, schema: Optional[dict] = None) -> list:
+        cmd = ['ollama', 'run', self.model]
+        if not think:
+            cmd.append('--think=false')
+        if schema:
+            cmd += ['--format', 'json']  # the CLI only knows plain JSON mode, not schemas
+        return cmd
+
     def extract_final_answer(self, text: str) -> str:
-        marker = "...done thinking."
-        if marker in text:
-            parts = text.split(marker)
-            final_part = parts[-1].strip()
-            return final_part
+        for marker in ("...done thinking.", "</think>"):
+            if marker in text:
+                parts = text.split(marker)
+                final_part = parts[-1].strip()
+                return final_part
         return text.strip()
 
-    def ask(self, prompt: str, timeout: int = 45) -> str:
+    def ask(self, prompt: str, timeout: int = 45, schema: Optional[dict] = None, system: Optional[str] = None) -> str:
+        """schema: JSON schema constraining the output (Ollama `format`), see structured_output.
+        system: fixed instructions sent as the chat system message (HTTP /api/chat), see prompt_templates."""
+        with timed('llm.ask', nbytes=len(prompt) + len(system or '')) as t:
+            answer = self._ask(prompt, timeout, schema, system)
+            t.add(nbytes=len(answer))
+        return answer
+
+    def _ask(self, prompt: str, timeout: int, schema: Optional[dict] = None, system: Optional[str] = None) -> str:
         if not self.available:
             return self._fallback_answer(prompt, reason="NO_OLLAMA")
+        if self.host:
+            return self._ask_http(prompt, timeout, schema, system)
+        prompt = self._cli_prompt(prompt, system)
         try:
             proc = subprocess.Popen(
-                ['ollama', 'run', self.model],
+                self._cli_command(think=self.think_budget != 0, schema=schema),
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -57,49 +286,221 @@ class OllamaAgent:
         except Exception as e:
             return self._fallback_answer(prompt, reason=f"EXCEPTION:{e}")
 
+    def _post_json(self, path: str, payload: dict, timeout: float):
+        req = urllib.request.Request(
+            f"{self.host}{path}",
+            data=json_utils.dumps_bytes(payload, pretty=False),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        return urllib.request.urlopen(req, timeout=timeout)
+
+    @staticmethod
+    def _cli_prompt(prompt: str, system: Optional[str]) -> str:
+        # `ollama run` has no system flag: keep the fixed instructions as the prompt prefix
+        return f"{system}\n\n{prompt}" if system else prompt
+
+    def _request(self, prompt: str, stream: bool, think: bool = True, schema: Optional[dict] = None,
+                 system: Optional[str] = None) -> Tuple[str, dict]:
+        """(path, payload): /api/chat with a system message when one is given, else /api/generate."""
+        if system:
+            path = '/api/chat'
+            payload = {"model": self.model, "stream": stream, "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ]}
+        else:
+            path = '/api/generate'
+            payload = {"model": self.model, "prompt": prompt, "stream": stream}
+        if not think or self.think_budget == 0:
+            payload["think"] = False
+        if schema:
+            payload["format"] = schema
+        return path, payload
+
+    @staticmethod
+    def _response_parts(body: dict) -> Tuple[str, str]:
+        """(thinking, response) of a /api/generate or /api/chat body or stream chunk."""
+        message = body.get('message') or {}
+        return (body.get('thinking') or message.get('thinking') or '',
+                body.get('response') or message.get('content') or '')
+
+    def _ask_http(self, prompt: str, timeout: int, schema: Optional[dict] = None, system: Optional[str] = None) -> str:
+        path, payload = self._request(prompt, stream=False, schema=schema, system=system)
+        try:
+            with self._post_json(path, payload, timeout) as resp:
+                body = json_utils.loads(resp.read())
+        except (socket.timeout, TimeoutError):
+            return self._fallback_answer(prompt, reason="TIMEOUT")
+        except urllib.error.URLError as e:
+            if isinstance(getattr(e, 'reason', None), (socket.timeout, TimeoutError)):
+                return self._fallback_answer(prompt, reason="TIMEOUT")
+            return self._fallback_answer(prompt, reason=f"HTTP_ERROR:{e}")
+        except Exception as e:
+            return self._fallback_answer(prompt, reason=f"EXCEPTION:{e}")
+        answer = self.extract_final_answer(self._response_parts(body)[1])
+        if self.debug:
+            print(f"[LLM][DEBUG] HTTP answer_length={len(answer)}")
+        if not answer.strip():
+            return self._fallback_answer(prompt, reason="EMPTY_OUTPUT")
+        return answer
+
     def _fallback_answer(self, prompt: str, reason: str) -> str:
         if not self.offline_fallback:
             return f"LLM_ERROR:{reason}"
         return f"FALLBACK_{reason}_AUTO_ANSWER"
 
-    def ask_stream(self, prompt: str, timeout: int = 90) -> str:
+    def ask_stream(self, prompt: str, timeout: int = 90, schema: Optional[dict] = None, system: Optional[str] = None) -> str:
+        with timed('llm.ask_stream', nbytes=len(prompt) + len(system or '')) as t:
+            answer = self._ask_stream(prompt, timeout, schema, system)
+            t.add(nbytes=len(answer))
+        return answer
+
+    def _ask_stream(self, prompt: str, timeout: int, schema: Optional[dict] = None, system: Optional[str] = None) -> str:
+        """Stream tokens, stop as soon as the JSON answer is complete.
+        If thinking exceeds the budget, re-ask once with thinking disabled."""
         if not self.available:
             return self._fallback_answer(prompt, reason="NO_OLLAMA")
+        answer, over_budget = self._stream_once(prompt, timeout, think=self.think_budget != 0, schema=schema, system=system)
+        if over_budget:
+            count('llm.think_budget_exceeded')
+            if self.debug:
+                print(f"[LLM][DEBUG] Budget de réflexion dépassé ({self.think_budget}) - nouvel essai sans thinking")
+            answer, _ = self._stream_once(prompt, timeout, think=False, schema=schema, system=system)
+        return answer
+
+    def _stream_once(self, prompt: str, timeout: int, think: bool, schema: Optional[dict] = None,
+                     system: Optional[str] = None) -> Tuple[str, bool]:
+        parser = StreamingAnswerParser(self.think_budget if think else -1)
+        stats = StreamStats()
+        try:
+            if self.host:
+                status = self._stream_http(prompt, timeout, think, parser, stats, schema, system)
+            else:
+                status = self._stream_cli(self._cli_prompt(prompt, system), timeout, think, parser, stats, schema)
+        except Exception as e:
+            return self._fallback_answer(prompt, reason=f"EXCEPTION_STREAM:{e}"), False
+        finally:
+            self._report_stream_stats(stats)
+        if status:
+            return self._fallback_answer(prompt, reason=status), False
+        if parser.thinking_tokens:
+            count('llm.thinking_tokens', parser.thinking_tokens)
+        if parser.over_budget:
+            return '', True
+        if parser.done:
+            count('llm.early_stop')
+        answer = parser.answer()
+        if self.debug:
+            print(f"[LLM][DEBUG] Stream raw={len(parser.raw)} thinking_tokens={parser.thinking_tokens} early_stop={parser.done}")
+        if not answer.strip():
+            return self._fallback_answer(prompt, reason="EMPTY_OUTPUT"), False
+        return answer, False
+
+    def _report_stream_stats(self, stats: StreamStats) -> None:
+        self.last_stream_stats = stats.to_dict()
+        if stats.ttft is not None:
+            record('llm.ttft', wall=stats.ttft)
+            count('llm.tokens', stats.tokens)
+            set_gauge('llm_tokens_per_second', round(stats.tokens_per_sec, 2), model=self.model)
+        if self.debug:
+            print(f"[LLM][DEBUG] {self.model} ttft={self.last_stream_stats['ttft_s']}s "
+                  f"tokens={stats.tokens} tok/s={self.last_stream_stats['tokens_per_sec']}")
+
+    def _pump(self, pump: ChunkPump, timeout: float, stats: StreamStats, handle: Callable[[object], Tuple[int, bool]]) -> Optional[str]:
+        """Consume pump until handle() says stop, EOF, or a deadline passes.
+        handle(chunk) -> (tokens_in_chunk, stop). Returns a fallback reason or None."""
+        total_deadline = stats.start + timeout
+        while True:
+            if stats.first_token_at is None:
+                limit, reason = stats.start + self.first_token_timeout, "TIMEOUT_FIRST_TOKEN"
+            else:
+                limit, reason = stats.last_token_at + self.inter_token_timeout, "TIMEOUT_INTER_TOKEN"
+            if total_deadline <= limit:
+                limit, reason = total_deadline, "TIMEOUT_STREAM"
+            try:
+                chunk = pump.get(limit - time.monotonic())
+            except queue.Empty:
+                count('llm.stream_timeout')
+                return reason
+            except (socket.timeout, TimeoutError):  # the reader's socket read timed out
+                count('llm.stream_timeout')
+                return "TIMEOUT_FIRST_TOKEN" if stats.first_token_at is None else "TIMEOUT_INTER_TOKEN"
+            if chunk is _EOF:
+                return None
+            tokens, stop = handle(chunk)
+            if tokens:
+                stats.token(tokens)
+            if stop:
+                return None
+
+    def _stream_cli(self, prompt: str, timeout: int, think: bool, parser: StreamingAnswerParser,
+                    stats: StreamStats, schema: Optional[dict] = None) -> Optional[str]:
+        """Feed `ollama run` stdout to parser without blocking on a silent model."""
+        proc = subprocess.Popen(
+            self._cli_command(think, schema),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
         try:
-            proc = subprocess.Popen(
-                ['ollama', 'run', self.model],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding=PREFERRED_ENCODING,
-                errors='replace'
-            )
             if proc.stdin:
-                proc.stdin.write(prompt + '\n')
+                proc.stdin.write((prompt + '\n').encode(PREFERRED_ENCODING))
                 proc.stdin.flush()
                 proc.stdin.close()
-            collected = []
-            import time as _t
-            start = _t.time()
-            while True:
-                if proc.stdout:
-                    line = proc.stdout.readline()
-                    if line:
-                        collected.append(line)
-                    elif proc.poll() is not None:
-                        break
-                if _t.time() - start > timeout:
-                    proc.kill()
-                    return self._fallback_answer(prompt, reason="TIMEOUT_STREAM")
-            output = ''.join(collected)
-            answer = self.extract_final_answer(output)
-            if not answer.strip():
-                return self._fallback_answer(prompt, reason="EMPTY_OUTPUT")
-            return answer
-        except Exception as e:
-            return self._fallback_answer(prompt, reason=f"EXCEPTION_STREAM:{e}")
+            fd = proc.stdout.fileno()
+            pump = ChunkPump(lambda: os.read(fd, 4096))
+            decoder = codecs.getincrementaldecoder(PREFERRED_ENCODING)(errors='replace')
+
+            def handle(data):
+                text = decoder.decode(data)
+                if not text:
+                    return 0, False
+                stop = parser.feed(text) or parser.over_budget
+                return max(1, len(text.split())), stop
+
+            return self._pump(pump, timeout, stats, handle)
+        finally:
+            if proc.poll() is None:
+                proc.kill()  # early termination / deadline: stop generation
+            proc.wait()
+
+    def _stream_http(self, prompt: str, timeout: int, think: bool, parser: StreamingAnswerParser,
+                     stats: StreamStats, schema: Optional[dict] = None, system: Optional[str] = None) -> Optional[str]:
+        """Feed /api/generate (or /api/chat) NDJSON chunks to parser; closing the response stops generation."""
+        # Socket timeout bounds the wait for headers and any single read; the first/inter-token
+        # deadlines themselves are enforced by _pump (a socket timeout maps to the same reasons)
+        socket_timeout = min(timeout, max(self.first_token_timeout, self.inter_token_timeout))
+        path, payload = self._request(prompt, stream=True, think=think, schema=schema, system=system)
+        try:
+            resp = self._post_json(path, payload, socket_timeout)
+        except (socket.timeout, TimeoutError):
+            return "TIMEOUT_FIRST_TOKEN"
+        except urllib.error.URLError as e:
+            if isinstance(getattr(e, 'reason', None), (socket.timeout, TimeoutError)):
+                return "TIMEOUT_FIRST_TOKEN"
+            return f"HTTP_ERROR:{e}"
+        try:
+            pump = ChunkPump(resp.readline)
+
+            def handle(raw_line):
+                if not raw_line.strip():
+                    return 0, False
+                chunk = json_utils.loads(raw_line)
+                thinking, response = self._response_parts(chunk)
+                tokens = 0
+                if thinking:
+                    parser.feed(thinking, thinking=True)
+                    tokens += 1
+                if response:
+                    parser.feed(response)
+                    tokens += 1
+                return tokens, parser.done or parser.over_budget or bool(chunk.get('done'))
 
+            return self._pump(pump, timeout, stats, handle)
+        finally:
+            # close() waits for the reader's pending readline; do it off the caller's path
+            threading.Thread(target=resp.close, daemon=True).start()
 
 if __name__ == "__main__":
     agent = OllamaAgent()
@@ -1,7 +1,6 @@
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 import time
-import json
 import os
 import requests
 from datetime import datetime
@@ -9,6 +8,11 @@ import warnings
 import gc
 from .AnswerMiningAgent import MicrosoftFormsScraper as AnswerAnalyzer
 from .logging_utils import log
+from . import json_utils
+from .metrics_utils import timed
+from . import chrome_profile
+from .memory_utils import QuestionSpool
+from .models import Image, Question
 
 # Patch Chrome destructor early to avoid WinError 6 on GC (Windows handle invalid)
 try:  # pragma: no cover
@@ -19,21 +23,29 @@ except Exception:
     pass
 
 
+# Max wait for the question list after navigation (fixed 5 s sleep when FORMS_AI_CHROME_LEAN=0), polled every PAGE_POLL s
+PAGE_WAIT = float(os.getenv('FORMS_AI_PAGE_WAIT', '5'))
+PAGE_POLL = 0.25
+
 
 class MicrosoftFormsCompleteScraper:
-    def __init__(self, url, form_name=None, headless=True, images_folder="images", output_folder="output"):
+    def __init__(self, url, form_name=None, headless=True, images_folder="images", output_folder="output",
+                 spill_chunk=0):
+        """spill_chunk > 0: keep at most that many questions in memory, the rest in a
+        temporary file (scraped_data["questions"] is then a QuestionSpool)."""
         self.url = url
         self.form_name = form_name
         self.headless = headless
         self.images_folder = images_folder
         self.output_folder = output_folder
         self.driver = None
+        self.profile = None  # chrome_profile.ProfileSlot held while the driver runs
         self.scraped_data = {
             "url": url,
             "form_name": form_name,
             "scraping_date": datetime.now().isoformat(),
             "contains_images": False,
-            "questions": [],
+            "questions": QuestionSpool(spill_chunk) if spill_chunk else [],
             "statistics": {
                 "total_questions": 0,
                 "questions_with_text": 0,
@@ -55,13 +67,24 @@ class MicrosoftFormsCompleteScraper:
             options.add_argument("--disable-gpu")
             options.add_argument("--disable-web-security")
             options.add_argument("--allow-running-insecure-content")
+            chrome_profile.apply_options(options)
             
-            self.driver = uc.Chrome(options=options)
+            with timed('scrape.init_driver'):
+                self.profile = chrome_profile.acquire_slot()
+                self.driver = uc.Chrome(options=options,
+                                        user_data_dir=str(self.profile.path) if self.profile else None)
+                chrome_profile.block_resources(self.driver)
             return True
         except Exception as e:
+            self._release_profile()
             self.scraped_data["statistics"]["errors"].append(f"Erreur d'initialisation du driver: {str(e)}")
             return False
     
+    def _release_profile(self):
+        if self.profile is not None:
+            self.profile.release()
+            self.profile = None
+
     def _close_driver_safely(self):
         """Safely close the Chrome driver"""
         if self.driver:
@@ -113,6 +136,21 @@ class MicrosoftFormsCompleteScraper:
                 self.driver = None
                 gc.collect()
 
+    def _wait_for_questions(self):
+        """Wait (PAGE_WAIT s max) until the question list is rendered and its item count is stable."""
+        if not chrome_profile.LEAN:
+            time.sleep(PAGE_WAIT)  # previous behaviour: fixed wait
+            return
+        deadline = time.monotonic() + PAGE_WAIT
+        previous = -1
+        while time.monotonic() < deadline:
+            count = len(self.driver.find_elements(
+                By.XPATH, "//*[@id='question-list']//div[contains(@data-automation-id, 'questionItem')]"))
+            if count and count == previous:
+                return
+            previous = count
+            time.sleep(PAGE_POLL)
+
     def _create_folders(self):
         """Create necessary folders for images and output"""
         os.makedirs(self.images_folder, exist_ok=True)
@@ -121,8 +159,10 @@ class MicrosoftFormsCompleteScraper:
     def _download_image(self, src, filename):
         """Download image from URL"""
         try:
-            response = requests.get(src, timeout=10)
-            response.raise_for_status()
+            with timed('scrape.image_download') as t:
+                response = requests.get(src, timeout=10)
+                response.raise_for_status()
+                t.add(nbytes=len(response.content))
             
             filepath = os.path.join(self.images_folder, filename)
             with open(filepath, "wb") as f:
@@ -147,7 +187,8 @@ class MicrosoftFormsCompleteScraper:
         downloaded_images = []
         try:
             self.driver.execute_script("arguments[0].scrollIntoView(true);", question_item)
-            time.sleep(1)
+            with timed('scrape.scroll_wait'):
+                time.sleep(1)
             
             imgs = question_item.find_elements(By.XPATH, ".//img")
             
@@ -160,12 +201,7 @@ class MicrosoftFormsCompleteScraper:
                         
                         filepath = self._download_image(src, filename)
                         if filepath:
-                            downloaded_images.append({
-                                "image_number": j,
-                                "filename": filename,
-                                "filepath": filepath,
-                                "original_src": src
-                            })
+                            downloaded_images.append(Image(j, filename, filepath, src))
                             self.scraped_data["statistics"]["total_images_downloaded"] += 1
                             
                 except Exception as e:
@@ -218,8 +254,10 @@ class MicrosoftFormsCompleteScraper:
         try:
             self._create_folders()
             log('SCRAPE', f"Navigation: {self.url}")
-            self.driver.get(self.url)
-            time.sleep(5)
+            with timed('scrape.navigate'):
+                self.driver.get(self.url)
+            with timed('scrape.page_wait'):
+                self._wait_for_questions()
 
             question_list = self.driver.find_element(By.ID, "question-list")
             question_items = question_list.find_elements(
@@ -233,23 +271,25 @@ class MicrosoftFormsCompleteScraper:
                 log('SCRAPE', f"Question {i}/{len(question_items)}", indent=1)
                 
                 try:
-                    question_text = self._extract_question_text(item)
-                    
-                    images = self._extract_question_images(item, i)
-                    
-                    answer_analysis = self._analyze_question_answer_type(item)
+                    with timed('scrape.question'):
+                        question_text = self._extract_question_text(item)
+                        
+                        images = self._extract_question_images(item, i)
+                        
+                        with timed('scrape.answer_type'):
+                            answer_analysis = self._analyze_question_answer_type(item)
                     
-                    question_data = {
-                        "question_number": i,
-                        "question_text": question_text,
-                        "has_text": bool(question_text),
-                        "has_images": len(images) > 0,
-                        "images_count": len(images),
-                        "images": images,
-                        "answer_type": answer_analysis["answer_type"],
-                        "answer_values": answer_analysis["answer_values"],
-                        "scraped_at": datetime.now().isoformat()
-                    }
+                    question_data = Question(
+                        question_number=i,
+                        question_text=question_text,
+                        has_text=bool(question_text),
+                        has_images=len(images) > 0,
+                        images_count=len(images),
+                        images=images,
+                        answer_type=answer_analysis["answer_type"],
+                        answer_values=answer_analysis["answer_values"],
+                        scraped_at=datetime.now().isoformat()
+                    ).to_dict()
                     
                     if question_text:
                         self.scraped_data["statistics"]["questions_with_text"] += 1
@@ -287,7 +327,9 @@ class MicrosoftFormsCompleteScraper:
                     except Exception:
                         pass
             finally:
-                self._close_driver_safely()
+                with timed('scrape.close_driver'):
+                    self._close_driver_safely()
+                self._release_profile()
         
         # Set top-level flag indicating if the form contains any images
         try:
@@ -309,8 +351,11 @@ class MicrosoftFormsCompleteScraper:
         filepath = os.path.join(self.output_folder, filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.scraped_data, f, indent=2, ensure_ascii=False)
+            with timed('scrape.save_json'):
+                data = self.scraped_data
+                if isinstance(data["questions"], QuestionSpool):
+                    data = {**data, "questions": data["questions"].to_list()}
+                json_utils.dump(data, filepath)
             return filepath
         except Exception as e:
             log('SCRAPE', f"Erreur sauvegarde JSON: {e}", level='ERROR')
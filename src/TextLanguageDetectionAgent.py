@@ -1,13 +1,144 @@
-from langdetect import detect, DetectorFactory
-from langcodes import Language
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Backend: 'langdetect' (default) or 'fasttext' (needs `pip install fasttext` + a local
+# language-id model, e.g. lid.176.ftz, pointed to by FORMS_AI_LANG_MODEL)
+LANG_BACKEND = os.getenv('FORMS_AI_LANG_BACKEND', 'langdetect').lower()
+LANG_MODEL_PATH = os.getenv('FORMS_AI_LANG_MODEL', '')
+LANG_CACHE_SIZE = int(os.getenv('FORMS_AI_LANG_CACHE_SIZE', '4096'))
+MAX_DETECT_CHARS = 400
+
+_NUMBERING = re.compile(r'^\s*\(?\d+\s*[\.\):-]\s*')
+_SPACES = re.compile(r'\s+')
+_WORDS = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Tiny stopword lists (OCR languages + a few neighbours) used to spot outliers cheaply
+_STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'is', 'in', 'what', 'which', 'how', 'you', 'your', 'are', 'for', 'with', 'this', 'do'},
+    'fr': {'le', 'la', 'les', 'des', 'est', 'et', 'du', 'une', 'un', 'quel', 'quelle', 'vous', 'pour', 'dans', 'que', 'en'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'ein', 'eine', 'sie', 'welche', 'welcher', 'mit', 'im', 'zu', 'den'},
+    'es': {'el', 'los', 'las', 'es', 'del', 'una', 'cual', 'cuál', 'qué', 'para', 'por', 'con', 'en', 'y', 'que'},
+    'it': {'il', 'gli', 'della', 'di', 'che', 'è', 'una', 'quale', 'sono', 'per', 'con', 'nel', 'non', 'lo'},
+    'pt': {'o', 'os', 'da', 'do', 'que', 'é', 'uma', 'qual', 'não', 'para', 'com', 'em', 'você'},
+    'nl': {'de', 'het', 'een', 'en', 'is', 'van', 'welke', 'niet', 'u', 'voor', 'met', 'op'},
+}
+
+
+def normalize_text(text: str) -> str:
+    """Cache key: drop question numbering, collapse whitespace, lowercase, cap length."""
+    text = _NUMBERING.sub('', text or '')
+    return _SPACES.sub(' ', text).strip().lower()[:MAX_DETECT_CHARS]
+
+
+@lru_cache(maxsize=256)
+def display_name(lang_code: str) -> str:
+    from langcodes import Language
+    return Language.get(lang_code).display_name()
+
+
+def stopword_guess(text: str) -> Tuple[Optional[str], int]:
+    """(lang_code, hits) of the stopword list with most hits; (None, 0) when no signal."""
+    words = _WORDS.findall(text.lower())
+    best, best_hits = None, 0
+    for code, stops in _STOPWORDS.items():
+        hits = sum(1 for w in words if w in stops)
+        if hits > best_hits:
+            best, best_hits = code, hits
+    return best, best_hits
+
+
+class LangdetectBackend:
+    name = 'langdetect'
+
+    def __init__(self):
+        # Imported here: langdetect loads all its language profiles on import
+        from langdetect import detect_langs, DetectorFactory
+        DetectorFactory.seed = 0
+        self._detect_langs = detect_langs
+
+    def detect(self, text: str) -> Tuple[str, float]:
+        best = self._detect_langs(text)[0]
+        return best.lang, best.prob
+
+
+class FastTextBackend:
+    """fastText language-id model (n-gram, ~100x faster than langdetect)."""
+    name = 'fasttext'
+
+    def __init__(self, model_path: str):
+        import fasttext  # optional dependency
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"fastText model not found: {model_path!r} (FORMS_AI_LANG_MODEL)")
+        self.model = fasttext.load_model(model_path)
+
+    def detect(self, text: str) -> Tuple[str, float]:
+        labels, probs = self.model.predict(text.replace('\n', ' '), k=1)
+        return labels[0].replace('__label__', ''), float(probs[0])
+
+
+def make_backend(name: Optional[str] = None, model_path: Optional[str] = None):
+    """Build the requested backend (or pass an instance through), falling back to langdetect."""
+    if name is not None and not isinstance(name, str):
+        return name
+    name = (name or LANG_BACKEND).lower()
+    if name == 'fasttext':
+        try:
+            return FastTextBackend(model_path or LANG_MODEL_PATH)
+        except Exception as e:
+            print(f"[LANG] fastText indisponible ({e}) - utilisation de langdetect")
+    return LangdetectBackend()
 
-DetectorFactory.seed = 0
 
 class LanguageDetector:
+    """Language detection with a per-instance LRU cache on normalized text.
+
+    detect_language(text)          -> display name (e.g. 'German'), one text
+    detect_form_languages(texts)   -> display names for all questions of a form:
+        the form is classified once, and only questions whose stopwords
+        clearly point to another language are re-checked individually.
+    """
+    def __init__(self, backend: Optional[str] = None, model_path: Optional[str] = None, cache_size: int = LANG_CACHE_SIZE):
+        self.backend = make_backend(backend, model_path)
+        self._detect_cached = lru_cache(maxsize=cache_size)(self._detect_normalized)
+
+    def _detect_normalized(self, normalized: str) -> Tuple[str, float]:
+        return self.backend.detect(normalized)
+
+    def detect_code(self, text: str) -> Tuple[str, float]:
+        return self._detect_cached(normalize_text(text))
+
     def detect_language(self, text):
-        lang_code = detect(text)
-        lang_name = Language.get(lang_code).display_name()
-        return lang_name
+        lang_code, _ = self.detect_code(text)
+        return display_name(lang_code)
+
+    def detect_form_languages(self, texts: List[str], default: str = "Unknown") -> List[str]:
+        if not texts:
+            return []
+        sample = ' '.join(normalize_text(t) for t in texts if t)[:MAX_DETECT_CHARS * 4]
+        try:
+            form_code, _ = self._detect_cached(sample) if sample else (None, 0.0)
+        except Exception:
+            form_code = None
+        results = []
+        for text in texts:
+            if not text:
+                results.append(default)
+                continue
+            guess, hits = stopword_guess(normalize_text(text))
+            if form_code and (guess is None or guess == form_code or hits < 2):
+                results.append(display_name(form_code))
+                continue
+            try:
+                results.append(self.detect_language(text))
+            except Exception:
+                results.append(display_name(form_code) if form_code else default)
+        return results
+
+    def cache_info(self):
+        return self._detect_cached.cache_info()
+
 
 if __name__ == "__main__":
     text = "Die Shengsi-Inseln liegen im Ostchinesischen Meer. Nicht einmal 2"
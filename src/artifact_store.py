@@ -0,0 +1,533 @@
+"""SQLite store for pipeline artifacts (scraped forms, OCR text, LLM answers).
+
+Replaces the directory of chained ``*_with_ocr_<ts>_with_answers.json`` files:
+each form is one row keyed by URL, with its questions, images and answers in
+their own tables, and a ``status`` column the stages query for pending work:
+
+    new -> scraped -> ocr_done -> answered -> indexed      (failed: scrape error,
+                                                            or MAX_ATTEMPTS releases)
+
+The forms table doubles as the work queue between stages: a worker claims one
+form in its input status with a lease (owner + expiry); a status change ends
+the lease, and a lease left by a crashed worker expires so another one takes
+the form over. A form given back after a failure (release) counts an attempt;
+after FORMS_AI_MAX_ATTEMPTS of them in the same status it is marked failed. Several processes (or machines sharing the database file, see
+FORMS_AI_STORE_JOURNAL) can therefore run the same stage concurrently.
+
+JSON stays available as an export format (``export_json`` / ``load_form``
+rebuild the exact document the scraper produced, enriched with OCR text and
+``llm_*`` fields) and existing JSON files can be imported:
+
+    python -m src.artifact_store import data/output/jsons
+    python -m src.artifact_store list [status]
+    python -m src.artifact_store export <form_id|url> out.json
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from . import json_utils
+
+STATUSES = ('new', 'scraped', 'ocr_done', 'answered', 'indexed', 'failed')
+# 'wal' (default) needs a local filesystem; use 'delete' when the database lives on a network share
+JOURNAL_MODE = os.getenv('FORMS_AI_STORE_JOURNAL', 'wal').lower()
+LEASE_SECONDS = float(os.getenv('FORMS_AI_LEASE_SECONDS', '1800'))
+MAX_ATTEMPTS = int(os.getenv('FORMS_AI_MAX_ATTEMPTS', '5'))  # failed releases before status 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forms (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    form_name TEXT,
+    status TEXT NOT NULL,
+    contains_images INTEGER NOT NULL DEFAULT 0,
+    meta TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS forms_status ON forms(status);
+CREATE INDEX IF NOT EXISTS forms_name ON forms(form_name);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    form_id INTEGER NOT NULL REFERENCES forms(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question_number INTEGER,
+    question_text TEXT,
+    answer_type TEXT,
+    answer_values TEXT,
+    data TEXT NOT NULL,
+    UNIQUE(form_id, position)
+);
+CREATE INDEX IF NOT EXISTS questions_form ON questions(form_id);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    filename TEXT,
+    filepath TEXT,
+    ocr_text TEXT,
+    data TEXT NOT NULL,
+    UNIQUE(question_id, position)
+);
+CREATE INDEX IF NOT EXISTS images_question ON images(question_id);
+CREATE TABLE IF NOT EXISTS answers (
+    question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE,
+    llm_answer TEXT,
+    llm_justification TEXT,
+    source TEXT,
+    data TEXT NOT NULL,
+    answered_at TEXT NOT NULL
+);
+"""
+
+_QUESTION_COLUMNS = ('question_number', 'question_text', 'answer_type', 'answer_values')
+_IMAGE_COLUMNS = ('filename', 'filepath')
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _split_question(q: Dict[str, Any]):
+    """(images, llm_* fields, remaining keys) of one question dict."""
+    llm = {k: v for k, v in q.items() if k.startswith('llm_')}
+    rest = {k: v for k, v in q.items() if k not in llm and k != 'images' and k not in _QUESTION_COLUMNS}
+    return q.get('images') or [], llm, rest
+
+
+class ArtifactStore:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # timeout: other workers may hold the write lock while saving a large form
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=60)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        columns = {r['name'] for r in self.conn.execute("PRAGMA table_info(forms)")}
+        for column, kind in (('lease_owner', 'TEXT'), ('lease_until', 'REAL'),
+                             ('attempts', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:  # database created before leases / attempts existed
+                self.conn.execute(f"ALTER TABLE forms ADD COLUMN {column} {kind}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _tx(self):
+        return _Transaction(self)
+
+    # ------------------------------------------------------------ writes
+
+    def upsert_form(self, data: Dict[str, Any], status: str = 'scraped', form_name: Optional[str] = None) -> int:
+        """Insert or replace a whole form document (questions, images, answers). Returns form id."""
+        url = data.get('url') or ''
+        if not url:
+            raise ValueError("form document without 'url'")
+        meta = {k: v for k, v in data.items() if k != 'questions'}
+        name = form_name or data.get('form_name') or data.get('form_title')
+        now = _now()
+        with self._tx() as c:
+            row = c.execute("SELECT id FROM forms WHERE url = ?", (url,)).fetchone()
+            if row:
+                form_id = row['id']
+                c.execute("DELETE FROM questions WHERE form_id = ?", (form_id,))
+                c.execute("UPDATE forms SET form_name = COALESCE(?, form_name), status = ?, contains_images = ?, meta = ?, updated_at = ?, "
+                          "lease_owner = NULL, lease_until = NULL, attempts = 0 WHERE id = ?", (name, status, int(bool(data.get('contains_images'))),
+                                           json_utils.dumps(meta, pretty=False), now, form_id))
+            else:
+                form_id = c.execute(
+                    "INSERT INTO forms (url, form_name, status, contains_images, meta, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, name, status, int(bool(data.get('contains_images'))),
+                     json_utils.dumps(meta, pretty=False), now, now)).lastrowid
+            for position, q in enumerate(data.get('questions', [])):
+                self._insert_question(c, form_id, position, q)
+        return form_id
+
+    def _insert_question(self, c: sqlite3.Connection, form_id: int, position: int, q: Dict[str, Any]) -> None:
+        images, llm, rest = _split_question(q)
+        values = q.get('answer_values')
+        question_id = c.execute(
+            "INSERT INTO questions (form_id, position, question_number, question_text, answer_type, answer_values, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (form_id, position, q.get('question_number'), q.get('question_text'), q.get('answer_type'),
+             None if values is None else json_utils.dumps(values, pretty=False),
+             json_utils.dumps(rest, pretty=False))).lastrowid
+        for img_pos, img in enumerate(images):
+            img = img if isinstance(img, dict) else {"value": img}
+            extra = {k: v for k, v in img.items() if k not in _IMAGE_COLUMNS and k != 'question_text'}
+            c.execute("INSERT INTO images (question_id, position, filename, filepath, ocr_text, data) VALUES (?, ?, ?, ?, ?, ?)",
+                      (question_id, img_pos, img.get('filename'), img.get('filepath'), img.get('question_text'),
+                       json_utils.dumps(extra, pretty=False)))
+        if llm:
+            self._upsert_answer(c, question_id, llm)
+
+    def _upsert_answer(self, c: sqlite3.Connection, question_id: int, llm: Dict[str, Any]) -> None:
+        c.execute(
+            "INSERT OR REPLACE INTO answers (question_id, llm_answer, llm_justification, source, data, answered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (question_id, llm.get('llm_answer'), llm.get('llm_justification'), llm.get('llm_answer_source'),
+             json_utils.dumps(llm, pretty=False), _now()))
+
+    def save_form(self, form_id: int, data: Dict[str, Any], status: Optional[str] = None) -> None:
+        """Write back OCR text and llm_* fields of an already stored form (same question order)."""
+        with self._tx() as c:
+            qids = [r['id'] for r in c.execute("SELECT id FROM questions WHERE form_id = ? ORDER BY position", (form_id,))]
+            for question_id, q in zip(qids, data.get('questions', [])):
+                images, llm, _ = _split_question(q)
+                for img_pos, img in enumerate(images):
+                    if not isinstance(img, dict):
+                        continue
+                    extra = {k: v for k, v in img.items() if k not in _IMAGE_COLUMNS and k != 'question_text'}
+                    c.execute("UPDATE images SET ocr_text = ?, data = ? WHERE question_id = ? AND position = ?",
+                              (img.get('question_text'), json_utils.dumps(extra, pretty=False), question_id, img_pos))
+                if llm:
+                    self._upsert_answer(c, question_id, llm)
+            meta = {k: v for k, v in data.items() if k != 'questions'}
+            c.execute("UPDATE forms SET meta = ?, updated_at = ? WHERE id = ?",
+                      (json_utils.dumps(meta, pretty=False), _now(), form_id))
+            if status:
+                c.execute("UPDATE forms SET status = ?, lease_owner = NULL, lease_until = NULL, attempts = 0 WHERE id = ?",
+                          (status, form_id))
+
+    def save_answers(self, items) -> None:
+        """Write the llm_* fields of [(question_id, question dict)] (one chunk of a form)."""
+        with self._tx() as c:
+            for question_id, q in items:
+                llm = {k: v for k, v in q.items() if k.startswith('llm_')}
+                if llm:
+                    self._upsert_answer(c, question_id, llm)
+
+    def save_images(self, items) -> None:
+        """Write the OCR text and extra fields of [(image_id, image dict)]."""
+        with self._tx() as c:
+            for image_id, img in items:
+                extra = {k: v for k, v in img.items() if k not in _IMAGE_COLUMNS and k != 'question_text'}
+                c.execute("UPDATE images SET ocr_text = ?, data = ? WHERE id = ?",
+                          (img.get('question_text'), json_utils.dumps(extra, pretty=False), image_id))
+
+    def update_meta(self, form_id: int, **fields: Any) -> None:
+        """Merge form-level fields (e.g. ocr_processing_info) into the stored document."""
+        with self._tx() as c:
+            row = c.execute("SELECT meta FROM forms WHERE id = ?", (form_id,)).fetchone()
+            if row is None:
+                return
+            meta = json_utils.loads(row['meta'])
+            meta.update(fields)
+            c.execute("UPDATE forms SET meta = ?, updated_at = ? WHERE id = ?",
+                      (json_utils.dumps(meta, pretty=False), _now(), form_id))
+
+    def set_status(self, form_id: int, status: str, owner: Optional[str] = None) -> bool:
+        """Move a form to *status* (ends any lease on it). With *owner*, only while that
+        worker still holds the lease; False if it was lost and the form left untouched."""
+        if status not in STATUSES:
+            raise ValueError(f"unknown status {status!r}")
+        sql = "UPDATE forms SET status = ?, updated_at = ?, lease_owner = NULL, lease_until = NULL, attempts = 0 WHERE id = ?"
+        params = [status, _now(), form_id]
+        if owner is not None:
+            sql += " AND lease_owner = ?"
+            params.append(owner)
+        with self._tx() as c:
+            return c.execute(sql, params).rowcount == 1
+
+    def enqueue(self, url: str, form_name: Optional[str] = None, force: bool = False) -> Optional[int]:
+        """Queue a form link for scraping ('new'). Known URLs are only re-queued after a
+        failure, or when *force*; returns the form id, or None when the URL is left as is."""
+        now = _now()
+        with self._tx() as c:
+            row = c.execute("SELECT id, status FROM forms WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return c.execute(
+                    "INSERT INTO forms (url, form_name, status, meta, created_at, updated_at) VALUES (?, ?, 'new', ?, ?, ?)",
+                    (url, form_name, json_utils.dumps({"url": url}, pretty=False), now, now)).lastrowid
+            if row['status'] in ('new', 'failed') or force:
+                c.execute("UPDATE forms SET status = 'new', form_name = COALESCE(?, form_name), updated_at = ?, "
+                          "lease_owner = NULL, lease_until = NULL, attempts = 0 WHERE id = ?", (form_name, now, row['id']))
+                return row['id']
+            return None
+
+    # ------------------------------------------------------------ work queue
+
+    def claim(self, status: str, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[sqlite3.Row]:
+        """Lease the oldest form waiting in *status* that nobody holds; None when there is none."""
+        now = time.time()
+        with self._tx() as c:
+            row = c.execute("SELECT id FROM forms WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) "
+                            "ORDER BY id LIMIT 1", (status, now)).fetchone()
+            if row is None:
+                return None
+            c.execute("UPDATE forms SET lease_owner = ?, lease_until = ? WHERE id = ?",
+                      (owner, now + lease_seconds, row['id']))
+            return c.execute("SELECT * FROM forms WHERE id = ?", (row['id'],)).fetchone()
+
+    def claims(self, status: str, owner: str, lease_seconds: float = LEASE_SECONDS) -> Iterator[sqlite3.Row]:
+        """Claim forms one at a time until none is left in *status*."""
+        while True:
+            row = self.claim(status, owner, lease_seconds)
+            if row is None:
+                return
+            yield row
+
+    def renew(self, form_id: int, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend our lease on a long-running form; False if it was lost (expired and re-claimed)."""
+        with self._tx() as c:
+            return c.execute("UPDATE forms SET lease_until = ? WHERE id = ? AND lease_owner = ?",
+                             (time.time() + lease_seconds, form_id, owner)).rowcount == 1
+
+    def release(self, form_id: int, retry_after: float = 0.0, failed: bool = True) -> bool:
+        """Give a claimed form back without changing its status (retried after *retry_after* s).
+
+        failed=True counts an attempt: at MAX_ATTEMPTS the form moves to 'failed'
+        instead, and False is returned. failed=False (work deferred, not the
+        form's fault) leaves the count alone."""
+        with self._tx() as c:
+            if failed:
+                c.execute("UPDATE forms SET attempts = attempts + 1 WHERE id = ?", (form_id,))
+                row = c.execute("SELECT attempts FROM forms WHERE id = ?", (form_id,)).fetchone()
+                if row is not None and row['attempts'] >= MAX_ATTEMPTS > 0:
+                    c.execute("UPDATE forms SET status = 'failed', updated_at = ?, lease_owner = NULL, "
+                              "lease_until = NULL WHERE id = ?", (_now(), form_id))
+                    return False
+            c.execute("UPDATE forms SET lease_owner = NULL, lease_until = ? WHERE id = ?",
+                      (time.time() + retry_after if retry_after > 0 else None, form_id))
+            return True
+
+    # ------------------------------------------------------------ queries
+
+    def form(self, form_id: int) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM forms WHERE id = ?", (form_id,)).fetchone()
+
+    def find_by_url(self, url: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM forms WHERE url = ?", (url,)).fetchone()
+
+    def find_by_name(self, form_name: str) -> List[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM forms WHERE form_name = ? ORDER BY id", (form_name,)).fetchall()
+
+    def forms(self, status: Optional[str] = None) -> List[sqlite3.Row]:
+        if status is None:
+            return self.conn.execute("SELECT * FROM forms ORDER BY id").fetchall()
+        return self.conn.execute("SELECT * FROM forms WHERE status = ? ORDER BY id", (status,)).fetchall()
+
+    def iter_forms(self, status: Optional[str] = None) -> Iterator[sqlite3.Row]:
+        """Like forms() without the document column, one row at a time."""
+        columns = "id, url, form_name, status, contains_images, created_at, updated_at, lease_owner, lease_until"
+        if status is None:
+            yield from self.conn.execute(f"SELECT {columns} FROM forms ORDER BY id")
+        else:
+            yield from self.conn.execute(f"SELECT {columns} FROM forms WHERE status = ? ORDER BY id", (status,))
+
+    def pending(self, status: str) -> List[int]:
+        """Ids of forms waiting in *status* (i.e. for the stage that consumes it)."""
+        return [r['id'] for r in self.forms(status)]
+
+    def counts(self) -> Dict[str, int]:
+        return {r['status']: r['n'] for r in self.conn.execute("SELECT status, COUNT(*) AS n FROM forms GROUP BY status")}
+
+    def available(self, status: str) -> int:
+        """Forms in *status* that could be claimed right now."""
+        return self.conn.execute("SELECT COUNT(*) FROM forms WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                                 (status, time.time())).fetchone()[0]
+
+    def load_form(self, form_id: int) -> Optional[Dict[str, Any]]:
+        """Rebuild the JSON document of a form (scraper schema + OCR text + llm_* fields)."""
+        row = self.form(form_id)
+        if row is None:
+            return None
+        data = json_utils.loads(row['meta'])
+        data['questions'] = [item for _, _, item in self._questions(form_id)]
+        return data
+
+    def form_meta(self, form_id: int) -> Optional[Dict[str, Any]]:
+        """Form-level fields of the document, without its questions."""
+        row = self.conn.execute("SELECT meta FROM forms WHERE id = ?", (form_id,)).fetchone()
+        return json_utils.loads(row['meta']) if row else None
+
+    def question_count(self, form_id: int) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM questions WHERE form_id = ?", (form_id,)).fetchone()[0]
+
+    def question_chunks(self, form_id: int, size: int = 0) -> Iterator[List[tuple]]:
+        """[(question_id, question dict)] of a form, *size* questions at a time (0: all at once).
+        Only the current chunk is read from the database, for memory-bounded processing."""
+        position = -1
+        while True:
+            chunk = self._questions(form_id, after=position, limit=size)
+            if not chunk:
+                return
+            yield [(question_id, item) for question_id, _, item in chunk]
+            if not size:
+                return
+            position = chunk[-1][1]
+
+    def _questions(self, form_id: int, after: int = -1, limit: int = 0) -> List[tuple]:
+        """[(question_id, position, question dict)] after *position*, at most *limit* (0: all)."""
+        sql = "SELECT * FROM questions WHERE form_id = ? AND position > ? ORDER BY position"
+        params: tuple = (form_id, after)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        q_rows = self.conn.execute(sql, params).fetchall()
+        if not q_rows:
+            return []
+        lo, hi = q_rows[0]['position'], q_rows[-1]['position']
+        images: Dict[int, List[Dict[str, Any]]] = {}
+        for img in self.conn.execute(
+                "SELECT i.* FROM images i JOIN questions q ON q.id = i.question_id "
+                "WHERE q.form_id = ? AND q.position BETWEEN ? AND ? ORDER BY i.question_id, i.position", (form_id, lo, hi)):
+            images.setdefault(img['question_id'], []).append(self._image_item(img))
+        answers = {a['question_id']: json_utils.loads(a['data']) for a in self.conn.execute(
+            "SELECT a.* FROM answers a JOIN questions q ON q.id = a.question_id "
+            "WHERE q.form_id = ? AND q.position BETWEEN ? AND ?", (form_id, lo, hi))}
+        out = []
+        for q in q_rows:
+            item: Dict[str, Any] = {}
+            if q['question_number'] is not None:
+                item['question_number'] = q['question_number']
+            item['question_text'] = q['question_text']
+            item.update(json_utils.loads(q['data']))
+            item['images'] = images.get(q['id'], [])
+            item['answer_type'] = q['answer_type']
+            if q['answer_values'] is not None:
+                item['answer_values'] = json_utils.loads(q['answer_values'])
+            item.update(answers.get(q['id'], {}))
+            out.append((q['id'], q['position'], item))
+        return out
+
+    @staticmethod
+    def _image_item(img: sqlite3.Row) -> Dict[str, Any]:
+        item = {"filename": img['filename'], "filepath": img['filepath']}
+        item.update(json_utils.loads(img['data']))
+        if img['ocr_text'] is not None:
+            item['question_text'] = img['ocr_text']
+        return item
+
+    def image_batches(self, form_id: int, size: int, pending_only: bool = True) -> Iterator[List[tuple]]:
+        """[(image_id, image dict)] of a form, *size* at a time (by default those without OCR text yet)."""
+        sql = ("SELECT i.* FROM images i JOIN questions q ON q.id = i.question_id WHERE q.form_id = ? AND i.id > ? "
+               + ("AND i.ocr_text IS NULL " if pending_only else "") + "ORDER BY i.id LIMIT ?")
+        last = 0
+        while True:
+            rows = self.conn.execute(sql, (form_id, last, max(size, 1))).fetchall()
+            if not rows:
+                return
+            last = rows[-1]['id']
+            yield [(r['id'], self._image_item(r)) for r in rows]
+
+    def answered_questions(self) -> Iterator[Dict[str, Any]]:
+        """Stored answers of questions without OCR text, with question text and options (answer reuse)."""
+        sql = ("SELECT q.question_text, q.answer_values, a.data FROM answers a JOIN questions q ON q.id = a.question_id "
+               "WHERE NOT EXISTS (SELECT 1 FROM images i WHERE i.question_id = q.id AND i.ocr_text IS NOT NULL) "
+               "ORDER BY a.answered_at")
+        for row in self.conn.execute(sql):
+            item = {"question_text": row['question_text'],
+                    "answer_values": json_utils.loads(row['answer_values']) if row['answer_values'] else []}
+            item.update(json_utils.loads(row['data']))
+            yield item
+
+    # ------------------------------------------------------------ JSON import / export
+
+    def export_json(self, form_id: int, path: Union[str, Path], chunk_size: int = 0) -> Optional[Path]:
+        """Write the document of a form; with *chunk_size* the questions are streamed
+        chunk by chunk into the file instead of building the whole document in memory."""
+        if not chunk_size:
+            data = self.load_form(form_id)
+            return json_utils.dump(data, path) if data is not None else None
+        meta = self.form_meta(form_id)
+        if meta is None:
+            return None
+        meta.pop('questions', None)
+        head = json_utils.dumps_bytes(meta, pretty=False)
+        head = (head[:-1] + b',' if len(head) > 2 else b'{') + b'"questions":['
+
+        def parts():
+            yield head
+            first = True
+            for chunk in self.question_chunks(form_id, chunk_size):
+                body = b','.join(json_utils.dumps_bytes(item, pretty=False) for _, item in chunk)
+                yield body if first else b',' + body
+                first = False
+            yield b']}'
+        return json_utils.dump_stream(parts(), path)
+
+    def import_json(self, path: Union[str, Path]) -> Optional[int]:
+        """Import one legacy JSON file; its status follows the most advanced data it holds."""
+        data = json_utils.load(path)
+        if not isinstance(data, dict) or not data.get('url'):
+            return None
+        questions = data.get('questions', [])
+        if any('llm_answer' in q for q in questions):
+            status = 'answered'
+        elif data.get('ocr_processing_info') or not data.get('contains_images'):
+            status = 'ocr_done'
+        else:
+            status = 'scraped'
+        existing = self.find_by_url(data['url'])
+        if existing and STATUSES.index(existing['status']) > STATUSES.index(status) and existing['status'] != 'failed':
+            return existing['id']  # keep the more advanced version
+        return self.upsert_form(data, status=status)
+
+    def import_directory(self, folder: Union[str, Path]) -> int:
+        files = sorted(Path(folder).glob('*.json'), key=lambda p: p.stat().st_mtime)
+        return sum(1 for f in files if self.import_json(f) is not None)
+
+
+class _Transaction:
+    def __init__(self, store: ArtifactStore):
+        self.store = store
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.store._lock.acquire()
+        self.store.conn.execute("BEGIN IMMEDIATE")
+        return self.store.conn
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.store.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store._lock.release()
+        return False
+
+
+def default_path() -> Path:
+    output = os.getenv('FORMS_AI_OUTPUT_DIR', r"C:\Users\abdel\OneDrive\Bureau\Microsoft-forms-AI\data\output")
+    return Path(os.getenv('FORMS_AI_STORE', str(Path(output) / 'artifacts.db')))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__)
+        return 1
+    store = ArtifactStore(default_path())
+    cmd, args = argv[0], argv[1:]
+    if cmd == 'import' and args:
+        print(f"{store.import_directory(args[0])} formulaire(s) importé(s) dans {store.path}")
+    elif cmd == 'list':
+        for row in store.forms(args[0] if args else None):
+            lease = f"  [{row['lease_owner']}]" if row['lease_owner'] and (row['lease_until'] or 0) > time.time() else ''
+            print(f"{row['id']:>5}  {row['status']:<9} {row['form_name'] or '-':<30} {row['url']}{lease}")
+        print(store.counts())
+    elif cmd == 'export' and len(args) == 2:
+        row = store.form(int(args[0])) if args[0].isdigit() else store.find_by_url(args[0])
+        if row is None:
+            print(f"Formulaire introuvable: {args[0]}")
+            return 1
+        print(store.export_json(row['id'], args[1]))
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
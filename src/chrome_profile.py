@@ -0,0 +1,208 @@
+"""Lean Chrome profile for the scraper: only the form's HTML, scripts and XHRs are fetched.
+
+The scraper reads the DOM and downloads question images itself (``requests`` on
+the ``<img src>``), so everything else a form page pulls is wasted time:
+
+- blocked through CDP ``Network.setBlockedURLs``: web fonts, images/media,
+  telemetry and analytics endpoints (BLOCKED_URL_PATTERNS + FORMS_AI_CHROME_BLOCK)
+- switches turning off extensions, background networking, component updates,
+  sync, translation...
+- ``eager`` page load strategy: ``driver.get`` returns at DOMContentLoaded; the
+  scraper then waits for the question list itself (FORMS_AI_PAGE_WAIT seconds max)
+- FORMS_AI_CHROME_PROFILE: persistent user-data directory (HTTP cache, compiled
+  scripts) reused between forms and runs; one slot per concurrent Chrome, held
+  through an exclusive lock on ``slot<N>.lock`` (flock / msvcrt, dropped by the
+  OS if the holder dies) for the driver's lifetime. Chrome's own SingletonLock
+  left by a killed browser (dead ``host-pid`` target) is removed when the slot
+  is taken or by clear_stale_locks()
+
+    FORMS_AI_CHROME_LEAN=0     previous behaviour (normal load, nothing blocked)
+"""
+from __future__ import annotations
+import os
+import socket
+from pathlib import Path
+from typing import IO, List, Optional
+
+from .logging_utils import log
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+LEAN = os.getenv('FORMS_AI_CHROME_LEAN', '1') == '1'
+PAGE_LOAD_STRATEGY = os.getenv('FORMS_AI_PAGE_LOAD', 'eager' if LEAN else 'normal')
+PROFILE_DIR = os.getenv('FORMS_AI_CHROME_PROFILE', '')
+PROFILE_SLOTS = 16
+
+BLOCKED_URL_PATTERNS = (
+    # fonts
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # images and media (question images are downloaded separately)
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.mp4', '*.webm',
+    # telemetry / analytics
+    '*browser.events.data.microsoft.com*', '*mobile.events.data.microsoft.com*', '*browser.pipe.aria.microsoft.com*',
+    '*js.monitor.azure.com*', '*.clarity.ms*', '*google-analytics.com*', '*googletagmanager.com*',
+    '*doubleclick.net*', '*/telemetry/*', '*/analytics/*',
+)
+EXTRA_BLOCKED = tuple(p.strip() for p in os.getenv('FORMS_AI_CHROME_BLOCK', '').split(',') if p.strip())
+
+LEAN_ARGUMENTS = (
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-sync',
+    '--disable-default-apps',
+    '--disable-client-side-phishing-detection',
+    '--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--metrics-recording-only',
+    '--mute-audio',
+)
+
+# Files Chrome keeps in a user-data directory while it runs (SingletonLock -> "<host>-<pid>" on POSIX)
+_SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def apply_options(options) -> None:
+    """Add the lean switches and page load strategy to ChromeOptions."""
+    if not LEAN:
+        return
+    for arg in LEAN_ARGUMENTS:
+        options.add_argument(arg)
+    options.page_load_strategy = PAGE_LOAD_STRATEGY
+
+
+def blocked_patterns() -> List[str]:
+    return list(BLOCKED_URL_PATTERNS + EXTRA_BLOCKED) if LEAN else list(EXTRA_BLOCKED)
+
+
+def block_resources(driver) -> bool:
+    """Install the URL blocklist on a started driver; False if CDP is unavailable."""
+    patterns = blocked_patterns()
+    if not patterns:
+        return False
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        return True
+    except Exception as e:
+        log('SCRAPE', f"Blocage réseau CDP indisponible: {e}", level='DEBUG')
+        return False
+
+
+
+def _try_lock(path: Path) -> Optional[IO[bytes]]:
+    """Open *path* with an exclusive non-blocking lock; None if someone holds it."""
+    handle = open(path, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _unlock(handle: IO[bytes]) -> None:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+    handle.close()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _clear_chrome_locks(path: Path) -> bool:
+    """Remove the lock files of a dead Chrome in *path*; False if a live one may still use it."""
+    singleton = path / 'SingletonLock'
+    if os.path.islink(singleton):
+        host, _, pid = os.readlink(singleton).rpartition('-')
+        if host != socket.gethostname() or not pid.isdigit() or _pid_alive(int(pid)):
+            return False
+        for name in _SINGLETON_FILES:
+            try:
+                os.unlink(path / name)
+            except OSError:
+                pass
+        log('SCRAPE', f"Verrou Chrome périmé supprimé: {path} (pid {pid})", level='DEBUG')
+    lockfile = path / 'lockfile'  # Windows: held open by a running Chrome
+    if lockfile.exists():
+        try:
+            lockfile.unlink()
+        except OSError:
+            return False
+    return True
+
+
+class ProfileSlot:
+    """Exclusive use of one user-data directory until release() (or the process dies)."""
+
+    def __init__(self, path: Path, handle: IO[bytes]):
+        self.path = path
+        self._handle: Optional[IO[bytes]] = handle
+
+    def release(self) -> None:
+        if self._handle is not None:
+            _unlock(self._handle)
+            self._handle = None
+
+
+def acquire_slot() -> Optional[ProfileSlot]:
+    """A free slot of FORMS_AI_CHROME_PROFILE (warm cache), or None for a throw-away profile."""
+    if not PROFILE_DIR:
+        return None
+    root = Path(PROFILE_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    for slot in range(PROFILE_SLOTS):
+        handle = _try_lock(root / f"slot{slot}.lock")
+        if handle is None:
+            continue
+        path = root / f"slot{slot}"
+        if _clear_chrome_locks(path):
+            path.mkdir(exist_ok=True)
+            return ProfileSlot(path, handle)
+        _unlock(handle)
+    log('SCRAPE', f"Aucun profil Chrome libre dans {root} - profil temporaire", level='WARN')
+    return None
+
+
+def clear_stale_locks() -> int:
+    """Remove dead Chrome locks from the slots nobody holds; returns how many slots were cleaned."""
+    if not PROFILE_DIR or not os.path.isdir(PROFILE_DIR):
+        return 0
+    root, cleaned = Path(PROFILE_DIR), 0
+    for slot in range(PROFILE_SLOTS):
+        path = root / f"slot{slot}"
+        if not (os.path.lexists(path / 'SingletonLock') or (path / 'lockfile').exists()):
+            continue
+        handle = _try_lock(root / f"slot{slot}.lock")
+        if handle is None:
+            continue
+        try:
+            cleaned += _clear_chrome_locks(path)
+        finally:
+            _unlock(handle)
+    return cleaned
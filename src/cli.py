@@ -0,0 +1,125 @@
+"""Command line entry point (``forms-ai``): the whole pipeline or a single stage.
+
+    python main.py                              # = run: full pipeline, as before
+    python main.py scrape                       # read the Excel links, queue new ones, scrape them
+    python main.py scrape --queue-only --watch  # extra scraper: only consume queued links
+    python main.py ocr --watch                  # OCR worker (CPU box)
+    python main.py answer --watch               # LLM worker (next to Ollama)
+    python main.py index
+    python main.py status
+
+(``python -m src.cli ...`` is equivalent.) Stages coordinate through the
+artifact store: each worker claims one form at a time in its input status
+(new -> scraped -> ocr_done -> answered) with a lease, so any number of
+workers per stage can share one database without an external broker. Workers
+on other machines need the same FORMS_AI_STORE file and output directory
+(images); on a network share set FORMS_AI_STORE_JOURNAL=delete.
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .logging_utils import log, log_section, set_async
+
+STAGE_HELP = {
+    "scrape": "queue the Excel links and scrape queued forms (Chrome)",
+    "ocr": "OCR the images of scraped forms (EasyOCR)",
+    "answer": "answer the questions of OCR'd forms (Ollama)",
+    "index": "upload answered forms to Elasticsearch",
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='forms-ai', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default=None, help='artifact database shared by the workers (default: FORMS_AI_STORE)')
+    parser.add_argument('--log-async', action='store_true',
+                        help='write logs in batches from a background thread (FORMS_AI_LOG_ASYNC=1)')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('run', help='full pipeline (default)')
+    for name, help_text in STAGE_HELP.items():
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--watch', action='store_true', help='keep polling for new work instead of exiting when idle')
+        p.add_argument('--poll', type=float, default=10.0, help='seconds between polls when idle (--watch)')
+        p.add_argument('--max-idle', type=float, default=0.0, help='with --watch: exit after this many idle seconds (0 = never)')
+        if name == 'scrape':
+            p.add_argument('--queue-only', action='store_true', help='do not read the Excel file, only scrape queued links')
+    sub.add_parser('status', help='forms per status and active leases')
+    return parser
+
+
+def run_worker(pipeline, stage: str, watch: bool, poll: float, max_idle: float, queue_only: bool = False) -> int:
+    """Process the stage until its queue is empty (or forever with *watch*); returns forms processed."""
+    steps = pipeline.STAGES[stage]
+    skip_links = stage == 'scrape' and queue_only
+    total = 0
+    idle_since = time.monotonic()
+    while True:
+        state = {}
+        for step in (steps[1:] if skip_links else steps):
+            state = step(state)
+        done = state.get("processed", {}).get(stage, 0)
+        total += done
+        if not watch:
+            return total
+        skip_links = stage == 'scrape'  # links are read once per worker
+        if done:
+            idle_since = time.monotonic()
+            continue
+        if max_idle and time.monotonic() - idle_since >= max_idle:
+            log('WORKER', f"{stage}: inactif depuis {max_idle:.0f}s - arrêt")
+            return total
+        time.sleep(poll)
+
+
+def print_status(store) -> None:
+    counts = store.counts()
+    print(f"Base: {store.path}")
+    for status in ('new', 'scraped', 'ocr_done', 'answered', 'indexed', 'failed'):
+        print(f"  {status:<9} {counts.get(status, 0):>6}")
+    now = time.time()
+    for row in store.forms():
+        if row["lease_owner"] and (row["lease_until"] or 0) > now:
+            print(f"  #{row['id']} {row['status']} en cours par {row['lease_owner']} "
+                  f"(bail {row['lease_until'] - now:.0f}s)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    command = args.command or 'run'
+    if args.log_async:
+        set_async(True)
+    from . import LangChainPipelineAgent as pipeline  # after parsing: --help stays instant
+    from . import metrics_exporter, metrics_utils, tracing
+    from .profiling import profiled
+    if args.store:
+        pipeline.open_store(Path(args.store))
+    if command == 'run':
+        pipeline.run_pipeline()
+        return 0
+    store = pipeline.get_store()
+    if command == 'status':
+        print_status(store)
+        return 0
+    log_section(f"WORKER {command.upper()} ({pipeline.WORKER_ID})")
+    metrics_exporter.start_from_env()
+    metrics_utils.METRICS.reset()
+    tracing.reset()
+    total = 0
+    try:
+        with profiled(command, pipeline.PROFILES_DIR), metrics_utils.timed(f'worker.{command}'):
+            total = run_worker(pipeline, command, args.watch, args.poll, args.max_idle,
+                               getattr(args, 'queue_only', False))
+    except KeyboardInterrupt:
+        log('WORKER', f"{command}: interrompu", level='WARN')
+    log('WORKER', f"{command}: {total} formulaire(s) traité(s) | base: {store.counts()}")
+    pipeline.write_metrics(command)
+    pipeline.write_trace(command)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Context assembly: question text + a de-noised, budgeted digest of its images' OCR text.
+
+Question.full_text() appends every OCR text in full, so image-heavy questions
+(slides, screenshots of documents) produced prompts of thousands of tokens that
+dominated LLM latency. ContextBuilder.build() keeps the same
+``text | OCR: ... | OCR: ...`` shape but, per question:
+
+1. splits each image's OCR text into segments: the lines of its ``ocr_lines``
+   layout in reading order, those under FORMS_AI_CONTEXT_MIN_CONFIDENCE left
+   out (default: the OCR step's threshold), else the lines of its text, long
+   lines cut at sentence ends
+2. drops noise: OCR status strings ("Aucun texte détecté", "Erreur OCR: ..."),
+   fragments without a word or a number, or made mostly of symbols
+3. drops segments already seen (case, spacing and punctuation ignored), across
+   images and against the question text itself
+4. over FORMS_AI_CONTEXT_TOKENS (estimate_tokens of the OCR part; the question
+   text is never cut): keeps the segments sharing the most words with the
+   question, then the most confident, in their original order; the last one
+   that does not fit is cut at a word boundary
+
+Token counts before/after are recorded in the value
+histograms ``context.tokens_raw`` / ``context.tokens`` (metrics_utils.observe).
+
+    FORMS_AI_CONTEXT_TOKENS=0    no budget (dedupe and noise filter only)
+"""
+from __future__ import annotations
+import math
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics_utils import observe
+from .models import Image, Question, join_ocr
+from .ocr_layout import OcrLayout
+from .prompt_templates import estimate_tokens
+
+CONTEXT_TOKENS = int(os.getenv('FORMS_AI_CONTEXT_TOKENS', '400'))
+OCR_MIN_CONFIDENCE = float(os.getenv('FORMS_AI_OCR_MIN_CONFIDENCE', '0.3'))  # text written by the OCR step
+CONTEXT_MIN_CONFIDENCE = float(os.getenv('FORMS_AI_CONTEXT_MIN_CONFIDENCE', str(OCR_MIN_CONFIDENCE)))
+MIN_ALNUM_RATIO = 0.4   # share of letters/digits in a segment's non-space characters
+LONG_SEGMENT = 200      # characters; longer lines are split at sentence ends
+
+# What FormsImageExtractionAgent writes instead of text when OCR gave nothing
+OCR_STATUS_TEXTS = ("Aucun texte détecté", "EasyOCR non disponible", "Image non trouvée", "Erreur OCR")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+_WORDS = re.compile(r"\w{3,}", re.UNICODE)
+_CONTENT = re.compile(r"[^\W\d_]{3,}|\d{2,}", re.UNICODE)  # a real word or a number
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_segment(text: str) -> str:
+    return _NON_WORD.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+
+def split_segments(ocr_text: str) -> List[str]:
+    segments = []
+    for line in ocr_text.splitlines():
+        line = line.strip()
+        if len(line) > LONG_SEGMENT:
+            segments.extend(s for s in _SENTENCE_END.split(line) if s)
+        elif line:
+            segments.append(line)
+    return segments
+
+
+def is_noise(segment: str) -> bool:
+    if segment.startswith(OCR_STATUS_TEXTS):
+        return True
+    if not _CONTENT.search(segment):
+        return True
+    chars = [c for c in segment if not c.isspace()]
+    return sum(1 for c in chars if c.isalnum()) < MIN_ALNUM_RATIO * len(chars)
+
+
+def _cut(segment: str, tokens: int) -> str:
+    """First *tokens* estimated tokens of *segment*, cut at a word boundary."""
+    words, out, used = segment.split(), [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > tokens:
+            break
+        out.append(word)
+        used += cost
+    return ' '.join(out) + ' …' if out else ''
+
+
+Segment = Tuple[str, float]  # text, OCR confidence (1.0 without a layout)
+
+
+class ContextBuilder:
+    def __init__(self, token_budget: int = CONTEXT_TOKENS, min_confidence: float = CONTEXT_MIN_CONFIDENCE):
+        self.token_budget = token_budget
+        self.min_confidence = min_confidence
+
+    def image_segments(self, image: Image) -> List[Segment]:
+        layout: Optional[OcrLayout] = OcrLayout.from_dict(image.ocr_lines)
+        if layout is not None:
+            return [(line.text.strip(), line.confidence) for line in layout.lines
+                    if line.confidence >= self.min_confidence and line.text.strip()]
+        return [(segment, 1.0) for segment in split_segments(image.ocr_text or '')]
+
+    def segments(self, question: Question) -> List[List[Segment]]:
+        """Kept OCR segments per image (deduplicated, noise removed), before the budget."""
+        seen: Set[str] = {normalize_segment(question.question_text)}
+        per_image = []
+        for image in question.images:
+            kept = []
+            for segment, confidence in self.image_segments(image):
+                key = normalize_segment(segment)
+                if not key or key in seen or is_noise(segment):
+                    continue
+                seen.add(key)
+                kept.append((segment, confidence))
+            per_image.append(kept)
+        return per_image
+
+    def select(self, question_text: str, per_image: List[List[Segment]]) -> List[List[str]]:
+        """Extractive cut of the segments to the token budget, original order kept."""
+        flat = [(i, s, c, estimate_tokens(s)) for i, segs in enumerate(per_image) for s, c in segs]
+        if not self.token_budget or sum(t for *_, t in flat) <= self.token_budget:
+            return [[s for s, _ in segs] for segs in per_image]
+        q_words = {w.casefold() for w in _WORDS.findall(question_text)}
+
+        def score(item) -> float:
+            words = {w.casefold() for w in _WORDS.findall(item[1])}
+            return len(words & q_words) / math.sqrt(1 + len(words))
+
+        ranked = sorted(range(len(flat)), key=lambda k: (-score(flat[k]), -flat[k][2], k))
+        chosen: Dict[int, str] = {}
+        left = self.token_budget
+        for k in ranked:
+            tokens = flat[k][3]
+            if tokens <= left:
+                chosen[k] = flat[k][1]
+                left -= tokens
+            elif left > 0:
+                cut = _cut(flat[k][1], left)
+                if cut:
+                    chosen[k] = cut
+                break
+        out: List[List[str]] = [[] for _ in per_image]
+        for k in sorted(chosen):
+            out[flat[k][0]].append(chosen[k])
+        return out
+
+    def build(self, question: Question) -> str:
+        """Prompt text of *question*; records the raw and assembled token counts."""
+        raw = question.full_text()
+        text = raw
+        if question.images:
+            kept = self.select(question.question_text, self.segments(question))
+            text = join_ocr(question.question_text, (' '.join(segs) for segs in kept))
+        raw_tokens = estimate_tokens(raw)
+        observe('context.tokens_raw', raw_tokens)
+        observe('context.tokens', raw_tokens if text is raw else estimate_tokens(text))
+        return text
+
+    def build_many(self, questions: Iterable[Question]) -> List[str]:
+        return [self.build(q) for q in questions]
+
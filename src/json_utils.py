@@ -0,0 +1,95 @@
+"""JSON serialization for all artifacts (scraped forms, OCR/answer JSON, metrics, index).
+
+Uses orjson when installed (several times faster on large OCR payloads), the
+stdlib json module otherwise. Output is compact unless pretty=True or
+FORMS_AI_DEBUG=1 (FORMS_AI_JSON_PRETTY=1/0 overrides). Files are written
+atomically: temp file in the same directory, fsync, then os.replace, so a
+reader never sees a half-written file.
+"""
+from __future__ import annotations
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+PRETTY = os.getenv('FORMS_AI_JSON_PRETTY', os.getenv('FORMS_AI_DEBUG', '0')) == '1'
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+JSONDecodeError = ValueError  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any, pretty: Optional[bool] = None) -> bytes:
+    pretty = PRETTY if pretty is None else pretty
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=_default, option=option)
+    return dumps(obj, pretty).encode('utf-8')
+
+
+def dumps(obj: Any, pretty: Optional[bool] = None) -> str:
+    pretty = PRETTY if pretty is None else pretty
+    if orjson is not None:
+        return dumps_bytes(obj, pretty).decode('utf-8')
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def load(path: Union[str, Path]) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump(obj: Any, path: Union[str, Path], pretty: Optional[bool] = None) -> Path:
+    """Atomically write *obj* as JSON to *path* (parent directories created)."""
+    return dump_stream((dumps_bytes(obj, pretty),), path)
+
+
+def dump_stream(parts: Iterable[bytes], path: Union[str, Path]) -> Path:
+    """Atomically write already serialized JSON produced piece by piece (large documents)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for part in parts:
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o666 & ~_UMASK)  # mkstemp creates 0600; match a normal open()
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return path
@@ -0,0 +1,195 @@
+"""Spread LLM calls over several Ollama hosts.
+
+    FORMS_AI_OLLAMA_HOSTS   comma-separated base URLs, e.g.
+                            "http://gpu1:11434,http://gpu2:11434"
+    FORMS_AI_LLM_ROUTES     optional question type -> model map, e.g.
+                            "choiceItem=qwen2.5:3b,npsContainer=qwen2.5:3b,textInput=deepseek-r1:8b"
+                            (other types use FORMS_AI_LLM_MODEL / the agent default)
+
+Each call goes to the healthy host with the fewest outstanding requests among
+those serving the routed model (per /api/tags). A host is taken out of rotation
+after FORMS_AI_LLM_HOST_MAX_FAILURES consecutive failed calls or a failed
+health check, and re-probed every FORMS_AI_LLM_HEALTH_INTERVAL seconds.
+Connection errors fail over to the next host within the same call; timeouts
+are left to the caller's retry policy.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+from . import json_utils
+from .logging_utils import log
+from .metrics_utils import count, set_gauge
+from .LlamaLanguageModelAgent import OllamaAgent
+
+DEFAULT_MODEL = 'deepseek-r1:8b'
+
+
+def parse_routes(spec: str) -> Dict[str, str]:
+    routes = {}
+    for item in (spec or '').split(','):
+        qtype, sep, model = item.partition('=')
+        if sep and qtype.strip() and model.strip():
+            routes[qtype.strip()] = model.strip()
+    return routes
+
+
+def _is_connection_failure(answer: str) -> bool:
+    return answer.startswith(('FALLBACK_HTTP_ERROR', 'FALLBACK_EXCEPTION', 'LLM_ERROR:HTTP_ERROR', 'LLM_ERROR:EXCEPTION'))
+
+
+def _is_failure(answer: str) -> bool:
+    return answer.startswith(('FALLBACK_', 'LLM_ERROR'))
+
+
+class Backend:
+    """One Ollama host: health, served models, in-flight count, one agent per model."""
+
+    def __init__(self, host: str, offline_fallback: bool = True):
+        self.host = host.rstrip('/')
+        self.offline_fallback = offline_fallback
+        self.healthy = True
+        self.models: Optional[set] = None  # unknown until the first health check
+        self.outstanding = 0
+        self.failures = 0
+        self.last_check = 0.0
+        self._agents: Dict[str, OllamaAgent] = {}
+
+    def agent(self, model: str) -> OllamaAgent:
+        if model not in self._agents:
+            agent = OllamaAgent(model=model, offline_fallback=self.offline_fallback, host=self.host)
+            agent.model = model  # the route wins over FORMS_AI_LLM_MODEL
+            self._agents[model] = agent
+        return self._agents[model]
+
+    def serves(self, model: str) -> bool:
+        # Tags are "name:tag"; a route without tag matches ":latest"
+        return self.models is None or model in self.models or f"{model}:latest" in self.models
+
+    def check(self, timeout: float = 2.0) -> bool:
+        self.last_check = time.monotonic()
+        try:
+            with urllib.request.urlopen(f"{self.host}/api/tags", timeout=timeout) as resp:
+                body = json_utils.loads(resp.read())
+            self.models = {m.get('name', '') for m in body.get('models', [])}
+            self.healthy = True
+            self.failures = 0
+        except Exception as e:
+            if self.healthy:
+                log('LLM', f"Hôte {self.host} injoignable ({e}) - retiré de la rotation", level='WARN')
+            self.healthy = False
+        return self.healthy
+
+
+class LLMRouter:
+    def __init__(self, hosts: List[str], routes: Optional[Dict[str, str]] = None, default_model: Optional[str] = None,
+                 max_failures: int = 3, health_interval: float = 30.0, offline_fallback: bool = True):
+        if not hosts:
+            raise ValueError("LLMRouter needs at least one host")
+        self.backends = [Backend(h, offline_fallback) for h in hosts]
+        self.routes = routes or {}
+        self.default_model = default_model or os.getenv('FORMS_AI_LLM_MODEL', DEFAULT_MODEL)
+        self.max_failures = max_failures
+        self.health_interval = health_interval
+        self.offline_fallback = offline_fallback
+        self._lock = threading.Lock()
+        for backend in self.backends:
+            backend.check()
+            self._publish(backend)
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMRouter"]:
+        """Router for FORMS_AI_OLLAMA_HOSTS, or None when it is not set."""
+        hosts = [h.strip() for h in os.getenv('FORMS_AI_OLLAMA_HOSTS', '').split(',') if h.strip()]
+        if not hosts:
+            return None
+        return cls(
+            hosts,
+            routes=parse_routes(os.getenv('FORMS_AI_LLM_ROUTES', '')),
+            max_failures=int(os.getenv('FORMS_AI_LLM_HOST_MAX_FAILURES', '3')),
+            health_interval=float(os.getenv('FORMS_AI_LLM_HEALTH_INTERVAL', '30')),
+        )
+
+    def model_for(self, qtype: Optional[str]) -> str:
+        return self.routes.get(qtype or '', self.default_model)
+
+    def _publish(self, backend: Backend) -> None:
+        set_gauge('llm_backend_outstanding', backend.outstanding, host=backend.host)
+        set_gauge('llm_backend_healthy', int(backend.healthy), host=backend.host)
+
+    def _refresh(self) -> None:
+        """Re-probe hosts whose last check is older than the health interval (outside the lock)."""
+        now = time.monotonic()
+        for backend in self.backends:
+            if now - backend.last_check >= self.health_interval:
+                backend.check()
+                self._publish(backend)
+
+    def _acquire(self, model: str, exclude: set) -> Optional[Backend]:
+        with self._lock:
+            candidates = [b for b in self.backends if b.healthy and b not in exclude]
+            serving = [b for b in candidates if b.serves(model)]
+            if not serving:
+                return None
+            backend = min(serving, key=lambda b: b.outstanding)
+            backend.outstanding += 1
+            self._publish(backend)
+            return backend
+
+    def _release(self, backend: Backend, answer: str) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if _is_failure(answer):
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.max_failures:
+                    backend.healthy = False
+                    count('llm.backend_removed')
+                    log('LLM', f"Hôte {backend.host}: {backend.failures} échecs consécutifs - retiré de la rotation", level='WARN')
+            else:
+                backend.failures = 0
+            self._publish(backend)
+
+    def _call(self, stream: bool, prompt: str, timeout: float, qtype: Optional[str], **kwargs) -> str:
+        self._refresh()
+        model = self.model_for(qtype)
+        tried: set = set()
+        answer = "FALLBACK_NO_BACKEND_AUTO_ANSWER" if self.offline_fallback else "LLM_ERROR:NO_BACKEND"
+        while True:
+            backend = self._acquire(model, tried)
+            if backend is None:
+                if not tried:
+                    count('llm.no_backend')
+                    log('LLM', f"Aucun hôte disponible pour {model}", level='ERROR', indent=2)
+                return answer
+            tried.add(backend)
+            agent = backend.agent(model)
+            try:
+                call = agent.ask_stream if stream else agent.ask
+                answer = call(prompt, timeout=timeout, **kwargs)
+            finally:
+                self._release(backend, answer)
+            count(f'llm.route.{model}')
+            if not _is_connection_failure(answer):
+                return answer
+            count('llm.backend_failover')
+            backend.check()
+            self._publish(backend)
+
+    def ask(self, prompt: str, timeout: float = 45, qtype: Optional[str] = None, **kwargs) -> str:
+        return self._call(False, prompt, timeout, qtype, **kwargs)
+
+    def ask_stream(self, prompt: str, timeout: float = 90, qtype: Optional[str] = None, **kwargs) -> str:
+        return self._call(True, prompt, timeout, qtype, **kwargs)
+
+    def ask_for(self, qtype: Optional[str], stream: bool = False) -> Callable[..., str]:
+        """ask()-compatible callable bound to a question type (for ask_with_retries)."""
+        def ask(prompt: str, timeout: float = 45, **kwargs) -> str:
+            return self._call(stream, prompt, timeout, qtype, **kwargs)
+        return ask
+
+    def status(self) -> List[dict]:
+        return [{"host": b.host, "healthy": b.healthy, "outstanding": b.outstanding,
+                 "failures": b.failures, "models": sorted(b.models or [])} for b in self.backends]
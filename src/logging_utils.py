@@ -1,11 +1,41 @@
-from datetime import datetime
+"""Unified logger: ``log(component, message, level)``.
+
+Records are written and flushed on the calling thread by default, so they stay
+in order with the print() output of the agents (scraper, Elasticsearch
+uploader...). FORMS_AI_LOG_ASYNC=1 (or ``--log-async``, set_async()) hands them
+to a background writer thread that formats them and writes them in batches with
+one flush instead: cheaper for long unattended runs, but print() lines may then
+come out before records logged earlier (call flush() first when that matters).
+
+Output format (FORMS_AI_LOG_FORMAT):
+  console  (default) ``[HH:MM:SS][LEVEL][COMPONENT] message``, colored on a TTY
+  json     one JSON object per line: ts, level, component, message and the
+           structured fields (form, question, duration...) passed as keyword
+           arguments or bound with log_context()/bind_log_context()
+
+FORMS_AI_LOG_FILE appends to a file instead of stdout. Disabled levels are
+skipped before any formatting; pass a callable as message (``lambda: ...``) to
+defer building an expensive message until the level is known to be enabled.
+"""
+from __future__ import annotations
+import atexit
+import contextlib
+import contextvars
 import os
+import queue
 import sys
-from typing import Literal
+import threading
+import time
+from typing import Any, Callable, Dict, Literal, Union
 
 LogLevel = Literal['DEBUG','INFO','WARN','ERROR']
 _LEVEL_ORDER = {'DEBUG':10,'INFO':20,'WARN':30,'ERROR':40}
 DEFAULT_LEVEL = os.getenv('FORMS_AI_LOG_LEVEL','INFO').upper()
+LOG_FORMAT = os.getenv('FORMS_AI_LOG_FORMAT', 'console').lower()
+LOG_ASYNC = os.getenv('FORMS_AI_LOG_ASYNC', '0') == '1'
+LOG_FILE = os.getenv('FORMS_AI_LOG_FILE', '')
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.05  # seconds a record may wait in the queue
 
 COLOR = os.getenv('FORMS_AI_LOG_COLOR','1') != '0'
 _COLORS = {
@@ -16,27 +46,242 @@ _COLORS = {
     'RESET':'\x1b[0m'
 }
 
-def _allow(level: str) -> bool:
-    return _LEVEL_ORDER.get(level, 100) >= _LEVEL_ORDER.get(DEFAULT_LEVEL,20)
+Message = Union[str, Callable[[], str]]
+
+_LISTENERS = []
+_threshold = _LEVEL_ORDER.get(DEFAULT_LEVEL, 20)
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('forms_ai_log_context', default={})
+
+
+def add_listener(fn) -> None:
+    """Register fn(component, level, message) called for every log event (even filtered ones).
+    message is passed as given (possibly a callable, see log())."""
+    if fn not in _LISTENERS:
+        _LISTENERS.append(fn)
+
+
+def remove_listener(fn) -> None:
+    if fn in _LISTENERS:
+        _LISTENERS.remove(fn)
+
+
+def set_level(level: str) -> None:
+    global DEFAULT_LEVEL, _threshold
+    DEFAULT_LEVEL = level.upper()
+    _threshold = _LEVEL_ORDER.get(DEFAULT_LEVEL, 20)
+
+
+def enabled(level: str) -> bool:
+    """Cheap check to guard work that only feeds a log line."""
+    return _LEVEL_ORDER.get(level, 100) >= _threshold
+
+
+_allow = enabled
+
+
+# ---------------------------------------------------------------- context
+
+@contextlib.contextmanager
+def log_context(**fields: Any):
+    """Attach structured fields (form=..., question=...) to every record logged inside the block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind_log_context(**fields: Any) -> None:
+    """Merge fields into the current context (None removes a field), e.g. at the top of a loop body."""
+    merged = {**_context.get(), **fields}
+    _context.set({k: v for k, v in merged.items() if v is not None})
+
+
+# ---------------------------------------------------------------- formatters
+
+class ConsoleFormatter:
+    """``[HH:MM:SS][LEVEL][COMPONENT] message`` (level colored when *color*)."""
+
+    def __init__(self, color: bool = False):
+        self.color = color
+        self._second = -1
+        self._clock = ''
+
+    def _hms(self, ts: float) -> str:
+        second = int(ts)
+        if second != self._second:  # several records per second share one strftime
+            self._second = second
+            self._clock = time.strftime('%H:%M:%S', time.localtime(ts))
+        return self._clock
+
+    def format(self, ts: float, level: str, component: str, message: str, indent: int, end: str,
+               fields: Dict[str, Any]) -> str:
+        prefix = f"[{self._hms(ts)}][{level}][{component}]"
+        body_indent = '  ' * max(indent, 0)
+        if self.color:
+            return f"{_COLORS.get(level, '')}{prefix}{_COLORS['RESET']} {body_indent}{message}{end}"
+        return f"{prefix} {body_indent}{message}{end}"
+
+
+class JsonFormatter:
+    """One JSON object per line (fields of the context and of the call included)."""
+
+    def __init__(self):
+        from . import json_utils
+        self._dumps = json_utils.dumps
+
+    def format(self, ts: float, level: str, component: str, message: str, indent: int, end: str,
+               fields: Dict[str, Any]) -> str:
+        msecs = int((ts - int(ts)) * 1000)
+        record = {"ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts)) + f".{msecs:03d}",
+                  "level": level, "component": component, "message": message}
+        record.update(fields)
+        return self._dumps(record, pretty=False) + '\n'
+
+
+# ---------------------------------------------------------------- writers
 
-def log(component: str, message: str, level: LogLevel = 'INFO', indent: int = 0, end: str='\n') -> None:
+class _SyncWriter:
+    def __init__(self, stream, formatter):
+        self.stream = stream
+        self.formatter = formatter
+        self._lock = threading.Lock()
+
+    def emit(self, record: tuple) -> None:
+        line = self.formatter.format(*record)
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncWriter:
+    """Background thread draining a queue: format a batch, one write, one flush."""
+
+    def __init__(self, stream, formatter, batch_size: int = BATCH_SIZE, interval: float = FLUSH_INTERVAL):
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='forms-ai-log-writer', daemon=True)
+        self._thread.start()
+
+    def emit(self, record: tuple) -> None:
+        self._queue.put(record)
+
+    def _write(self, batch: list) -> None:
+        try:
+            self.stream.write(''.join(self.formatter.format(*r) for r in batch))
+            self.stream.flush()
+        except Exception:
+            pass  # never let logging kill the writer thread
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is self._stop:
+                    self._write(batch)
+                    return
+                if isinstance(item, threading.Event):  # flush() barrier
+                    self._write(batch)
+                    batch = []
+                    item.set()
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Block until every record queued so far is written."""
+        if self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join(2.0)
+
+
+def _make_writer():
+    stream = open(LOG_FILE, 'a', encoding='utf-8') if LOG_FILE else sys.stdout
+    if LOG_FORMAT == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = ConsoleFormatter(color=COLOR and not LOG_FILE and sys.stdout.isatty())
+    return _AsyncWriter(stream, formatter) if LOG_ASYNC else _SyncWriter(stream, formatter)
+
+
+_writer = _make_writer()
+
+
+def _close() -> None:
+    _writer.close()
+
+
+def _restart_after_fork() -> None:
+    global _writer
+    _writer = _make_writer()  # the parent's writer thread does not exist in the child
+
+
+atexit.register(_close)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def set_async(enabled: bool) -> None:
+    """Switch between the synchronous and the background writer (records queued so far are written first)."""
+    global LOG_ASYNC, _writer
+    if enabled == LOG_ASYNC:
+        return
+    _writer.close()
+    LOG_ASYNC = enabled
+    _writer = _make_writer()
+
+
+def flush() -> None:
+    """Wait until queued records are written (before printing outside the logger, or exiting)."""
+    _writer.flush()
+
+
+def log(component: str, message: Message, level: LogLevel = 'INFO', indent: int = 0, end: str='\n',
+        **fields: Any) -> None:
     """Unified lightweight logger.
     component: logical module (PIPELINE, SCRAPE, OCR, LLM, CLEANUP, VALIDATE...)
+    message: text, or a zero-argument callable evaluated only if the level is enabled
     indent: number of two-space indents before message body (not before header)
+    fields: structured values (form, question, duration...) kept by the JSON format
     """
     level = level.upper()
-    if not _allow(level):
+    for fn in _LISTENERS:
+        try:
+            fn(component, level, message)
+        except Exception:
+            pass
+    if _LEVEL_ORDER.get(level, 100) < _threshold:
         return
-    ts = datetime.now().strftime('%H:%M:%S')
-    prefix = f"[{ts}][{level}][{component}]"
-    body_indent = '  ' * max(indent,0)
-    if COLOR and sys.stdout.isatty():
-        color = _COLORS.get(level,'')
-        reset = _COLORS['RESET']
-        sys.stdout.write(f"{color}{prefix}{reset} {body_indent}{message}{end}")
-    else:
-        sys.stdout.write(f"{prefix} {body_indent}{message}{end}")
-    sys.stdout.flush()
+    if callable(message):
+        message = message()
+    context = _context.get()
+    if context:
+        fields = {**context, **fields}
+    _writer.emit((time.time(), level, component, message, indent, end, fields))
 
 def log_section(title: str, char: str='='):
     line = char* max(len(title), 40)
@@ -0,0 +1,177 @@
+"""Memory-bounded processing helpers: RSS sampling, intake watchdog, question spool.
+
+    FORMS_AI_MAX_RSS_MB=1500    the stages stop claiming new forms (and the answer
+                                stage new question chunks) while the process RSS is
+                                above this; gc + malloc_trim are tried first
+    FORMS_AI_LOW_MEMORY=1       questions are handled in chunks (FORMS_AI_QUESTION_CHUNK,
+                                default 100 in this mode) instead of whole forms, the
+                                scraper spills questions to disk, OCR goes by small batches
+
+QuestionSpool keeps at most ``chunk_size`` question dicts in memory; the rest
+is appended to a temporary JSON-lines file and read back when iterated (e.g. by
+ArtifactStore.upsert_form), so a 2000-question form never sits in RAM at once.
+"""
+from __future__ import annotations
+import gc
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from . import json_utils
+from .logging_utils import log
+from .metrics_utils import count, set_gauge
+
+LOW_MEMORY = os.getenv('FORMS_AI_LOW_MEMORY', '0') == '1'
+MAX_RSS_MB = float(os.getenv('FORMS_AI_MAX_RSS_MB', '0'))  # 0: no watchdog
+# Questions per chunk in the answer stage / kept in memory by the scraper (0: whole form)
+QUESTION_CHUNK = int(os.getenv('FORMS_AI_QUESTION_CHUNK', '100' if LOW_MEMORY else '0'))
+OCR_BATCH = int(os.getenv('FORMS_AI_OCR_BATCH', '4' if LOW_MEMORY else '16'))
+THROTTLE_SLEEP = 0.5   # seconds between two RSS checks while throttled
+THROTTLE_MAX_WAIT = float(os.getenv('FORMS_AI_THROTTLE_MAX_WAIT', '30'))
+RESUME_RATIO = 0.9     # intake resumes below RESUME_RATIO * limit
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB (0.0 when it cannot be read)."""
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        except psutil.Error:
+            pass
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process in MB (ru_maxrss; 0.0 on Windows without psutil)."""
+    try:
+        import resource
+    except ImportError:
+        if psutil is not None:
+            info = psutil.Process().memory_info()
+            return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+        return 0.0
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024)
+
+
+def release_memory() -> None:
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            import ctypes
+            ctypes.CDLL('libc.so.6').malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class MemoryWatchdog:
+    """Called before taking new work: blocks intake while RSS is above *limit_mb*."""
+
+    def __init__(self, limit_mb: float = MAX_RSS_MB, max_wait: float = THROTTLE_MAX_WAIT):
+        self.limit_mb = limit_mb
+        self.max_wait = max_wait
+        self.throttled = 0
+
+    def check(self, stage: str) -> float:
+        """Seconds spent waiting (0.0 when under the limit or without a limit)."""
+        if self.limit_mb <= 0:
+            return 0.0
+        current = rss_mb()
+        set_gauge('rss_mb', round(current, 1), stage=stage)
+        if current < self.limit_mb:
+            return 0.0
+        release_memory()
+        current = rss_mb()
+        if current < self.limit_mb * RESUME_RATIO:
+            return 0.0
+        self.throttled += 1
+        count('memory.throttle')
+        log('MEMORY', f"{stage}: RSS {current:.0f} MB > {self.limit_mb:.0f} MB - pause de l'intake", level='WARN')
+        t0 = time.monotonic()
+        while current >= self.limit_mb * RESUME_RATIO and time.monotonic() - t0 < self.max_wait:
+            time.sleep(THROTTLE_SLEEP)
+            release_memory()
+            current = rss_mb()
+        waited = time.monotonic() - t0
+        if current >= self.limit_mb * RESUME_RATIO:
+            log('MEMORY', f"{stage}: RSS toujours {current:.0f} MB après {waited:.0f}s - reprise", level='WARN')
+        set_gauge('rss_mb', round(current, 1), stage=stage)
+        return waited
+
+    @classmethod
+    def from_env(cls) -> "MemoryWatchdog":
+        return cls(MAX_RSS_MB, THROTTLE_MAX_WAIT)
+
+
+class QuestionSpool:
+    """List-like sink for scraped questions: append(), len(), iteration in order.
+
+    chunk_size 0 keeps everything in memory (a plain list, as before)."""
+
+    def __init__(self, chunk_size: int = QUESTION_CHUNK, directory: Optional[Union[str, Path]] = None):
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self._buffer: List[Dict[str, Any]] = []
+        self._path: Optional[Path] = None
+        self._spilled = 0
+
+    def append(self, question: Dict[str, Any]) -> None:
+        self._buffer.append(question)
+        if self.chunk_size and len(self._buffer) >= self.chunk_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._path is None:
+            fd, name = tempfile.mkstemp(prefix='forms_ai_questions_', suffix='.jsonl', dir=self.directory)
+            os.close(fd)
+            self._path = Path(name)
+        with open(self._path, 'ab') as f:
+            f.write(b''.join(json_utils.dumps_bytes(q, pretty=False) + b'\n' for q in self._buffer))
+        self._spilled += len(self._buffer)
+        self._buffer = []
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._buffer)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._path is not None:
+            with open(self._path, 'rb') as f:
+                for line in f:
+                    yield json_utils.loads(line)
+        yield from self._buffer
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def close(self) -> None:
+        """Delete the spill file (the spool is empty afterwards)."""
+        self._buffer = []
+        self._spilled = 0
+        if self._path is not None:
+            try:
+                self._path.unlink()
+            except OSError:
+                pass
+            self._path = None
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,211 @@
+"""Optional Prometheus-compatible ``/metrics`` endpoint for long-running workers.
+
+Nothing is started unless ``FORMS_AI_METRICS_PORT`` is set (or
+``start_http_server`` is called explicitly). The exporter has no third-party
+dependency: it renders the text exposition format (version 0.0.4) straight
+from ``metrics_utils.METRICS`` at scrape time, plus per-component log event
+counters fed by ``logging_utils.log`` (SCRAPE, OCR, LLM, ELASTIC...). It reads
+the totals since the process started, so METRICS.reset() between runs never
+lowers a published counter.
+
+Exposed families:
+    forms_ai_stage_duration_seconds   histogram  {stage}
+    forms_ai_stage_latency_seconds    summary    {stage, quantile}
+    forms_ai_stage_items_total        counter    {stage}
+    forms_ai_stage_bytes_total        counter    {stage}
+    forms_ai_stage_errors_total       counter    {stage}
+    forms_ai_stage_in_flight          gauge      {stage}
+    forms_ai_value                    histogram  {name}  (metrics_utils.observe, e.g. context.tokens)
+    forms_ai_llm_latency_seconds      summary    {quantile}
+    forms_ai_ocr_images_total         counter
+    forms_ai_llm_timeouts_total       counter
+    forms_ai_elastic_failures_total   counter
+    forms_ai_events_total             counter    {event}  (metrics_utils.count, e.g. llm.retry)
+    forms_ai_log_events_total         counter    {component, level}
+    forms_ai_<gauge>                  gauge      (metrics_utils.set_gauge, e.g. queue_depth{stage})
+
+Local check:
+    $Env:FORMS_AI_METRICS_PORT = "9464"
+    curl http://127.0.0.1:9464/metrics
+"""
+from __future__ import annotations
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from .logging_utils import log, add_listener
+from .metrics_utils import METRICS, MetricsRegistry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'forms_ai'
+QUANTILES = (0.5, 0.9, 0.99)
+
+_log_counts: Dict[Tuple[str, str], int] = {}
+_log_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def _count_log_event(component: str, level: str, message: str) -> None:
+    with _log_lock:
+        key = (component, level)
+        _log_counts[key] = _log_counts.get(key, 0) + 1
+
+
+add_listener(_count_log_event)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _num(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _metric_name(name: str) -> str:
+    return ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
+
+
+def render(registry: Optional[MetricsRegistry] = None) -> str:
+    """Return the full exposition text for *registry* (default: global METRICS)."""
+    registry = registry or METRICS
+    by_stage = registry.stages(total=True)
+    stages = sorted(by_stage.items())
+    counters = registry.counters(total=True)
+    out: List[str] = []
+
+    def family(name: str, mtype: str, help_text: str) -> None:
+        out.append(f"# HELP {PREFIX}_{name} {help_text}")
+        out.append(f"# TYPE {PREFIX}_{name} {mtype}")
+
+    family('stage_duration_seconds', 'histogram', 'Wall time of instrumented pipeline blocks.')
+    for stage, s in stages:
+        running = 0
+        for bound, n in zip(list(s.wall.buckets) + [float('inf')], s.wall.bucket_counts):
+            running += n
+            out.append(f"{PREFIX}_stage_duration_seconds_bucket{_labels([('stage', stage), ('le', _num(float(bound)))])} {running}")
+        out.append(f"{PREFIX}_stage_duration_seconds_sum{_labels([('stage', stage)])} {_num(s.wall.sum)}")
+        out.append(f"{PREFIX}_stage_duration_seconds_count{_labels([('stage', stage)])} {s.wall.count}")
+
+    family('stage_latency_seconds', 'summary', 'Wall time quantiles over the recent sample window.')
+    for stage, s in stages:
+        for q in QUANTILES:
+            out.append(f"{PREFIX}_stage_latency_seconds{_labels([('stage', stage), ('quantile', q)])} {_num(s.wall.quantile(q))}")
+        out.append(f"{PREFIX}_stage_latency_seconds_sum{_labels([('stage', stage)])} {_num(s.wall.sum)}")
+        out.append(f"{PREFIX}_stage_latency_seconds_count{_labels([('stage', stage)])} {s.wall.count}")
+
+    for attr, name, help_text in (
+        ('items', 'stage_items_total', 'Items processed per stage.'),
+        ('bytes', 'stage_bytes_total', 'Bytes processed per stage.'),
+        ('errors', 'stage_errors_total', 'Blocks that raised per stage.'),
+    ):
+        family(name, 'counter', help_text)
+        for stage, s in stages:
+            out.append(f"{PREFIX}_{name}{_labels([('stage', stage)])} {getattr(s, attr)}")
+
+    family('stage_in_flight', 'gauge', 'Blocks currently running per stage (e.g. forms being scraped).')
+    for stage, n in sorted(registry.in_flight().items()):
+        out.append(f"{PREFIX}_stage_in_flight{_labels([('stage', stage)])} {n}")
+
+    family('value', 'histogram', 'Size-like values (prompt tokens before/after context assembly...).')
+    for name, h in sorted(registry.values(total=True).items()):
+        running = 0
+        for bound, n in zip(list(h.buckets) + [float('inf')], h.bucket_counts):
+            running += n
+            out.append(f"{PREFIX}_value_bucket{_labels([('name', name), ('le', _num(float(bound)))])} {running}")
+        out.append(f"{PREFIX}_value_sum{_labels([('name', name)])} {_num(h.sum)}")
+        out.append(f"{PREFIX}_value_count{_labels([('name', name)])} {h.count}")
+
+    llm = by_stage.get('llm.ask')
+    family('llm_latency_seconds', 'summary', 'LLM call latency.')
+    if llm:
+        for q in QUANTILES:
+            out.append(f"{PREFIX}_llm_latency_seconds{_labels([('quantile', q)])} {_num(llm.wall.quantile(q))}")
+        out.append(f"{PREFIX}_llm_latency_seconds_sum {_num(llm.wall.sum)}")
+        out.append(f"{PREFIX}_llm_latency_seconds_count {llm.wall.count}")
+
+    ocr = by_stage.get('ocr.image')
+    family('ocr_images_total', 'counter', 'Images processed by OCR (use rate() for images/sec).')
+    out.append(f"{PREFIX}_ocr_images_total {ocr.items if ocr else 0}")
+    family('llm_timeouts_total', 'counter', 'LLM calls that ended in FALLBACK_TIMEOUT_AUTO_ANSWER.')
+    out.append(f"{PREFIX}_llm_timeouts_total {counters.get('llm.timeout', 0)}")
+    family('elastic_failures_total', 'counter', 'Elasticsearch uploads that failed or were skipped.')
+    out.append(f"{PREFIX}_elastic_failures_total {counters.get('elastic.failure', 0)}")
+    family('events_total', 'counter', 'Pipeline events without a duration (retries, timeouts, shortcuts...).')
+    for name, n in sorted(counters.items()):
+        out.append(f"{PREFIX}_events_total{_labels([('event', name)])} {n}")
+
+    family('log_events_total', 'counter', 'Log events per component and level.')
+    with _log_lock:
+        log_counts = sorted(_log_counts.items())
+    for (component, level), n in log_counts:
+        out.append(f"{PREFIX}_log_events_total{_labels([('component', component), ('level', level)])} {n}")
+
+    by_name: Dict[str, List[str]] = {}
+    for (name, labels), value in sorted(registry.gauges().items()):
+        by_name.setdefault(_metric_name(name), []).append(f"{PREFIX}_{_metric_name(name)}{_labels(labels)} {_num(value)}")
+    for name, lines in by_name.items():
+        family(name, 'gauge', f'Pipeline gauge {name}.')
+        out.extend(lines)
+
+    return '\n'.join(out) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # silence default stderr access log
+        return
+
+
+def start_http_server(port: int = 9464, addr: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread. ``port=0`` picks a free port (see ``server.server_port``)."""
+    global _server
+    if _server is not None:
+        return _server
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='forms-ai-metrics', daemon=True).start()
+    _server = server
+    log('METRICS', f"Exporter Prometheus: http://{addr}:{server.server_port}/metrics")
+    return server
+
+
+def stop_http_server() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+
+def start_from_env() -> Optional[ThreadingHTTPServer]:
+    """Start the exporter if FORMS_AI_METRICS_PORT is set (FORMS_AI_METRICS_ADDR defaults to 127.0.0.1)."""
+    port = os.getenv('FORMS_AI_METRICS_PORT')
+    if not port:
+        return None
+    try:
+        return start_http_server(int(port), os.getenv('FORMS_AI_METRICS_ADDR', '127.0.0.1'))
+    except Exception as e:
+        log('METRICS', f"Exporter indisponible: {e}", level='ERROR')
+        return None
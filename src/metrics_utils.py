@@ -0,0 +1,363 @@
+"""Lightweight timing / throughput instrumentation for the pipeline.
+
+Every measured block is recorded under a dotted stage name
+(``step.scrape_forms``, ``scrape.navigate``, ``ocr.image``, ``llm.ask`` ...)
+with wall time, CPU time, an item count and a byte count.
+
+Usage:
+    with timed('scrape.navigate'):
+        driver.get(url)
+
+    @timed('step.generate_answers')
+    def step_generate_answers(state): ...
+
+    with timed('ocr.image', nbytes=size) as t:
+        text = reader.readtext(path)
+        t.add(nbytes=len(text))
+
+Events without a duration (a timeout, a retry, a shortcut hit) are counters,
+not stages:
+
+    count('llm.timeout')
+    count('ocr.low_confidence', dropped)
+
+At the end of a run ``log_summary()`` prints a table and ``write_json(path)``
+dumps the same data for machine consumption.
+"""
+from __future__ import annotations
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import json_utils, tracing
+from .logging_utils import log
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Upper bounds of the value histograms (sizes: prompt tokens, characters...)
+SIZE_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+SAMPLE_WINDOW = 4096  # samples kept per histogram for percentiles
+
+
+class Histogram:
+    """Cumulative bucket histogram + bounded sample window for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # last = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._samples: deque = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, running = [], 0
+        for bound, n in zip(list(self.buckets) + ['+Inf'], self.bucket_counts):
+            running += n
+            cumulative.append([bound, running])
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": self.min,
+            "max": self.max,
+            "mean": (self.sum / self.count) if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+
+class StageStats:
+    """Aggregated measurements for one stage name."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = Histogram()
+        self.cpu = Histogram()
+        self.calls = 0
+        self.items = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "wall_seconds": self.wall.to_dict(),
+            "cpu_seconds": self.cpu.to_dict(),
+        }
+
+
+class _Measurements:
+    """Stages, value histograms and counters accumulated over one period."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self.values: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def record(self, name: str, wall: float, cpu: float, items: int, nbytes: int, error: bool) -> None:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name)
+        stats.calls += 1
+        stats.items += items
+        stats.bytes += nbytes
+        if error:
+            stats.errors += 1
+        stats.wall.observe(wall)
+        stats.cpu.observe(cpu)
+
+    def observe(self, name: str, value: float, buckets) -> None:
+        hist = self.values.get(name)
+        if hist is None:
+            hist = self.values[name] = Histogram(buckets)
+        hist.observe(value)
+
+    def count(self, name: str, n: int) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+
+class MetricsRegistry:
+    """Thread-safe store of StageStats; listeners are notified on each record.
+
+    Besides finished measurements it tracks blocks currently in flight per
+    stage, event counters and free-form gauges (queue depths, circuit state...).
+    Measurements are kept for the current run (reset() starts a new one: the
+    summary and write_json) and since the process started (``total=True``:
+    what the Prometheus exporter publishes, so its counters never go down).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._run = _Measurements()
+        self._total = _Measurements()
+        self._in_flight: Dict[str, int] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._listeners: List[Callable[[str, float, float, int, int, bool], None]] = []
+        self.started_at = time.time()
+
+    def add_listener(self, fn: Callable[[str, float, float, int, int, bool], None]) -> None:
+        """fn(name, wall, cpu, items, nbytes, error) called after every record."""
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def remove_listener(self, fn) -> None:
+        with self._lock:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def record(self, name: str, wall: float = 0.0, cpu: float = 0.0, items: int = 1, nbytes: int = 0, error: bool = False) -> None:
+        with self._lock:
+            self._run.record(name, wall, cpu, items, nbytes, error)
+            self._total.record(name, wall, cpu, items, nbytes, error)
+            listeners = list(self._listeners)
+        for fn in listeners:
+            try:
+                fn(name, wall, cpu, items, nbytes, error)
+            except Exception:
+                pass
+
+    def enter(self, name: str) -> None:
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+
+    def leave(self, name: str) -> None:
+        with self._lock:
+            self._in_flight[name] = max(0, self._in_flight.get(name, 0) - 1)
+
+    def in_flight(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._in_flight)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._gauges[key] = float(value)
+
+    def observe(self, name: str, value: float, buckets=SIZE_BUCKETS) -> None:
+        """Add *value* to the value histogram *name* (not a duration, e.g. a prompt size)."""
+        with self._lock:
+            self._run.observe(name, value, buckets)
+            self._total.observe(name, value, buckets)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Add *n* to the event counter *name* (no duration, not a stage)."""
+        with self._lock:
+            self._run.count(name, n)
+            self._total.count(name, n)
+
+    def values(self, total: bool = False) -> Dict[str, Histogram]:
+        with self._lock:
+            return dict((self._total if total else self._run).values)
+
+    def counters(self, total: bool = False) -> Dict[str, int]:
+        with self._lock:
+            return dict((self._total if total else self._run).counters)
+
+    def gauges(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+        with self._lock:
+            return dict(self._gauges)
+
+    def stages(self, total: bool = False) -> Dict[str, StageStats]:
+        with self._lock:
+            return dict((self._total if total else self._run).stages)
+
+    def reset(self) -> None:
+        """Start a new run: forget its finished measurements. Totals since the process
+        started, in-flight counts and gauges are kept."""
+        with self._lock:
+            self._run = _Measurements()
+            self.started_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.time() - self.started_at
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": {name: s.to_dict() for name, s in sorted(self.stages().items())},
+            "values": {name: h.to_dict() for name, h in sorted(self.values().items())},
+            "counters": dict(sorted(self.counters().items())),
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.gauges().items())
+            ],
+        }
+
+
+METRICS = MetricsRegistry()
+
+
+class timed:
+    """Context manager *and* decorator measuring wall + CPU time of a block.
+
+    As a decorator every call gets its own timer, so decorated functions stay
+    thread-safe and re-entrant.
+    """
+
+    def __init__(self, name: str, items: int = 1, nbytes: int = 0, registry: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.items = items
+        self.nbytes = nbytes
+        self.registry = registry or METRICS
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._t0 = 0.0
+        self._c0 = 0.0
+
+    def add(self, items: int = 0, nbytes: int = 0) -> None:
+        """Adjust counters from inside the block (e.g. once the payload size is known)."""
+        self.items += items
+        self.nbytes += nbytes
+
+    def __enter__(self) -> "timed":
+        self.registry.enter(self.name)
+        self._t0 = time.perf_counter()
+        self._c0 = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.wall = time.perf_counter() - self._t0
+        self.cpu = time.thread_time() - self._c0
+        self.registry.leave(self.name)
+        self.registry.record(self.name, self.wall, self.cpu, self.items, self.nbytes, error=exc_type is not None)
+        if tracing.ENABLED:
+            tracing.complete(self.name, self._t0, self.wall)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, self.items, self.nbytes, self.registry):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def record(name: str, wall: float = 0.0, cpu: float = 0.0, items: int = 1, nbytes: int = 0, error: bool = False) -> None:
+    """Record an externally measured block (e.g. a time to first token); events use count()."""
+    METRICS.record(name, wall, cpu, items, nbytes, error)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Count an event without duration (``llm.timeout``, ``scrape.retry``...)."""
+    METRICS.count(name, n)
+
+
+def observe(name: str, value: float) -> None:
+    """Record a size-like value (``context.tokens``...) in its histogram."""
+    METRICS.observe(name, value)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    """Set a live gauge such as ``queue_depth`` (stage="ocr")."""
+    METRICS.set_gauge(name, value, **labels)
+
+
+def _fmt_bytes(n: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024.0
+    return str(n)
+
+
+def summary_lines(registry: Optional[MetricsRegistry] = None) -> List[str]:
+    """Render the summary table as a list of text lines."""
+    registry = registry or METRICS
+    stages = sorted(registry.stages().items())
+    header = f"{'stage':<28} {'calls':>6} {'items':>6} {'total s':>9} {'mean s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'cpu s':>8} {'bytes':>9} {'err':>4}"
+    lines = [header, '-' * len(header)]
+    for name, s in stages:
+        w = s.wall
+        lines.append(
+            f"{name[:28]:<28} {s.calls:>6} {s.items:>6} {w.sum:>9.3f} {(w.sum / w.count if w.count else 0):>8.3f} "
+            f"{w.quantile(0.5):>8.3f} {w.quantile(0.95):>8.3f} {(w.max or 0):>8.3f} {s.cpu.sum:>8.3f} "
+            f"{_fmt_bytes(s.bytes):>9} {s.errors:>4}"
+        )
+    for name, h in sorted(registry.values().items()):
+        lines.append(f"{name[:28]:<28} {h.count:>6} values  mean {(h.sum / h.count if h.count else 0):.0f} "
+                     f"p50 {h.quantile(0.5):.0f} p95 {h.quantile(0.95):.0f} max {h.max or 0:.0f}")
+    for name, n in sorted(registry.counters().items()):
+        lines.append(f"{name[:28]:<28} {n:>6} events")
+    return lines
+
+
+def log_summary(registry: Optional[MetricsRegistry] = None) -> None:
+    for line in summary_lines(registry):
+        log('METRICS', line)
+
+
+def write_json(path, registry: Optional[MetricsRegistry] = None) -> Optional[Path]:
+    """Dump all stage metrics to *path* (directories created). Returns the path or None."""
+    registry = registry or METRICS
+    path = Path(path)
+    try:
+        return json_utils.dump(registry.to_dict(), path)
+    except Exception as e:
+        log('METRICS', f"Erreur écriture métriques {path}: {e}", level='ERROR')
+        return None
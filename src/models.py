@@ -0,0 +1,223 @@
+"""Typed, slotted model of the scraped/answered documents: Form, Question, Image, Answer.
+
+The JSON schema does not change: ``X.from_dict(d).to_dict() == d`` for the
+documents the scraper, the OCR step and the answer step produce. Keys the
+model does not know are kept in ``extra`` and written back as they were;
+fields left to None are omitted from the dict (the store and the scraper omit
+them the same way).
+
+    question = Question.from_dict(q)
+    question.full_text()          # question text + " | OCR: ..." of its images
+    question_full_text(q)         # same text straight from the dict
+    question.answer = Answer(answer="Oui", justification="...", source="llm")
+    q.update(question.answer.to_dict())   # llm_* keys
+
+``__slots__`` instances have no per-object dict: on the 10k-question corpus of
+benchmarks/bench_models.py the decoded questions take ~20 % less memory (the
+rest is the text itself), with the same per-question cost in the answer loop.
+"""
+from __future__ import annotations
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+OCR_SEPARATOR = " | OCR: "
+_intern = sys.intern
+
+
+def join_ocr(text: str, ocr_texts: Iterable[str]) -> str:
+    """Question text followed by the non-empty OCR texts of its images (the prompt input)."""
+    parts = [t for t in ocr_texts if t]
+    if not parts:
+        return text
+    return text + OCR_SEPARATOR + OCR_SEPARATOR.join(parts)
+
+
+def question_full_text(q: Dict[str, Any]) -> str:
+    """Question.full_text() of a question dict, without building the model."""
+    text = q.get('question_text') or ""
+    images = q.get('images')
+    if not images:
+        return text
+    return join_ocr(text, (i.get('question_text') for i in images if isinstance(i, dict)))
+
+
+def _put(out: Dict[str, Any], key: str, value: Any) -> None:
+    if value is not None:
+        out[key] = value
+
+
+@dataclass(slots=True)
+class Image:
+    image_number: Optional[int] = None
+    filename: Optional[str] = None
+    filepath: Optional[str] = None
+    original_src: Optional[str] = None
+    ocr_text: Optional[str] = None          # JSON key 'question_text' (set by the OCR step)
+    ocr_processed_at: Optional[str] = None
+    ocr_method: Optional[str] = None
+    ocr_lines: Optional[Dict[str, Any]] = None  # packed per-line confidence/boxes (ocr_layout.OcrLayout)
+    extra: Optional[Dict[str, Any]] = None
+
+    _KEYS = frozenset(('image_number', 'filename', 'filepath', 'original_src', 'question_text',
+                       'ocr_processed_at', 'ocr_method', 'ocr_lines'))
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Image":
+        g = d.get
+        extra = d.keys() - cls._KEYS
+        return cls(g('image_number'), g('filename'), g('filepath'), g('original_src'), g('question_text'),
+                   g('ocr_processed_at'), g('ocr_method'), g('ocr_lines'), {k: d[k] for k in extra} if extra else None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        _put(out, 'image_number', self.image_number)
+        _put(out, 'filename', self.filename)
+        _put(out, 'filepath', self.filepath)
+        _put(out, 'original_src', self.original_src)
+        _put(out, 'question_text', self.ocr_text)
+        _put(out, 'ocr_processed_at', self.ocr_processed_at)
+        _put(out, 'ocr_method', self.ocr_method)
+        _put(out, 'ocr_lines', self.ocr_lines)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+@dataclass(slots=True)
+class Answer:
+    answer: str = ""
+    justification: str = ""
+    language: Optional[str] = None
+    template: Optional[str] = None
+    validation: Optional[str] = None
+    source: Optional[str] = None
+    provenance: Optional[Dict[str, Any]] = None
+    extra: Optional[Dict[str, Any]] = None  # other llm_* keys
+
+    _FIELDS = (('answer', 'llm_answer'), ('justification', 'llm_justification'),
+               ('language', 'llm_language_detected'), ('template', 'llm_prompt_template'),
+               ('validation', 'llm_answer_validation'), ('source', 'llm_answer_source'),
+               ('provenance', 'llm_answer_provenance'))
+    _KEYS = frozenset(key for _, key in _FIELDS)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> Optional["Answer"]:
+        """The llm_* fields of a question dict; None when it has no llm_answer."""
+        if 'llm_answer' not in d:
+            return None
+        g = d.get
+        extra = {k: v for k, v in d.items() if k.startswith('llm_') and k not in cls._KEYS}
+        return cls(g('llm_answer'), g('llm_justification'), g('llm_language_detected'), g('llm_prompt_template'),
+                   g('llm_answer_validation'), g('llm_answer_source'), g('llm_answer_provenance'), extra or None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {'llm_answer': self.answer}
+        _put(out, 'llm_justification', self.justification)
+        _put(out, 'llm_language_detected', self.language)
+        _put(out, 'llm_prompt_template', self.template)
+        _put(out, 'llm_answer_validation', self.validation)
+        _put(out, 'llm_answer_source', self.source)
+        _put(out, 'llm_answer_provenance', self.provenance)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+@dataclass(slots=True)
+class Question:
+    question_number: Optional[int] = None
+    question_text: str = ""
+    has_text: Optional[bool] = None
+    has_images: Optional[bool] = None
+    images_count: Optional[int] = None
+    images: List[Image] = field(default_factory=list)
+    answer_type: Optional[str] = None
+    answer_values: Any = None
+    scraped_at: Optional[str] = None
+    answer: Optional[Answer] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    _KEYS = frozenset(('question_number', 'question_text', 'has_text', 'has_images', 'images_count', 'images',
+                       'answer_type', 'answer_values', 'scraped_at'))
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Question":
+        g = d.get
+        images = g('images') or []
+        extra = d.keys() - cls._KEYS
+        answer = None
+        if extra:
+            answer = Answer.from_dict(d) if 'llm_answer' in extra else None
+            extra = {k: d[k] for k in extra if not k.startswith('llm_')} or None
+        answer_type = g('answer_type')
+        return cls(g('question_number'), g('question_text') or "", g('has_text'), g('has_images'), g('images_count'),
+                   [Image.from_dict(i) if isinstance(i, dict) else Image(extra={"value": i}) for i in images],
+                   _intern(answer_type) if type(answer_type) is str else answer_type,  # a handful of distinct values
+                   g('answer_values'), g('scraped_at'), answer, extra or None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        _put(out, 'question_number', self.question_number)
+        out['question_text'] = self.question_text
+        _put(out, 'has_text', self.has_text)
+        _put(out, 'has_images', self.has_images)
+        _put(out, 'images_count', self.images_count)
+        out['images'] = [i.to_dict() for i in self.images]
+        _put(out, 'answer_type', self.answer_type)
+        _put(out, 'answer_values', self.answer_values)
+        _put(out, 'scraped_at', self.scraped_at)
+        if self.extra:
+            out.update(self.extra)
+        if self.answer is not None:
+            out.update(self.answer.to_dict())
+        return out
+
+    def ocr_texts(self) -> List[str]:
+        return [i.ocr_text for i in self.images if i.ocr_text]
+
+    def full_text(self) -> str:
+        """Question text + OCR text of its images, as sent to the LLM."""
+        if not self.images:
+            return self.question_text
+        return join_ocr(self.question_text, (i.ocr_text for i in self.images))
+
+    def number(self, default: int) -> int:
+        return self.question_number if self.question_number is not None else default
+
+
+@dataclass(slots=True)
+class Form:
+    url: Optional[str] = None
+    form_name: Optional[str] = None
+    scraping_date: Optional[str] = None
+    contains_images: Optional[bool] = None
+    questions: List[Question] = field(default_factory=list)
+    statistics: Optional[Dict[str, Any]] = None
+    extra: Optional[Dict[str, Any]] = None  # error, form_title, ocr_processing_info...
+
+    _KEYS = frozenset(('url', 'form_name', 'scraping_date', 'contains_images', 'questions', 'statistics'))
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Form":
+        g = d.get
+        extra = d.keys() - cls._KEYS
+        return cls(g('url'), g('form_name'), g('scraping_date'), g('contains_images'),
+                   [Question.from_dict(q) for q in g('questions') or []], g('statistics'),
+                   {k: d[k] for k in extra} if extra else None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        _put(out, 'url', self.url)
+        _put(out, 'form_name', self.form_name)
+        _put(out, 'scraping_date', self.scraping_date)
+        _put(out, 'contains_images', self.contains_images)
+        out['questions'] = [q.to_dict() for q in self.questions]
+        _put(out, 'statistics', self.statistics)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.form_name or (self.extra or {}).get('form_title')
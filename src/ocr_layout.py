@@ -0,0 +1,109 @@
+"""Per-line OCR confidence and boxes, packed on the image record (JSON key ``ocr_lines``).
+
+EasyOCR's readtext() returns, for every fragment it reads, a 4-point box, the
+text and a confidence. The OCR step used to keep the text only; it now keeps
+all fragments in reading order with their confidence and an axis-aligned box:
+
+    "ocr_lines": {"text": ["Figure 3", "Chiffre d'affaires 2024", ...],
+                  "packed": "<base64>",  # uint16 little-endian, 5 per line:
+                                         # confidence * 1000, x0, y0, x1, y1 (in grid units)
+                  "grid": 4}             # box coordinates quantized to 4 px
+
+i.e. 10 bytes (~14 base64 characters) of layout per line. The image's
+``question_text`` stays the reading-order text of the lines above
+FORMS_AI_OCR_MIN_CONFIDENCE; any other threshold can be applied later from
+the record (OcrLayout.texts(min_confidence)) without running OCR again.
+
+Reading order: lines are grouped into rows by vertical centre (within half the
+median line height), rows top to bottom, left to right inside a row. Multi-
+column layouts are read row by row across columns.
+"""
+from __future__ import annotations
+import base64
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+GRID = 4            # px per box unit
+_CONF_SCALE = 1000  # confidence stored as an integer in 0..1000
+_FIELDS = 5         # confidence, x0, y0, x1, y1
+_UINT16_MAX = 0xFFFF
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1 in grid units
+
+
+@dataclass(slots=True)
+class OcrLine:
+    text: str
+    confidence: float
+    box: Box
+
+
+def quantize_box(points: Sequence[Sequence[float]], grid: int = GRID) -> Box:
+    """Axis-aligned bounds of EasyOCR's 4 corner points, in *grid* px units."""
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    clamp = lambda v: min(_UINT16_MAX, max(0, v))
+    return (clamp(int(min(xs)) // grid), clamp(int(min(ys)) // grid),
+            clamp(-(-int(max(xs)) // grid)), clamp(-(-int(max(ys)) // grid)))
+
+
+def reading_order(lines: List[OcrLine]) -> List[OcrLine]:
+    if len(lines) < 2:
+        return list(lines)
+    heights = sorted(max(1, line.box[3] - line.box[1]) for line in lines)
+    tolerance = heights[len(heights) // 2] / 2
+    rows: List[Tuple[float, List[OcrLine]]] = []
+    for line in sorted(lines, key=lambda l: l.box[1] + l.box[3]):
+        centre = (line.box[1] + line.box[3]) / 2
+        if rows and centre - rows[-1][0] <= tolerance:
+            rows[-1][1].append(line)
+        else:
+            rows.append((centre, [line]))
+    return [line for _, row in rows for line in sorted(row, key=lambda l: l.box[0])]
+
+
+@dataclass(slots=True)
+class OcrLayout:
+    lines: List[OcrLine] = field(default_factory=list)
+    grid: int = GRID
+
+    @classmethod
+    def from_readtext(cls, results: Iterable[Sequence[Any]], grid: int = GRID) -> "OcrLayout":
+        """From easyocr.Reader.readtext() output: [(points, text, confidence), ...]."""
+        lines = [OcrLine(str(text), float(conf), quantize_box(points, grid)) for points, text, conf in results]
+        return cls(reading_order(lines), grid)
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict[str, Any]]) -> Optional["OcrLayout"]:
+        if not d or not d.get('text'):
+            return None
+        packed = array('H')
+        packed.frombytes(base64.b64decode(d['packed']))
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        lines = [OcrLine(text, packed[i] / _CONF_SCALE, tuple(packed[i + 1:i + _FIELDS]))
+                 for text, i in zip(d['text'], range(0, len(packed), _FIELDS))]
+        return cls(lines, d.get('grid', GRID))
+
+    def to_dict(self) -> Dict[str, Any]:
+        packed = array('H')
+        for line in self.lines:
+            packed.append(min(_CONF_SCALE, max(0, round(line.confidence * _CONF_SCALE))))
+            packed.extend(line.box)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return {"text": [line.text for line in self.lines],
+                "packed": base64.b64encode(packed.tobytes()).decode('ascii'),
+                "grid": self.grid}
+
+    def texts(self, min_confidence: float = 0.0) -> List[str]:
+        """Line texts in reading order, those below *min_confidence* left out."""
+        return [line.text for line in self.lines if line.confidence >= min_confidence]
+
+    def text(self, min_confidence: float = 0.0) -> str:
+        return '\n'.join(self.texts(min_confidence))
+
+    def dropped(self, min_confidence: float) -> int:
+        return sum(1 for line in self.lines if line.confidence < min_confidence)
@@ -0,0 +1,79 @@
+"""Optional whole-run profiler, toggled by FORMS_AI_PROFILE.
+
+    FORMS_AI_PROFILE=cprofile     deterministic, stdlib: <label>_<ts>.prof
+                                  (snakeviz / `python -m pstats`; top functions logged)
+    FORMS_AI_PROFILE=pyinstrument sampling (pip install pyinstrument, interval
+                                  FORMS_AI_PROFILE_INTERVAL, default 1 ms):
+                                  <label>_<ts>.html + .speedscope.json (flame graph)
+
+Both profile the thread that runs the block (the pipeline steps); work in
+other threads (LLM streaming pump, log writer) is not included.
+"""
+from __future__ import annotations
+import contextlib
+import io
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .logging_utils import log
+
+PROFILER = os.getenv('FORMS_AI_PROFILE', '').lower()
+PROFILE_INTERVAL = float(os.getenv('FORMS_AI_PROFILE_INTERVAL', '0.001'))
+TOP_FUNCTIONS = 15
+
+
+@contextlib.contextmanager
+def profiled(label: str, out_dir: Path, profiler: Optional[str] = None) -> Iterator[List[Path]]:
+    """Profile the block; yields the list that receives the written file paths."""
+    profiler = (PROFILER if profiler is None else profiler).lower()
+    written: List[Path] = []
+    if profiler not in ('cprofile', 'pyinstrument'):
+        yield written
+        return
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = out_dir / f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler  # optional dependency
+        except ImportError:
+            log('PROFILE', "pyinstrument non installé - profilage cProfile", level='WARN')
+            profiler = 'cprofile'
+    if profiler == 'pyinstrument':
+        prof = Profiler(interval=PROFILE_INTERVAL)
+        prof.start()
+        try:
+            yield written
+        finally:
+            prof.stop()
+            html = stem.with_suffix('.html')
+            html.write_text(prof.output_html(), encoding='utf-8')
+            written.append(html)
+            try:
+                from pyinstrument.renderers import SpeedscopeRenderer
+                speedscope = stem.with_suffix('.speedscope.json')
+                speedscope.write_text(prof.output(renderer=SpeedscopeRenderer()), encoding='utf-8')
+                written.append(speedscope)
+            except ImportError:  # pyinstrument < 4
+                pass
+            log('PROFILE', f"Profil: {', '.join(str(p) for p in written)}")
+        return
+    import cProfile
+    import pstats
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield written
+    finally:
+        prof.disable()
+        path = stem.with_suffix('.prof')
+        prof.dump_stats(str(path))
+        written.append(path)
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        for line in out.getvalue().splitlines():
+            if line.strip():
+                log('PROFILE', line, level='DEBUG')
+        log('PROFILE', f"Profil: {path} (python -m pstats {path.name} / snakeviz)")
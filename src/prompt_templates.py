@@ -0,0 +1,145 @@
+"""Versioned prompt templates for answer generation.
+
+Each template renders (system, user) for one question:
+  system  fixed instructions, identical for every question -> sent as the chat
+          system message so Ollama reuses its KV cache across calls
+  user    variable part, most-shared fields first (type, language, options)
+          and the question text last, so consecutive questions of a form share
+          the longest possible prefix
+
+Templates:
+  legacy@1   original single prompt (build_prompt), no system message
+  full@2     same rules as legacy, split into system + user
+  compact@1  shortened rules for small models / lower prompt-eval time
+
+Pick one with FORMS_AI_PROMPT_TEMPLATE (name or name@version, default full@2).
+"""
+from __future__ import annotations
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_TEMPLATE = os.getenv('FORMS_AI_PROMPT_TEMPLATE', 'full@2')
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE-like count (words + punctuation); for relative comparisons only."""
+    return len(_TOKEN_PIECES.findall(text or ''))
+
+
+def format_options(values: Any) -> str:
+    if isinstance(values, list):
+        return " | ".join(str(v) for v in values)
+    return str(values)
+
+
+FULL_SYSTEM = """You are an expert assistant for Microsoft Forms.
+For each question you receive its type, language, options and text.
+
+TASK:
+Provide the best possible answer AND a concise justification.
+
+OUTPUT FORMAT (MANDATORY JSON):
+{"answer":"<ANSWER_ONLY>","justification":"<SHORT_REASONING>"}
+
+RULES:
+- If type is choiceItem or npsContainer: answer MUST be EXACT option text ONLY (no extra chars).
+- If type is textInput: answer is a concise relevant response in the question language.
+- justification: max 30 words, refer only to information present in question/OCR/context; no hallucination; same language as question.
+- Never translate options or fabricate data.
+- Do NOT wrap JSON in markdown fences.
+- Do NOT add extra keys.
+
+Return ONLY the JSON object."""
+
+COMPACT_SYSTEM = """Answer Microsoft Forms questions. Reply with ONLY this JSON, no markdown:
+{"answer":"...","justification":"..."}
+choiceItem/npsContainer: answer = one option, copied exactly. textInput: short answer in the question language.
+justification: <=30 words, question language, only facts from the question/OCR."""
+
+
+def _user_full(language: str, qtype: str, text: str, values: Any) -> str:
+    return (f"Question type: {qtype}\n"
+            f"Question language: {language}\n"
+            f"Options: {format_options(values)}\n"
+            f"Question: {text}")
+
+
+def _user_compact(language: str, qtype: str, text: str, values: Any) -> str:
+    lines = [f"Type: {qtype}", f"Lang: {language}"]
+    if isinstance(values, list):
+        lines.append(f"Options: {format_options(values)}")
+    lines.append(f"Q: {text}")
+    return "\n".join(lines)
+
+
+# legacy@1: the original single prompt (variable data before the fixed instructions)
+def build_prompt(language: str, qtype: str, text: str, values: Any) -> str:
+    if isinstance(values, list):
+        opts = " | ".join(values)
+    else:
+        opts = str(values)
+    return f"""You are an expert assistant for Microsoft Forms.
+Question language: {language}
+Question type: {qtype}
+Question: {text}
+Options: {opts}
+
+TASK:
+Provide the best possible answer AND a concise justification.
+
+OUTPUT FORMAT (MANDATORY JSON):
+{{"answer":"<ANSWER_ONLY>","justification":"<SHORT_REASONING>"}}
+
+RULES:
+- If type is choiceItem or npsContainer: answer MUST be EXACT option text ONLY (no extra chars).
+- If type is textInput: answer is a concise relevant response in {language}.
+- justification: max 30 words, refer only to information present in question/OCR/context; no hallucination; same language as question.
+- Never translate options or fabricate data.
+- Do NOT wrap JSON in markdown fences.
+- Do NOT add extra keys.
+
+Return ONLY the JSON object.
+"""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    system: Optional[str]
+    user: Callable[[str, str, str, Any], str]
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render(self, language: str, qtype: str, text: str, values: Any) -> Tuple[Optional[str], str]:
+        return self.system, self.user(language, qtype, text, values)
+
+    def token_counts(self, language: str, qtype: str, text: str, values: Any) -> Dict[str, int]:
+        system, user = self.render(language, qtype, text, values)
+        counts = {"system": estimate_tokens(system or ''), "user": estimate_tokens(user)}
+        counts["total"] = counts["system"] + counts["user"]
+        return counts
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {t.key: t for t in (
+    PromptTemplate('legacy', 1, None, build_prompt),
+    PromptTemplate('full', 2, FULL_SYSTEM, _user_full),
+    PromptTemplate('compact', 1, COMPACT_SYSTEM, _user_compact),
+)}
+
+
+def get_template(name: Optional[str] = None) -> PromptTemplate:
+    """Template by 'name@version' or 'name' (latest version)."""
+    name = (name or DEFAULT_TEMPLATE).strip().lower()
+    if name in TEMPLATES:
+        return TEMPLATES[name]
+    versions = [t for t in TEMPLATES.values() if t.name == name]
+    if not versions:
+        raise KeyError(f"Unknown prompt template {name!r} (available: {', '.join(sorted(TEMPLATES))})")
+    return max(versions, key=lambda t: t.version)
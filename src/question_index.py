@@ -0,0 +1,180 @@
+"""Persistent near-duplicate index over previously answered questions.
+
+Entries (question text + options -> answer, justification, provenance) are
+appended to a JSON-lines file, so the index grows incrementally across runs.
+A lookup only considers entries with the same option set (normalized), then
+scores question texts:
+
+  tfidf       (default) cosine over TF-IDF weighted character trigrams - robust
+              to numbering, casing, punctuation and small wording changes
+  embedding   sentence-transformers model (FORMS_AI_INDEX_MODEL, e.g.
+              all-MiniLM-L6-v2, optional dependency); vectors are stored in the file
+
+Matches at or above FORMS_AI_INDEX_THRESHOLD (default 0.9) are reused by the
+'index' shortcut rule (see shortcut_resolver).
+"""
+from __future__ import annotations
+import math
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import json_utils
+from .shortcut_resolver import normalize_question, options_key
+
+INDEX_BACKEND = os.getenv('FORMS_AI_INDEX_BACKEND', 'tfidf').lower()
+INDEX_MODEL = os.getenv('FORMS_AI_INDEX_MODEL', 'all-MiniLM-L6-v2')
+INDEX_THRESHOLD = float(os.getenv('FORMS_AI_INDEX_THRESHOLD', '0.9'))
+
+
+def char_ngrams(text: str, n: int = 3) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+class TfidfScorer:
+    """Incremental TF-IDF over character trigrams with an inverted index."""
+    name = 'tfidf'
+
+    def __init__(self):
+        self.tfs: List[Counter] = []
+        self.df: Counter = Counter()
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self._norms: List[float] = []
+        self._norms_at = 0  # document count when norms were last fully recomputed
+
+    def idf(self, gram: str) -> float:
+        return math.log((len(self.tfs) + 1) / (self.df.get(gram, 0) + 1)) + 1.0
+
+    def _norm(self, tf: Counter) -> float:
+        return math.sqrt(sum((c * self.idf(g)) ** 2 for g, c in tf.items())) or 1.0
+
+    def add(self, doc_id: int, text: str, vector: Optional[List[float]] = None) -> Optional[List[float]]:
+        tf = char_ngrams(text)
+        self.tfs.append(tf)
+        for gram in tf:
+            self.df[gram] += 1
+            self.postings[gram].append(doc_id)
+        self._norms.append(self._norm(tf))
+        # IDF drifts as documents arrive: refresh all norms whenever the corpus doubled
+        if len(self.tfs) >= 2 * max(1, self._norms_at):
+            self._norms = [self._norm(t) for t in self.tfs]
+            self._norms_at = len(self.tfs)
+        return None
+
+    def scores(self, text: str, candidates: set) -> Dict[int, float]:
+        query = char_ngrams(text)
+        idfs = {g: self.idf(g) for g in query}
+        qnorm = math.sqrt(sum((c * idfs[g]) ** 2 for g, c in query.items())) or 1.0
+        dots: Dict[int, float] = defaultdict(float)
+        for gram, c in query.items():
+            w = c * idfs[gram] * idfs[gram]  # query weight x document idf
+            for doc_id in self.postings.get(gram, ()):
+                if doc_id in candidates:
+                    dots[doc_id] += w * self.tfs[doc_id][gram]
+        return {d: dot / (qnorm * self._norms[d]) for d, dot in dots.items()}
+
+
+class EmbeddingScorer:
+    """Cosine similarity of sentence embeddings (normalized vectors)."""
+    name = 'embedding'
+
+    def __init__(self, model_name: str = INDEX_MODEL):
+        from sentence_transformers import SentenceTransformer  # optional dependency
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.vectors: List[List[float]] = []
+
+    def encode(self, text: str) -> List[float]:
+        return [round(float(x), 5) for x in self.model.encode(text, normalize_embeddings=True)]
+
+    def add(self, doc_id: int, text: str, vector: Optional[List[float]] = None) -> List[float]:
+        vector = vector or self.encode(text)
+        self.vectors.append(vector)
+        return vector
+
+    def scores(self, text: str, candidates: set) -> Dict[int, float]:
+        query = self.encode(text)
+        return {d: sum(a * b for a, b in zip(query, self.vectors[d])) for d in candidates}
+
+
+def make_scorer(name: Optional[str] = None):
+    name = (name or INDEX_BACKEND).lower()
+    if name == 'embedding':
+        try:
+            return EmbeddingScorer()
+        except Exception as e:
+            print(f"[INDEX] Embeddings indisponibles ({e}) - utilisation de TF-IDF")
+    return TfidfScorer()
+
+
+class QuestionIndex:
+    """Answered questions on disk (JSON lines) + in-memory scorer.
+
+    add(question_text, values, answer, justification, source) appends one entry;
+    lookup(question_text, values) -> (entry, similarity) of the best match above threshold.
+    """
+
+    def __init__(self, path: Optional[Path] = None, backend: Optional[str] = None, threshold: float = INDEX_THRESHOLD):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.scorer = make_scorer(backend)
+        self.entries: List[Dict[str, Any]] = []
+        self._by_options: Dict[Tuple[str, ...], set] = defaultdict(set)
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _load(self) -> None:
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json_utils.loads(line)
+                except json_utils.JSONDecodeError:
+                    continue  # truncated last line after a crash
+                # Vectors of another backend (or none) are recomputed
+                vector = entry.pop('vector', None) if entry.get('backend') == self.scorer.name else None
+                entry.pop('vector', None)
+                self._insert(entry, vector)
+
+    def _insert(self, entry: Dict[str, Any], vector: Optional[List[float]] = None) -> Optional[List[float]]:
+        doc_id = len(self.entries)
+        self.entries.append(entry)
+        self._by_options[options_key(entry.get('answer_values'))].add(doc_id)
+        return self.scorer.add(doc_id, normalize_question(entry.get('question_text', '')), vector)
+
+    def add(self, question_text: str, values: Any, answer: str, justification: str,
+            source: Optional[Dict[str, Any]] = None) -> None:
+        entry = {
+            "question_text": question_text,
+            "answer_values": values,
+            "llm_answer": answer,
+            "llm_justification": justification,
+            "source": source or {},
+            "added_at": datetime.now().isoformat(timespec='seconds'),
+        }
+        vector = self._insert(entry)
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            record = dict(entry, backend=self.scorer.name)
+            if vector is not None:
+                record['vector'] = vector
+            with open(self.path, 'ab') as f:
+                f.write(json_utils.dumps_bytes(record, pretty=False) + b'\n')
+
+    def lookup(self, question_text: str, values: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        candidates = self._by_options.get(options_key(values))
+        text = normalize_question(question_text)
+        if not candidates or not text:
+            return None
+        scores = self.scorer.scores(text, candidates)
+        if not scores:
+            return None
+        # Latest entry wins among equal scores (answers re-learned later are preferred)
+        doc_id, score = max(scores.items(), key=lambda kv: (kv[1], kv[0]))
+        if score < self.threshold:
+            return None
+        return self.entries[doc_id], round(min(score, 1.0), 4)
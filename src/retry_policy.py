@@ -0,0 +1,145 @@
+"""Retry / deadline / circuit-breaker primitives for LLM calls.
+
+RetryPolicy     exponential backoff with jitter, per-call timeout capped by the
+                remaining question deadline and, if one is set (opt-in), the
+                form deadline.
+Deadline        monotonic "time left" helper.
+CircuitBreaker  sliding-window error rate; once open, callers short-circuit to
+                the fallback answer (for the rest of the batch unless a cooldown
+                is configured, after which one probe call is let through).
+
+All values are configurable through FORMS_AI_LLM_* environment variables
+(see ``from_env``); state is published in metrics_utils (gauge
+``llm_circuit_state``: 0 closed, 1 half-open, 2 open).
+"""
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .logging_utils import log
+from .metrics_utils import count, set_gauge
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Deadline:
+    """Absolute deadline; seconds=None or <= 0 means unlimited."""
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 4, call_timeout: float = 120.0, base_delay: float = 1.0,
+                 max_delay: float = 30.0, multiplier: float = 2.0, jitter: float = 0.5,
+                 question_deadline: Optional[float] = 300.0, form_deadline: Optional[float] = None,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.call_timeout = call_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.question_deadline = question_deadline
+        self.form_deadline = form_deadline
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls, max_retries: int = 4, call_timeout: float = 120.0) -> "RetryPolicy":
+        return cls(
+            max_retries=int(_env_float('FORMS_AI_LLM_MAX_RETRIES', max_retries)),
+            call_timeout=_env_float('FORMS_AI_LLM_CALL_TIMEOUT', call_timeout),
+            base_delay=_env_float('FORMS_AI_LLM_BACKOFF_BASE', 1.0),
+            max_delay=_env_float('FORMS_AI_LLM_BACKOFF_MAX', 30.0),
+            question_deadline=_env_float('FORMS_AI_LLM_QUESTION_DEADLINE', 300.0),
+            form_deadline=_env_float('FORMS_AI_LLM_FORM_DEADLINE', 0) or None,  # opt-in
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number *attempt* (1-based): base * mult^(n-1), capped, +/- jitter."""
+        raw = min(self.max_delay, self.base_delay * (self.multiplier ** max(0, attempt - 1)))
+        spread = raw * self.jitter
+        return max(0.0, raw - spread + self._rng.random() * 2 * spread) if spread else raw
+
+    def timeout_for(self, *deadlines: Deadline) -> float:
+        """Per-call timeout: the configured one, shrunk to the tightest remaining deadline."""
+        return min([self.call_timeout] + [d.remaining() for d in deadlines])
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str = 'llm', window: int = 10, min_calls: int = 4,
+                 failure_threshold: float = 0.5, cooldown: Optional[float] = None):
+        self.name = name
+        self.window = deque(maxlen=max(1, window))
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown if cooldown and cooldown > 0 else None
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._publish()
+
+    @classmethod
+    def from_env(cls, name: str = 'llm') -> "CircuitBreaker":
+        return cls(
+            name=name,
+            window=int(_env_float('FORMS_AI_LLM_BREAKER_WINDOW', 10)),
+            min_calls=int(_env_float('FORMS_AI_LLM_BREAKER_MIN_CALLS', 4)),
+            failure_threshold=_env_float('FORMS_AI_LLM_BREAKER_THRESHOLD', 0.5),
+            cooldown=_env_float('FORMS_AI_LLM_BREAKER_COOLDOWN', 0),
+        )
+
+    def _publish(self) -> None:
+        set_gauge(f'{self.name}_circuit_state', self._GAUGE[self.state])
+        failures = sum(1 for ok in self.window if not ok)
+        set_gauge(f'{self.name}_circuit_error_rate', round(failures / len(self.window), 3) if self.window else 0.0)
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            log('LLM', f"Circuit {self.name}: {self.state} -> {state}", level='WARN' if state == self.OPEN else 'INFO')
+            count(f'{self.name}.circuit_{state}')
+            self.state = state
+            self.opened_at = time.monotonic() if state == self.OPEN else self.opened_at
+
+    def allow(self) -> bool:
+        """True if a real call may be attempted now."""
+        with self._lock:
+            if self.state == self.OPEN and self.cooldown is not None \
+                    and time.monotonic() - (self.opened_at or 0) >= self.cooldown:
+                self._transition(self.HALF_OPEN)
+                self._publish()
+            return self.state != self.OPEN
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self.window.append(success)
+            if self.state == self.HALF_OPEN:
+                self._transition(self.CLOSED if success else self.OPEN)
+                if success:
+                    self.window.clear()
+            elif self.state == self.CLOSED and len(self.window) >= self.min_calls:
+                failures = sum(1 for ok in self.window if not ok)
+                if failures / len(self.window) >= self.failure_threshold:
+                    self._transition(self.OPEN)
+            self._publish()
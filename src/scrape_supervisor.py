@@ -0,0 +1,288 @@
+"""Run each form scrape in a supervised child process with a hard deadline.
+
+A stuck page or a hung Chrome used to block step_scrape_forms forever and leak
+browsers across a long run. Here every attempt runs in its own process (own
+session / process group on POSIX), so the supervisor can:
+
+- stop waiting after FORMS_AI_SCRAPE_DEADLINE seconds and kill the whole tree
+  (worker, chromedriver, Chrome and its renderers), whatever state they are in
+- retry failed, crashed or timed-out attempts with exponential backoff
+  (RetryPolicy, FORMS_AI_SCRAPE_RETRIES / FORMS_AI_SCRAPE_BACKOFF_*)
+- reap chromedriver / automation Chrome processes orphaned by a previous run
+  and the profile locks killed browsers left behind (reap_orphans(), called
+  when the scrape step starts)
+
+The child writes its result as JSON lines (a header with the form fields, the
+metrics and counters it recorded, then one question per line) to a temporary file that
+appears atomically; the parent replays the metrics into its own registry.
+
+    FORMS_AI_SCRAPE_ISOLATED=0   scrape in-process as before (retries still apply)
+"""
+from __future__ import annotations
+import os
+import signal
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import chrome_profile, json_utils
+from .logging_utils import bind_log_context, flush, log
+from .memory_utils import QuestionSpool
+from .metrics_utils import METRICS, count
+from .retry_policy import RetryPolicy, _env_float
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ISOLATED = os.getenv('FORMS_AI_SCRAPE_ISOLATED', '1') == '1'
+DEADLINE = _env_float('FORMS_AI_SCRAPE_DEADLINE', 300.0)      # seconds per attempt
+MAX_RETRIES = int(_env_float('FORMS_AI_SCRAPE_RETRIES', 2))
+BACKOFF_BASE = _env_float('FORMS_AI_SCRAPE_BACKOFF_BASE', 5.0)
+BACKOFF_MAX = _env_float('FORMS_AI_SCRAPE_BACKOFF_MAX', 60.0)
+KILL_WAIT = 5.0  # seconds to wait for killed processes to disappear
+
+# Process names / command-line markers of the browsers the scraper starts
+_DRIVER_NAMES = ('chromedriver', 'undetected_chromedriver')
+_CHROME_NAMES = ('chrome', 'chromium', 'google-chrome', 'chrome.exe')
+_AUTOMATION_MARKERS = ('--remote-debugging-port', '--remote-debugging-host', 'undetected')
+
+
+def scrape_policy() -> RetryPolicy:
+    return RetryPolicy(max_retries=MAX_RETRIES, call_timeout=DEADLINE, base_delay=BACKOFF_BASE,
+                       max_delay=BACKOFF_MAX, question_deadline=None, form_deadline=None)
+
+
+# ------------------------------------------------------------------ process trees
+
+def _descendants(pid: int) -> List[Any]:
+    try:
+        return psutil.Process(pid).children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def kill_tree(pid: int, procs: Optional[List[Any]] = None) -> None:
+    """SIGKILL *pid* and everything it started (Chrome renderers included)."""
+    if psutil is not None:
+        procs = (procs or []) + _descendants(pid)
+        try:
+            procs.append(psutil.Process(pid))
+        except psutil.Error:
+            pass
+        for p in procs:
+            try:
+                p.kill()
+            except psutil.Error:
+                pass
+        psutil.wait_procs(procs, timeout=KILL_WAIT)
+    if sys.platform == 'win32':
+        import subprocess
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], capture_output=True)
+    elif hasattr(os, 'killpg'):
+        try:
+            os.killpg(pid, signal.SIGKILL)  # the worker leads its own process group
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def kill_session(sid: int) -> int:
+    """SIGKILL the processes still in session *sid* (an exited worker's leftovers); returns how many.
+
+    Unlike the worker's pid, a session id cannot be reused while any member is alive."""
+    if psutil is not None:
+        pids = psutil.pids()
+    elif os.path.isdir('/proc'):
+        pids = [int(e) for e in os.listdir('/proc') if e.isdigit()]
+    else:
+        return 0
+    killed = 0
+    for pid in pids:
+        try:
+            if pid != os.getpid() and os.getsid(pid) == sid:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+def _is_orphan(proc) -> bool:
+    try:
+        parent = proc.parent()
+    except psutil.Error:
+        return False
+    return parent is None or parent.pid == 1 or parent.name() in ('systemd', 'init', 'launchd')
+
+
+def _is_automation(name: str, cmdline: List[str]) -> bool:
+    name = name.lower()
+    if any(d in name for d in _DRIVER_NAMES):
+        return True
+    return name in _CHROME_NAMES and any(m in arg for arg in cmdline for m in _AUTOMATION_MARKERS)
+
+
+def _proc_table() -> Iterator[Dict[str, Any]]:
+    """pid / ppid / name / cmdline of this user's processes from /proc (no psutil)."""
+    uid = os.getuid()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        base = f"/proc/{entry}"
+        try:
+            if os.stat(base).st_uid != uid:
+                continue
+            with open(f"{base}/stat", 'rb') as f:
+                stat = f.read().decode(errors='replace')
+            with open(f"{base}/cmdline", 'rb') as f:
+                cmdline = [a.decode(errors='replace') for a in f.read().split(b'\0') if a]
+        except OSError:
+            continue
+        name, rest = stat[stat.find('(') + 1:stat.rfind(')')], stat[stat.rfind(')') + 2:].split()
+        yield {"pid": int(entry), "ppid": int(rest[1]), "state": rest[0], "name": name, "cmdline": cmdline}
+
+
+def reap_orphans() -> int:
+    """Kill chromedriver / automation Chrome processes left behind by a dead run; returns how many.
+
+    Then clears the SingletonLock of dead browsers from the free Chrome profile slots."""
+    killed = 0
+    if psutil is not None:
+        user = psutil.Process().username()
+        for p in psutil.process_iter(['name', 'cmdline', 'username']):
+            info = p.info
+            if info.get('username') != user or p.pid == os.getpid():
+                continue
+            if _is_automation(info.get('name') or '', info.get('cmdline') or []) and _is_orphan(p):
+                kill_tree(p.pid)
+                killed += 1
+    elif os.path.isdir('/proc'):
+        for p in _proc_table():
+            if p["ppid"] == 1 and p["state"] != 'Z' and _is_automation(p["name"], p["cmdline"]):
+                try:
+                    os.kill(p["pid"], signal.SIGKILL)
+                    killed += 1
+                except OSError:
+                    pass
+    else:
+        log('SCRAPE', "psutil absent: processus Chrome orphelins non vérifiés", level='DEBUG')
+    if killed:
+        count('scrape.reaped', killed)
+        log('SCRAPE', f"{killed} processus chromedriver/Chrome orphelin(s) arrêté(s)", level='WARN')
+    cleared = chrome_profile.clear_stale_locks()
+    if cleared:
+        log('SCRAPE', f"{cleared} profil(s) Chrome déverrouillé(s) (Chrome arrêté sans nettoyage)", level='WARN')
+    return killed
+
+
+# ------------------------------------------------------------------ worker side
+
+def _child(job: Dict[str, Any], result_path: str) -> None:
+    if hasattr(os, 'setsid'):
+        os.setsid()  # own process group: Chrome and chromedriver are killed with us
+    observations: List[tuple] = []
+    METRICS.add_listener(lambda *obs: observations.append(obs))
+    if job.get("form_id") is not None:
+        bind_log_context(form=job["form_id"])
+    try:
+        from .MicrosoftFormsCompleteAnalysisAgent import MicrosoftFormsCompleteScraper
+        data = MicrosoftFormsCompleteScraper(**job["scraper"]).run()
+        questions = data.pop("questions")
+        header = json_utils.dumps_bytes({"form": data, "metrics": observations, "counters": METRICS.counters()},
+                                        pretty=False) + b'\n'
+        json_utils.dump_stream(
+            [header, *(json_utils.dumps_bytes(q, pretty=False) + b'\n' for q in questions)], result_path)
+        if hasattr(questions, "close"):
+            questions.close()
+    finally:
+        flush()
+
+
+def _read_result(path: Path, spill_chunk: int) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        header = json_utils.loads(f.readline())
+        questions = QuestionSpool(spill_chunk) if spill_chunk else []
+        for line in f:
+            questions.append(json_utils.loads(line))
+    for name, wall, cpu, items, nbytes, error in header["metrics"]:
+        METRICS.record(name, wall, cpu, items, nbytes, error)
+    for name, n in header.get("counters", {}).items():
+        METRICS.count(name, n)
+    data = header["form"]
+    data["questions"] = questions
+    return data
+
+
+def _run_isolated(job: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+    import multiprocessing
+    fd, name = tempfile.mkstemp(prefix='forms_ai_scrape_', suffix='.jsonl')
+    os.close(fd)
+    os.unlink(name)  # the child creates it atomically once done
+    result = Path(name)
+    # spawn: a fresh interpreter, no copy of the parent's threads, locks or open connections
+    proc = multiprocessing.get_context('spawn').Process(target=_child, args=(job, name), name='forms-ai-scrape',
+                                                        daemon=True)
+    flush()
+    proc.start()
+    try:
+        proc.join(deadline if deadline > 0 else None)
+        if proc.is_alive():
+            # not reaped yet, so its pid (and process group) cannot belong to anyone else
+            count('scrape.timeout')
+            kill_tree(proc.pid)
+            proc.join(KILL_WAIT)
+            return {"error": f"Délai dépassé ({deadline:.0f}s), processus Chrome arrêtés"}
+        if hasattr(os, 'getsid'):
+            kill_session(proc.pid)  # Chrome left running by a worker that exited without closing it
+        if not result.exists():
+            count('scrape.crash')
+            return {"error": f"Processus de scraping terminé sans résultat (code {proc.exitcode})"}
+        return _read_result(result, job["scraper"].get("spill_chunk", 0))
+    finally:
+        try:
+            result.unlink()
+        except OSError:
+            pass
+
+
+def _run_inline(job: Dict[str, Any]) -> Dict[str, Any]:
+    from .MicrosoftFormsCompleteAnalysisAgent import MicrosoftFormsCompleteScraper
+    return MicrosoftFormsCompleteScraper(**job["scraper"]).run()
+
+
+def scrape_form(url: str, form_name: Optional[str], images_folder: str, output_folder: str, spill_chunk: int = 0,
+                form_id: Optional[int] = None, policy: Optional[RetryPolicy] = None,
+                on_retry: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """MicrosoftFormsCompleteScraper(url, ...).run() under a deadline, retried with backoff.
+
+    Returns the scraped data; after the last failed attempt it carries "error"
+    (and the url / form_name) like a failed in-process run. on_retry(attempt) is
+    called before each retry (e.g. to renew the form's lease)."""
+    policy = policy or scrape_policy()
+    job = {"form_id": form_id, "scraper": dict(url=url, form_name=form_name, headless=True,
+                                               images_folder=images_folder, output_folder=output_folder,
+                                               spill_chunk=spill_chunk)}
+    attempt = 0
+    while True:
+        t0 = time.monotonic()
+        data = _run_isolated(job, policy.call_timeout) if ISOLATED else _run_inline(job)
+        if not data.get("error") or attempt >= policy.max_retries:
+            break
+        attempt += 1
+        delay = policy.delay(attempt)
+        count('scrape.retry')
+        log('SCRAPE', f"Échec ({data['error']}, {time.monotonic() - t0:.1f}s) -> nouvel essai {attempt}/"
+                      f"{policy.max_retries} dans {delay:.1f}s", level='WARN')
+        if hasattr(data.get("questions"), "close"):
+            data["questions"].close()
+        time.sleep(delay)
+        if on_retry is not None:
+            on_retry(attempt)
+    data.setdefault("url", url)
+    data.setdefault("form_name", form_name)
+    data.setdefault("questions", [])
+    data.setdefault("statistics", {})
+    return data
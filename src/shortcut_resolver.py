@@ -0,0 +1,254 @@
+"""Pre-LLM shortcut answers for questions a rule can settle.
+
+Rules (FORMS_AI_SHORTCUTS, comma-separated, default "nps,consent,history,index"; empty = off):
+  nps      npsContainer 0-10 scale -> FORMS_AI_NPS_DEFAULT (default 9)
+  consent  two-option yes/no choice on a consent / agreement question -> the "yes" option
+  history  same question (numbering, casing, punctuation ignored; no OCR text) with
+           the same options already answered by the LLM in this batch or a previous
+           run (artifact store or *_with_answers.json) -> reuse that answer
+  index    near-duplicate in the persistent QuestionIndex (question_index) -> reuse
+           the stored answer, with its provenance
+
+A rule returns a Shortcut or None; the first hit at or above the resolver's
+min_confidence is used and the question never reaches the LLM.
+"""
+from __future__ import annotations
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import json_utils
+from .logging_utils import log
+
+SHORTCUT_RULES = os.getenv('FORMS_AI_SHORTCUTS', 'nps,consent,history,index')
+NPS_DEFAULT = os.getenv('FORMS_AI_NPS_DEFAULT', '9')
+HISTORY_MIN_SIMILARITY = float(os.getenv('FORMS_AI_SHORTCUT_SIMILARITY', '0.9'))
+
+_NUMBERING = re.compile(r'^\s*\(?\d+\s*[\.\):-]\s*')
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+_YES = {'yes', 'oui', 'ja', 'si', 'sí', 'sì', 'sim', 'da', 'tak'}
+_NO = {'no', 'non', 'nein', 'não', 'nao', 'nee', 'nie', 'nej'}
+_CONSENT = re.compile(
+    r"consent|agree|accept|gdpr|rgpd|privacy|j'accepte|acceptez|consentement|accord|"
+    r"einverstanden|zustimm|einwillig|datenschutz|acepto|acepta|consentimiento|"
+    r"acconsent|accett|consenso|concordo|akkoord|toestemming",
+    re.IGNORECASE)
+
+_JUSTIFICATIONS = {
+    'nps': {
+        'English': "Default score applied to NPS scales.",
+        'French': "Score par défaut appliqué aux échelles NPS.",
+        'German': "Standardwert für NPS-Skalen.",
+        'Spanish': "Puntuación por defecto para escalas NPS.",
+        'Italian': "Punteggio predefinito per le scale NPS.",
+        'Portuguese': "Pontuação padrão para escalas NPS.",
+        'Dutch': "Standaardscore voor NPS-schalen.",
+    },
+    'consent': {
+        'English': "Consent question: agreement is required to continue.",
+        'French': "Question de consentement : l'accord est requis pour continuer.",
+        'German': "Einwilligungsfrage: Zustimmung ist zum Fortfahren erforderlich.",
+        'Spanish': "Pregunta de consentimiento: se requiere aceptación para continuar.",
+        'Italian': "Domanda di consenso: l'accordo è necessario per continuare.",
+        'Portuguese': "Pergunta de consentimento: o acordo é necessário para continuar.",
+        'Dutch': "Toestemmingsvraag: akkoord is vereist om door te gaan.",
+    },
+}
+
+
+def _justification(rule: str, language: str) -> str:
+    texts = _JUSTIFICATIONS[rule]
+    return texts.get(language, texts['English'])
+
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize('NFKC', _NUMBERING.sub('', text or '')).casefold()
+    return _SPACES.sub(' ', _PUNCT.sub(' ', text)).strip()
+
+
+def options_key(values: Any) -> Tuple[str, ...]:
+    if isinstance(values, list):
+        return tuple(sorted(normalize_question(str(v)) for v in values))
+    return (normalize_question(str(values)),)
+
+
+@dataclass
+class Shortcut:
+    answer: str
+    justification: str
+    rule: str
+    confidence: float = 1.0
+    provenance: Optional[Dict[str, Any]] = None
+
+
+Rule = Callable[[Dict[str, Any], str, str], Optional[Shortcut]]
+
+
+def nps_rule(q: Dict[str, Any], q_text: str, language: str) -> Optional[Shortcut]:
+    values = q.get("answer_values")
+    if q.get("answer_type") != 'npsContainer' or not isinstance(values, list):
+        return None
+    if NPS_DEFAULT not in values:
+        return None
+    return Shortcut(NPS_DEFAULT, _justification('nps', language), 'nps')
+
+
+def consent_rule(q: Dict[str, Any], q_text: str, language: str) -> Optional[Shortcut]:
+    values = q.get("answer_values")
+    if q.get("answer_type") != 'choiceItem' or not isinstance(values, list) or len(values) != 2:
+        return None
+    words = [set(normalize_question(str(v)).split()) for v in values]
+    yes = [i for i, w in enumerate(words) if w & _YES and not w & _NO]
+    no = [i for i, w in enumerate(words) if w & _NO]
+    if len(yes) != 1 or len(no) != 1 or not _CONSENT.search(q_text or ''):
+        return None
+    return Shortcut(str(values[yes[0]]), _justification('consent', language), 'consent')
+
+
+class AnswerHistory:
+    """Answered questions keyed by option set; lookup by normalized text, then token overlap."""
+
+    def __init__(self, min_similarity: float = HISTORY_MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self._by_options: Dict[Tuple[str, ...], Dict[str, Tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._by_options.values())
+
+    def add(self, question_text: str, values: Any, answer: str, justification: str) -> None:
+        text = normalize_question(question_text)
+        if text:
+            self._by_options.setdefault(options_key(values), {})[text] = (answer, justification)
+
+    def lookup(self, question_text: str, values: Any) -> Optional[Tuple[str, str, float]]:
+        entries = self._by_options.get(options_key(values))
+        text = normalize_question(question_text)
+        if not entries or not text:
+            return None
+        if text in entries:
+            return (*entries[text], 1.0)
+        tokens = set(text.split())
+        best, best_score = None, 0.0
+        for other, hit in entries.items():
+            other_tokens = set(other.split())
+            score = len(tokens & other_tokens) / len(tokens | other_tokens)
+            if score > best_score:
+                best, best_score = hit, score
+        if best and best_score >= self.min_similarity:
+            return (*best, best_score)
+        return None
+
+    def seed(self, questions: Iterable[Dict[str, Any]]) -> int:
+        """Load previously answered questions (LLM answers only, fallbacks skipped)."""
+        before = len(self)
+        for q in questions:
+            if is_reusable(q):
+                self.add(q.get("question_text", ""), q.get("answer_values", []),
+                         q["llm_answer"], q.get("llm_justification", ""))
+        return len(self) - before
+
+    def seed_from_files(self, paths: Iterable[Path]) -> int:
+        seeded = 0
+        for path in paths:
+            try:
+                seeded += self.seed(json_utils.load(path).get("questions", []))
+            except Exception:
+                continue
+        return seeded
+
+
+def has_ocr(q: Dict[str, Any]) -> bool:
+    return any(isinstance(img, dict) and img.get("question_text") for img in q.get("images") or [])
+
+
+def is_reusable(q: Dict[str, Any]) -> bool:
+    answer = str(q.get("llm_answer", ""))
+    # Image text is part of the question: the same wording with other images is another question
+    return (bool(answer) and not answer.startswith(("FALLBACK_", "LLM_ERROR")) and not has_ocr(q)
+            and q.get("llm_answer_validation") != 'invalid'
+            and q.get("llm_answer_source", "llm") == "llm")
+
+
+class ShortcutResolver:
+    def __init__(self, rules: Optional[List[str]] = None, history: Optional[AnswerHistory] = None,
+                 min_confidence: float = 0.9, index=None):
+        names = [r.strip() for r in (SHORTCUT_RULES.split(',') if rules is None else rules) if r.strip()]
+        self.history = history or AnswerHistory()
+        self.index = index  # question_index.QuestionIndex, required by the 'index' rule
+        available: Dict[str, Rule] = {'nps': nps_rule, 'consent': consent_rule, 'history': self._history_rule}
+        if index is not None:
+            available['index'] = self._index_rule
+        unknown = [n for n in names if n not in available and n != 'index']
+        if unknown:
+            log('LLM', f"Règles de raccourci inconnues ignorées: {', '.join(unknown)}", level='WARN')
+        self.rules: List[Tuple[str, Rule]] = [(n, available[n]) for n in names if n in available]
+        self.min_confidence = min_confidence
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+
+    def _history_rule(self, q: Dict[str, Any], q_text: str, language: str) -> Optional[Shortcut]:
+        if has_ocr(q):
+            return None
+        hit = self.history.lookup(q.get("question_text", ""), q.get("answer_values", []))
+        if hit is None:
+            return None
+        answer, justification, score = hit
+        return Shortcut(answer, justification, 'history', score)
+
+    def _index_rule(self, q: Dict[str, Any], q_text: str, language: str) -> Optional[Shortcut]:
+        if has_ocr(q):
+            return None
+        hit = self.index.lookup(q.get("question_text", ""), q.get("answer_values", []))
+        if hit is None:
+            return None
+        entry, similarity = hit
+        provenance = {
+            "question_text": entry.get("question_text", ""),
+            "similarity": similarity,
+            "added_at": entry.get("added_at"),
+            **(entry.get("source") or {}),
+        }
+        return Shortcut(entry["llm_answer"], entry.get("llm_justification", ""), 'index', provenance=provenance)
+
+    def resolve(self, q: Dict[str, Any], q_text: str, language: str) -> Optional[Shortcut]:
+        self.total += 1
+        for _, rule in self.rules:
+            shortcut = rule(q, q_text, language)
+            if shortcut is not None and shortcut.confidence >= self.min_confidence:
+                self.counts[shortcut.rule] = self.counts.get(shortcut.rule, 0) + 1
+                return shortcut
+        return None
+
+    def learn(self, q: Dict[str, Any], source: Optional[Dict[str, Any]] = None) -> None:
+        """Remember an LLM answer so identical questions later in the batch (history)
+        and in later runs (index, persisted with *source* as provenance) are shortcut."""
+        if not is_reusable(q):
+            return
+        names = {name for name, _ in self.rules}
+        args = (q.get("question_text", ""), q.get("answer_values", []), q["llm_answer"], q.get("llm_justification", ""))
+        if 'history' in names:
+            self.history.add(*args)
+        if 'index' in names:
+            self.index.add(*args, source=source)
+
+    def reset_report(self) -> None:
+        """Start counting a new batch (the history and index are kept)."""
+        self.counts = {}
+        self.total = 0
+
+    @property
+    def shortcut_count(self) -> int:
+        return sum(self.counts.values())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "questions": self.total,
+            "shortcut": self.shortcut_count,
+            "fraction": round(self.shortcut_count / self.total, 3) if self.total else 0.0,
+            "by_rule": dict(self.counts),
+        }
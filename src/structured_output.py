@@ -0,0 +1,92 @@
+"""Constrained JSON output for LLM answers.
+
+answer_schema()   JSON schema passed as Ollama's `format` option; for choiceItem /
+                  npsContainer questions the answer is an enum of the scraped options.
+validate_answer() checks a parsed answer against the options and maps near misses
+                  (case, punctuation, option letter, typos) to the closest option.
+"""
+from __future__ import annotations
+import difflib
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+CHOICE_TYPES = ('choiceItem', 'npsContainer')
+FUZZY_CUTOFF = 0.6
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+_LETTER = re.compile(r"^(?:option\s+)?([a-z])[\)\.:]?$")
+
+
+def _options(qtype: str, answer_values: Any) -> List[str]:
+    if qtype in CHOICE_TYPES and isinstance(answer_values, list):
+        return [str(v) for v in answer_values if str(v).strip()]
+    return []
+
+
+def answer_schema(qtype: str, answer_values: Any) -> Dict[str, Any]:
+    answer: Dict[str, Any] = {"type": "string"}
+    options = _options(qtype, answer_values)
+    if options:
+        answer["enum"] = options
+    return {
+        "type": "object",
+        "properties": {
+            "answer": answer,
+            "justification": {"type": "string"},
+        },
+        "required": ["answer", "justification"],
+    }
+
+
+def normalize_option(text: str) -> str:
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    text = _PUNCT.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def match_option(answer: str, options: List[str]) -> Optional[tuple]:
+    """(option, how) for the best option matching *answer*, or None."""
+    if not options:
+        return None
+    if answer in options:
+        return answer, 'exact'
+    norm = normalize_option(answer)
+    normalized = {normalize_option(o): o for o in options}
+    if norm in normalized:
+        return normalized[norm], 'normalized'
+    # "B", "b)", "Option B" -> second option (when options are not letters themselves)
+    letter = _LETTER.match(norm)
+    if letter and len(norm) <= 9:
+        pos = ord(letter.group(1)) - ord('a')
+        if 0 <= pos < len(options):
+            return options[pos], 'letter'
+    # Answer contains exactly one option verbatim ("I choose Paris because...")
+    contained = [o for n, o in normalized.items() if n and re.search(rf"(?<!\w){re.escape(n)}(?!\w)", norm)]
+    if len(contained) == 1:
+        return contained[0], 'contains'
+    close = difflib.get_close_matches(norm, list(normalized), n=1, cutoff=FUZZY_CUTOFF)
+    if close:
+        ratio = difflib.SequenceMatcher(None, norm, close[0]).ratio()
+        return normalized[close[0]], f'fuzzy:{ratio:.2f}'
+    return None
+
+
+def validate_answer(parsed: Dict[str, str], qtype: str, answer_values: Any) -> Dict[str, str]:
+    """Return a copy of *parsed* with the answer snapped to an option and a 'validation' tag.
+
+    validation: 'free' (no option list), 'exact', 'normalized', 'letter', 'contains',
+    'fuzzy:<ratio>' or 'invalid' (kept as-is, nothing close enough).
+    """
+    result = dict(parsed)
+    options = _options(qtype, answer_values)
+    if not options:
+        result['validation'] = 'free'
+        return result
+    match = match_option(str(parsed.get('answer', '')).strip(), options)
+    if match is None:
+        result['validation'] = 'invalid'
+        return result
+    result['answer'], result['validation'] = match
+    return result
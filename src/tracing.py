@@ -0,0 +1,152 @@
+"""Optional trace spans exported as a Chrome-trace JSON file (open in https://ui.perfetto.dev).
+
+Off unless FORMS_AI_TRACE=1 (or ``enable()``): ``span()`` then returns a shared
+no-op object, so instrumented code costs one attribute check per span.
+
+    with span('answer', form=12, questions=30):
+        with span('question', type='choiceItem', images=1) as s:
+            ...
+            s.set(prompt_chars=len(prompt))
+            annotate(retries=2)          # innermost open span of this thread
+
+Every ``metrics_utils.timed`` block (scrape.navigate, ocr.image, llm.ask,
+elastic.upload...) is also recorded as a span while tracing is on, so the
+stage phases nest under the per-form / per-question spans.
+
+export(path) writes ``{"traceEvents": [...]}`` with complete ("X") events,
+timestamps in microseconds; one track per process/thread.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+ENABLED = os.getenv('FORMS_AI_TRACE', '0') == '1'
+MAX_EVENTS = int(os.getenv('FORMS_AI_TRACE_MAX_EVENTS', '200000'))
+
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_dropped = 0
+_threads: Dict[int, str] = {}
+_stack: contextvars.ContextVar[Tuple["Span", ...]] = contextvars.ContextVar('forms_ai_spans', default=())
+
+
+def _us(t: float) -> float:
+    """perf_counter seconds -> trace microseconds."""
+    return round(t * 1e6, 1)
+
+
+def _add(event: Dict[str, Any]) -> None:
+    global _dropped
+    thread = threading.current_thread()
+    with _lock:
+        if len(_events) >= MAX_EVENTS:
+            _dropped += 1
+            return
+        _threads.setdefault(thread.ident, thread.name)
+        _events.append(event)
+
+
+class Span:
+    __slots__ = ('name', 'cat', 'args', 't0', '_token')
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.t0 = 0.0
+        self._token = None
+
+    def set(self, **attrs: Any) -> "Span":
+        self.args.update(attrs)
+        return self
+
+    def __enter__(self) -> "Span":
+        self._token = _stack.set(_stack.get() + (self,))
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        t1 = time.perf_counter()
+        _stack.reset(self._token)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        complete(self.name, self.t0, t1 - self.t0, self.cat, self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> "_NoSpan":
+        return self
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def span(name: str, cat: str = 'pipeline', **attrs: Any) -> Union[Span, _NoSpan]:
+    if not ENABLED:
+        return _NO_SPAN
+    return Span(name, cat, attrs)
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes to the innermost open span of the current thread (no-op without one)."""
+    if ENABLED:
+        stack = _stack.get()
+        if stack:
+            stack[-1].args.update(attrs)
+
+
+def complete(name: str, t0: float, duration: float, cat: str = 'stage', args: Optional[Dict[str, Any]] = None) -> None:
+    """Record an already measured block (t0 = perf_counter() at its start)."""
+    if not ENABLED:
+        return
+    event = {"name": name, "cat": cat, "ph": "X", "ts": _us(t0), "dur": _us(duration),
+             "pid": os.getpid(), "tid": threading.get_ident()}
+    if args:
+        event["args"] = args
+    _add(event)
+
+
+def reset() -> None:
+    global _dropped
+    with _lock:
+        _events.clear()
+        _threads.clear()
+        _dropped = 0
+
+
+def events() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_events)
+
+
+def export(path: Union[str, Path]) -> Optional[Path]:
+    """Write the recorded spans as Chrome-trace JSON; None when tracing is off or nothing was recorded."""
+    from . import json_utils
+    with _lock:
+        if not _events:
+            return None
+        pid = os.getpid()
+        meta = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for tid, name in _threads.items()]
+        meta.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"forms-ai {pid}"}})
+        trace = {"traceEvents": meta + _events, "displayTimeUnit": "ms",
+                 "otherData": {"dropped_events": _dropped}}
+        return json_utils.dump(trace, path)
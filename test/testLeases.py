@@ -0,0 +1,74 @@
+"""Work-queue leases of the artifact store (claim / renew / expiry / release / attempts).
+
+    python test/testLeases.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import artifact_store
+from src.artifact_store import ArtifactStore
+
+store = ArtifactStore(Path(tempfile.mkdtemp()) / 'leases.db')
+first = store.enqueue('https://forms.example/1', 'Form 1')
+second = store.enqueue('https://forms.example/2', 'Form 2')
+
+# Claim: oldest free form first, never the same form twice
+a = store.claim('new', 'worker-a')
+b = store.claim('new', 'worker-b')
+assert a['id'] == first and a['lease_owner'] == 'worker-a'
+assert b['id'] == second
+assert store.claim('new', 'worker-c') is None, "tous les formulaires sont réservés"
+
+# Renew: only the owner extends its lease
+assert store.renew(first, 'worker-a')
+assert not store.renew(first, 'worker-b')
+
+# Expiry race: A's lease runs out, C takes the form over, A's renew then fails
+store.release(second)
+store.renew(first, 'worker-a', lease_seconds=0.05)
+time.sleep(0.1)
+c = store.claim('new', 'worker-c')
+assert c['id'] == first and c['lease_owner'] == 'worker-c'
+assert not store.renew(first, 'worker-a'), "bail perdu: le renouvellement doit échouer"
+assert store.renew(first, 'worker-c')
+
+# Release with a delay: not claimable before retry_after
+assert store.release(first, retry_after=0.2)
+d = store.claim('new', 'worker-d')
+assert d['id'] == second
+assert store.claim('new', 'worker-e') is None
+time.sleep(0.25)
+assert store.claim('new', 'worker-e')['id'] == first
+
+# A status change ends the lease and resets the attempt count
+store.set_status(second, 'scraped')
+assert store.form(second)['lease_owner'] is None
+assert store.claim('scraped', 'worker-f')['id'] == second
+
+# Status change by a stale worker: refused once another worker holds the form, its lease kept
+store.renew(first, 'worker-e', lease_seconds=0.05)
+time.sleep(0.1)
+assert store.claim('new', 'worker-g')['id'] == first
+assert not store.set_status(first, 'scraped', owner='worker-e'), "bail perdu: statut inchangé"
+assert store.form(first)['status'] == 'new' and store.form(first)['lease_owner'] == 'worker-g'
+assert store.set_status(first, 'scraped', owner='worker-g') and store.form(first)['lease_owner'] is None
+
+# Attempts: MAX_ATTEMPTS failed releases move the form to 'failed'; deferred releases do not count
+artifact_store.MAX_ATTEMPTS = 3
+assert store.release(second, failed=False) and store.form(second)['attempts'] == 0
+for attempt in range(1, 3):
+    store.claim('scraped', 'worker-f')
+    assert store.release(second), f"essai {attempt}: remis en file"
+    assert store.form(second)['attempts'] == attempt
+store.claim('scraped', 'worker-f')
+assert not store.release(second)
+assert store.form(second)['status'] == 'failed' and store.form(second)['lease_owner'] is None
+assert store.claim('scraped', 'worker-f') is None
+assert store.enqueue('https://forms.example/2') == second and store.form(second)['attempts'] == 0
+
+store.close()
+print("Baux OK")
@@ -0,0 +1,49 @@
+"""OcrLayout record: dict round trip, little-endian packing, reading order (src/ocr_layout.py).
+
+    python test/testOcrLayout.py
+"""
+import base64
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import json_utils
+from src.ocr_layout import GRID, OcrLayout, OcrLine, quantize_box
+
+# EasyOCR readtext() output: (4 corner points, text, confidence), in no particular order
+readtext = [
+    ([[410, 12], [600, 12], [600, 40], [410, 40]], "droite", 0.91),
+    ([[10, 100], [300, 100], [300, 130], [10, 130]], "Chiffre d'affaires 2024", 0.5),
+    ([[10, 10], [200, 10], [200, 42], [10, 42]], "Figure 3", 0.987654),
+    ([[10, 200], [90, 200], [90, 220], [10, 220]], "~|~", 0.12),
+]
+layout = OcrLayout.from_readtext(readtext)
+assert [line.text for line in layout.lines] == ["Figure 3", "droite", "Chiffre d'affaires 2024", "~|~"]
+assert layout.lines[0].box == quantize_box(readtext[2][0]) == (10 // GRID, 10 // GRID, 50, 11)
+
+# Round trip through the dict (and JSON): equal once confidences are on the stored 1/1000 scale
+d = layout.to_dict()
+again = OcrLayout.from_dict(json_utils.loads(json_utils.dumps(d, pretty=False)))
+expected = OcrLayout([OcrLine(line.text, round(line.confidence, 3), line.box) for line in layout.lines], layout.grid)
+assert again == expected, (again, expected)
+assert again.to_dict() == d
+
+# Packed layout is little-endian uint16 whatever the host: confidence * 1000, x0, y0, x1, y1
+raw = base64.b64decode(d["packed"])
+assert len(raw) == 10 * len(layout.lines)
+assert struct.unpack('<5H', raw[:10]) == (988, 2, 2, 50, 11)
+assert struct.unpack('<5H', raw[20:30])[0] == 500
+packed = base64.b64encode(struct.pack('<5H', 750, 1, 2, 300, 4)).decode('ascii')
+assert OcrLayout.from_dict({"text": ["x"], "packed": packed, "grid": 2}) == OcrLayout([OcrLine("x", 0.75, (1, 2, 300, 4))], 2)
+
+# Thresholds applied from the record, without running OCR again
+assert again.texts(0.3) == ["Figure 3", "droite", "Chiffre d'affaires 2024"]
+assert again.dropped(0.3) == 1 and again.text(0.95) == "Figure 3"
+
+# Boxes are clamped to uint16; missing or empty records give None
+assert quantize_box([[-8, -8], [10 ** 7, 0], [10 ** 7, 10 ** 7], [0, 10 ** 7]]) == (0, 0, 0xFFFF, 0xFFFF)
+assert OcrLayout.from_dict(None) is None and OcrLayout.from_dict({"text": [], "packed": ""}) is None
+
+print("OcrLayout OK")
@@ -0,0 +1,76 @@
+"""RetryPolicy backoff / deadlines and CircuitBreaker state transitions (src/retry_policy.py).
+
+    python test/testRetryPolicy.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.LangChainPipelineAgent import ask_with_retries
+from src.retry_policy import CircuitBreaker, Deadline, RetryPolicy
+
+# Backoff: base * multiplier^(n-1), capped at max_delay; jitter stays within +/- jitter
+policy = RetryPolicy(base_delay=1.0, max_delay=5.0, multiplier=2.0, jitter=0.0)
+assert [policy.delay(n) for n in (1, 2, 3, 4, 5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+jittered = RetryPolicy(base_delay=2.0, max_delay=30.0, jitter=0.5, rng=random.Random(1))
+assert all(1.0 <= jittered.delay(1) <= 3.0 for _ in range(200))
+
+# Deadlines: unlimited by default for the form, per-call timeout shrunk to the tightest one
+assert RetryPolicy().form_deadline is None
+assert Deadline(None).remaining() == float('inf') and not Deadline(0).expired
+policy = RetryPolicy(call_timeout=120.0)
+assert policy.timeout_for(Deadline(None)) == 120.0
+assert policy.timeout_for(Deadline(None), Deadline(10.0)) <= 10.0
+short = Deadline(0.05)
+time.sleep(0.1)
+assert short.expired and policy.timeout_for(short) == 0.0
+
+# Breaker: closed below min_calls, opens at the failure threshold
+breaker = CircuitBreaker('test', window=4, min_calls=4, failure_threshold=0.5)
+for ok in (False, False, True):
+    breaker.record(ok)
+assert breaker.state == CircuitBreaker.CLOSED and breaker.allow(), "pas encore min_calls"
+breaker.record(True)
+assert breaker.state == CircuitBreaker.OPEN, "2 échecs sur 4 = seuil atteint"
+assert not breaker.allow()
+
+# Without cooldown it stays open
+time.sleep(0.05)
+assert not breaker.allow() and breaker.state == CircuitBreaker.OPEN
+
+# With a cooldown: open -> half-open (one probe) -> closed on success, open again on failure
+breaker = CircuitBreaker('test', window=2, min_calls=2, failure_threshold=0.5, cooldown=0.05)
+breaker.record(False)
+breaker.record(False)
+assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+time.sleep(0.06)
+assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+breaker.record(False)
+assert breaker.state == CircuitBreaker.OPEN, "sonde en échec: réouverture"
+time.sleep(0.06)
+assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+breaker.record(True)
+assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+assert len(breaker.window) == 0, "fenêtre vidée à la fermeture"
+
+# ask_with_retries: one breaker outcome per question, whatever the number of attempts
+def answers(*replies):
+    it = iter(replies)
+    return lambda prompt, **_: next(it)
+
+
+TIMEOUT = "FALLBACK_TIMEOUT_AUTO_ANSWER"
+policy = RetryPolicy(max_retries=3, base_delay=0.0, jitter=0.0)
+breaker = CircuitBreaker('test', window=10, min_calls=2, failure_threshold=0.5)
+assert ask_with_retries(answers(TIMEOUT, TIMEOUT, TIMEOUT, '{"answer": "A"}'), 'p', 1, policy, breaker,
+                        Deadline(None)) == '{"answer": "A"}'
+assert list(breaker.window) == [True], "timeouts suivis d'un succès: un seul succès"
+assert ask_with_retries(answers(*[TIMEOUT] * 4), 'p', 2, policy, breaker, Deadline(None)) == TIMEOUT
+assert list(breaker.window) == [True, False] and breaker.state == CircuitBreaker.OPEN
+assert ask_with_retries(answers(), 'p', 3, policy, breaker, Deadline(None)) == "FALLBACK_CIRCUIT_OPEN_AUTO_ANSWER"
+assert len(breaker.window) == 2, "question sautée: aucun résultat enregistré"
+
+print("RetryPolicy / CircuitBreaker OK")
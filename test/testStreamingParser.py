@@ -0,0 +1,69 @@
+"""StreamingAnswerParser: early stop on the first complete JSON answer, thinking budget.
+
+    python test/testStreamingParser.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.LlamaLanguageModelAgent import StreamingAnswerParser
+
+ANSWER = '{"answer": "Paris", "justification": "Capitale {de} la \\"France\\"."}'
+
+
+def feed_chars(parser, text):
+    """Feed one character at a time; index of the character that made feed() return True, or -1."""
+    for i, ch in enumerate(text):
+        if parser.feed(ch):
+            return i
+    return -1
+
+
+# Early stop: done on the closing brace, not before; what follows is never read
+parser = StreamingAnswerParser()
+stop = feed_chars(parser, ANSWER + '\n\nExtra text the model keeps generating {"answer": "x"}')
+assert stop == len(ANSWER) - 1, stop
+assert parser.done and parser.answer() == ANSWER
+
+# Braces and quotes inside strings do not close the object early
+parser = StreamingAnswerParser()
+assert not parser.feed('{"answer": "a}b", "justification": "c\\"}')
+assert parser.feed('d"}') and parser.answer() == '{"answer": "a}b", "justification": "c\\"}d"}'
+
+# An object without both keys is not an answer
+parser = StreamingAnswerParser()
+assert not parser.feed('{"note": 1} ')
+assert parser.feed(ANSWER) and parser.answer() == ANSWER
+
+# JSON inside the thinking section is ignored; chunk boundaries may split the markers
+parser = StreamingAnswerParser()
+for chunk in ('<thi', 'nk>\nMaybe {"answer": "Lyon", "justification": "no"} ', 'or Paris.</th', 'ink>\n', ANSWER):
+    done = parser.feed(chunk)
+assert done and parser.answer() == ANSWER and parser.thinking_tokens > 0
+
+# Think budget: over_budget once thinking exceeds the budget (CLI markers)
+parser = StreamingAnswerParser(think_budget=10)
+parser.feed('Thinking...\n' + 'step ' * 5)
+assert not parser.over_budget
+parser.feed('step ' * 6)
+assert parser.over_budget and not parser.done and parser.answer() == ''
+
+# Thinking flagged by the HTTP API counts against the same budget
+parser = StreamingAnswerParser(think_budget=3)
+parser.feed('one two three', thinking=True)
+assert not parser.over_budget
+parser.feed('four', thinking=True)
+assert parser.over_budget and parser.thinking_tokens == 4
+
+# No budget (-1): any amount of thinking, then the answer
+parser = StreamingAnswerParser()
+parser.feed('<think>' + 'word ' * 5000 + '</think>')
+assert not parser.over_budget and parser.feed(ANSWER)
+
+# Answer without JSON: whatever follows the thinking section
+parser = StreamingAnswerParser()
+parser.feed('Thinking...\nhmm\n...done thinking.\n\nParis')
+assert not parser.done and parser.answer() == 'Paris'
+
+print("StreamingAnswerParser OK")